@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from datetime import timedelta
 import os
 from pathlib import Path
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_spectacular',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -60,6 +62,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fail requests exceeding the query budget declared on the view.
+if DEBUG and bool(int(os.environ.get('QUERY_BUDGET', 0))):
+    MIDDLEWARE.append('core.middleware.QueryBudgetMiddleware')
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -86,14 +92,101 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Per worker process pool, see core.pool. Connections return to it
+        # at the end of every request, so CONN_MAX_AGE stays 0.
+        'POOL': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'max_lifetime': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'max_idle': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'check_after': int(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+}
+
+# Without the pool keep a persistent connection per thread instead.
+if os.environ.get('DB_POOL', '1') == '0':
+    DATABASES['default'].pop('POOL')
+    DATABASES['default'].update({
+        'ENGINE': 'django.db.backends.postgresql',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Read replicas of the default database, see core.replicas.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASE_REPLICAS.append(f'replica{index}')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Reads of users stay on the primary this long after they write. Pins
+# are kept in a cache shared by the workers, see core.checks.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'shared')
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Redis shared by the workers, e.g. redis://redis:6379/0.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Processes serving requests, caches local to each process are refused
+# when there are several, see core.checks.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Rendered task listings, see todo.cache. Redis when REDIS_URL is set,
+# evicting least recently used keys (maxmemory-policy allkeys-lru).
+LISTINGS_CACHE_BACKEND = os.environ.get(
+    'LISTINGS_CACHE_BACKEND',
+    'django.core.cache.backends.redis.RedisCache' if REDIS_URL
+    else 'django.core.cache.backends.locmem.LocMemCache',
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Small state every worker has to see, e.g. replica pins.
+    'shared': {
+        'BACKEND': os.environ.get(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.redis.RedisCache' if REDIS_URL
+            else 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION',
+                                   REDIS_URL or 'shared'),
+        'KEY_PREFIX': 'shared',
+    },
+    'listings': {
+        'BACKEND': LISTINGS_CACHE_BACKEND,
+        'LOCATION': os.environ.get('LISTINGS_CACHE_LOCATION',
+                                   REDIS_URL or 'listings'),
+        'TIMEOUT': int(os.environ.get('LISTINGS_CACHE_TIMEOUT', 300)),
+    },
 }
 
+if LISTINGS_CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['listings']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('LISTINGS_CACHE_MAX_ENTRIES', 1000)),
+    }
+
+LISTINGS_CACHE_MAX_ENTRY_SIZE = int(
+    os.environ.get('LISTINGS_CACHE_MAX_ENTRY_SIZE', 512 * 1024))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -140,13 +233,69 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DATETIME_FORMAT': "%Y-%m-%d %H:%M:%S",
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.ScopedTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'token': os.environ.get('THROTTLE_RATE_TOKEN', '20/min'),
+        'register': os.environ.get('THROTTLE_RATE_REGISTER', '10/hour'),
+        'tasks': os.environ.get('THROTTLE_RATE_TASKS', '600/min'),
+    },
 }
 
+# Token buckets of core.throttling shared by all workers of the host.
+THROTTLE_BUCKETS_PATH = os.environ.get(
+    'THROTTLE_BUCKETS_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm')
+                 else tempfile.gettempdir(), 'todo-throttle-buckets'),
+)
+THROTTLE_BUCKETS_SLOTS = int(os.environ.get('THROTTLE_BUCKETS_SLOTS', 65536))
+
+# Deleted tasks and tags are reported to syncing clients for this long.
+SYNC_TOMBSTONE_RETENTION = timedelta(
+    days=int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30)))
+
+# Archived tasks are moved to the cold archive table this long after being
+# archived, see the move_archived_tasks command.
+TASK_ARCHIVE_GRACE = timedelta(
+    days=int(os.environ.get('TASK_ARCHIVE_GRACE_DAYS', 30)))
+
+# Reminders of task events are delivered this long before the event, see
+# the run_reminders command.
+TASK_REMINDER_LEAD = timedelta(
+    minutes=int(os.environ.get('TASK_REMINDER_LEAD_MINUTES', 15)))
+
+# Background jobs, see the run_worker command. Failed jobs are retried up
+# to JOB_MAX_ATTEMPTS runs, after a backoff doubling from
+# JOB_RETRY_BACKOFF. Workers renew the JOB_LEASE of their running jobs,
+# jobs whose lease expires are retried as if their worker died.
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF = timedelta(
+    seconds=int(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', 30)))
+JOB_RETRY_BACKOFF_MAX = timedelta(
+    seconds=int(os.environ.get('JOB_RETRY_BACKOFF_MAX_SECONDS', 3600)))
+JOB_LEASE = timedelta(seconds=int(os.environ.get('JOB_LEASE_SECONDS', 600)))
+# Files of jobs, such as exports and uploaded imports. The web and worker
+# processes have to share the directory, e.g. a volume mounted by every
+# container, the temporary default only works on a single host.
+JOB_FILES_DIR = os.environ.get(
+    'JOB_FILES_DIR', os.path.join(tempfile.gettempdir(), 'todo-jobs'))
+# Jobs finished longer ago are deleted with their files, and other job
+# files as old too, see the purge_jobs command.
+JOB_RETENTION = timedelta(
+    days=int(os.environ.get('JOB_RETENTION_DAYS', 7)))
+
 SIMPLE_JWT = {
     # Set the expiration time as needed
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
 }
+
+# Per process caches of core.authentication.CachedJWTAuthentication. The
+# user TTL bounds how long other processes may serve a changed user.
+JWT_TOKEN_CACHE_SIZE = int(os.environ.get('JWT_TOKEN_CACHE_SIZE', 10000))
+JWT_USER_CACHE_SIZE = int(os.environ.get('JWT_USER_CACHE_SIZE', 10000))
+JWT_USER_CACHE_TTL = int(os.environ.get('JWT_USER_CACHE_TTL', 30))
@@ -1,13 +1,21 @@
 """
 Core API serializers.
 """
+import uuid
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from django.db.utils import IntegrityError
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from core import jobs
+from core.authentication import invalidate_user
+from core.models import Job
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Serializer for obtain pair of tokens."""
@@ -28,7 +36,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = get_user_model()
-        fields = ['email', 'password', 'name']
+        fields = ['email', 'password', 'name', 'timezone']
 
     def create(self, validated_data):
         """Create and return a user with encrypted password"""
@@ -49,4 +57,64 @@ class UserSerializer(serializers.ModelSerializer):
             user.set_password(password)
             user.save()
 
+        invalidate_user(user.pk)
+
         return user
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the job object."""
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'result', 'error', 'attempts',
+                  'max_attempts', 'run_after', 'created_date',
+                  'started_date', 'finished_date']
+        read_only_fields = fields
+
+
+class JobSubmitSerializer(serializers.Serializer):
+    """Serializer submitting a job of a kind the user may submit.
+
+    The other fields of the request are the payload, validated by the
+    serializer of the kind. Uploaded files of the payload are saved to
+    JOB_FILES_DIR and replaced with their paths.
+    """
+    kind = serializers.ChoiceField(choices=[])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['kind'].choices = jobs.get_submittable_kinds(
+            self.context['request'].user)
+
+    def validate(self, attrs):
+        """Validate the payload with the serializer of the kind."""
+        payload = jobs.KINDS[attrs['kind']].serializer(data=self.initial_data)
+        if not payload.is_valid():
+            raise serializers.ValidationError(payload.errors)
+
+        attrs['payload'] = payload.validated_data
+        return attrs
+
+    def create(self, validated_data):
+        """Save uploaded files and queue the job."""
+        payload = {
+            name: self.save_file(value) if isinstance(value, UploadedFile)
+            else value for name, value in validated_data['payload'].items()}
+
+        return jobs.enqueue(validated_data['kind'], payload,
+                            owner=validated_data['owner'])
+
+    def save_file(self, upload):
+        """Save an uploaded file and return its path."""
+        directory = jobs.get_upload_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{uuid.uuid4().hex}{Path(upload.name).suffix}'
+        with open(path, 'wb') as file:
+            for chunk in upload.chunks():
+                file.write(chunk)
+
+        return str(path)
+
+    def to_representation(self, instance):
+        return JobSerializer(instance).data
@@ -1,16 +1,29 @@
 """
 Core API views.
 """
+from django.http import (
+    FileResponse,
+    Http404,
+)
 from rest_framework import (
     generics,
+    pagination,
     permissions,
+    status,
+    views,
 )
+from rest_framework.response import Response
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+
+from core import pool
+from core.models import Job
 from .serializers import (
     CustomTokenObtainPairSerializer,
+    JobSerializer,
+    JobSubmitSerializer,
     UserSerializer,
 )
 
@@ -18,11 +31,13 @@ from .serializers import (
 class CreateUserAPIView(generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
+    throttle_scope = 'register'
 
 
 class CreateTokenPairAPIView(TokenObtainPairView):
     """Create a new auth token for user."""
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'token'
 
 
 class RefreshTokenAPIView(TokenRefreshView):
@@ -38,3 +53,72 @@ class ManageUserAPIView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return the authenticated user."""
         return self.request.user
+
+
+class DatabasePoolsAPIView(views.APIView):
+    """Connection pool statistics of the worker serving the request."""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        """Return statistics of the pools of this process."""
+        return Response(pool.get_stats())
+
+
+class JobPagination(pagination.CursorPagination):
+    """Newest jobs first, by the owner creation index."""
+    ordering = ('-created_date', '-id')
+    page_size = 50
+
+
+class JobListCreateAPIView(generics.ListCreateAPIView):
+    """List jobs of the authenticated user or submit one."""
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = JobPagination
+
+    def get_queryset(self):
+        """Retrieve jobs of the authenticated user."""
+        return Job.objects.filter(owner=self.request.user)
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.request.method == 'POST':
+            return JobSubmitSerializer
+        return JobSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """Queue the job, to be run by a worker."""
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+class JobRetrieveAPIView(generics.RetrieveAPIView):
+    """Status and result of a job of the authenticated user."""
+    serializer_class = JobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        """Retrieve jobs of the authenticated user."""
+        return Job.objects.filter(owner=self.request.user)
+
+
+class JobFileAPIView(JobRetrieveAPIView):
+    """File written by a succeeded job, such as an export."""
+
+    def get(self, request, *args, **kwargs):
+        """Return the file of the job result."""
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED or 'path' not in (job.result or {}):
+            raise Http404
+        try:
+            file = open(job.result['path'], 'rb')
+        except FileNotFoundError:
+            raise Http404
+
+        return FileResponse(
+            file, as_attachment=True,
+            content_type=job.result.get('media_type'),
+            filename=f'job-{job.id}.{job.result.get("format", "dat")}')
@@ -0,0 +1,177 @@
+"""
+Application core authentication.
+
+JWT authentication caching, per process, the tokens it has verified and
+the users it has loaded. Verified tokens are kept in a bounded LRU until
+they expire. Users are kept for JWT_USER_CACHE_TTL seconds, which bounds
+how long another process may keep serving a deactivated user; the process
+handling the change drops its entry at once, see ``invalidate_user``.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    InvalidToken,
+    TokenError,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import (
+    aware_utcnow,
+    get_md5_hash_password,
+)
+
+
+class LRUCache:
+    """Thread safe LRU mapping with optional per entry expiry."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return unexpired value of key or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value of key, for ttl seconds if given."""
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key."""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Remove every key."""
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+token_cache = LRUCache(settings.JWT_TOKEN_CACHE_SIZE)
+user_cache = LRUCache(settings.JWT_USER_CACHE_SIZE)
+
+
+def invalidate_user(user_id):
+    """Drop the cached user now and once the transaction commits.
+
+    The second drop discards a copy cached by a request that read the user
+    before the change was committed.
+    """
+    user_cache.delete(user_id)
+    transaction.on_commit(lambda: user_cache.delete(user_id))
+
+
+def clear_caches():
+    """Drop every cached token and user."""
+    token_cache.clear()
+    user_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication serving verified tokens and users from caches."""
+
+    def get_validated_token(self, raw_token):
+        """Return the verified token, verifying it only once."""
+        validated_token = token_cache.get(raw_token)
+        if validated_token is not None:
+            try:
+                # Tokens check expiry against their creation time by default.
+                validated_token.check_exp(current_time=aware_utcnow())
+                return validated_token
+            except TokenError:
+                token_cache.delete(raw_token)
+
+        validated_token = super().get_validated_token(raw_token)
+        token_cache.set(raw_token, validated_token)
+        return validated_token
+
+    def get_user_id(self, validated_token):
+        """Return id of the token user."""
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+    def check_user(self, user, validated_token):
+        """Return a copy of the user if it may authenticate with the token."""
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'),
+                                       code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != \
+                get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been "
+                                         "changed."), code='password_changed')
+
+        # Requests may modify their user, the cached one stays untouched.
+        return copy.copy(user)
+
+    def get_user(self, validated_token):
+        """Return the token user, loading it at most once per TTL."""
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(
+                    **{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'),
+                                           code='user_not_found')
+            user_cache.set(user_id, user, settings.JWT_USER_CACHE_TTL)
+
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """Authenticate request without blocking the event loop."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Return the token user, loading it with the async ORM."""
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'),
+                                           code='user_not_found')
+            user_cache.set(user_id, user, settings.JWT_USER_CACHE_TTL)
+
+        return self.check_user(user, validated_token)
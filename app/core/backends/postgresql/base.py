@@ -0,0 +1,40 @@
+"""
+PostgreSQL database backend with pooled connections.
+
+Closing a connection, as Django does at the end of every request when
+``CONN_MAX_AGE`` is 0, hands it back to the pool of the worker process
+instead of disconnecting. Pool options are read from the ``POOL`` key of
+the database settings, see ``core.pool.ConnectionPool``.
+"""
+import functools
+
+from django.db.backends.postgresql import base
+
+from core import pool
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection taking its connections from a pool."""
+    creation_class = DatabaseCreation
+    connection_pool = None
+
+    def get_pool(self, conn_params):
+        """Return the pool of this database in the current process."""
+        return pool.get_pool(self.alias, repr(sorted(conn_params.items())),
+                             **self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        """Take a connection from the pool."""
+        self.connection_pool = self.get_pool(conn_params)
+        try:
+            return self.connection_pool.acquire(
+                functools.partial(super().get_new_connection, conn_params))
+        except pool.PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        """Release the connection to its pool."""
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.release(self.connection)
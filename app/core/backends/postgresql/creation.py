@@ -0,0 +1,21 @@
+"""
+Test database creation of the pooled PostgreSQL backend.
+"""
+from django.db.backends.postgresql import creation
+
+from core import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before dropping or cloning databases.
+
+    PostgreSQL refuses both while other sessions are connected.
+    """
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        pool.close_pools()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
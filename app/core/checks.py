@@ -0,0 +1,40 @@
+"""
+Core system checks.
+"""
+from django.conf import settings
+from django.core.checks import (
+    Error,
+    register,
+)
+
+
+# Caches whose entries have to be seen by every process serving requests,
+# along with REPLICA_PIN_CACHE when reading from replicas.
+SHARED_CACHES = ('listings',)
+
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Check shared caches are not local to a process of several."""
+    if settings.WEB_CONCURRENCY <= 1:
+        return []
+
+    aliases = list(SHARED_CACHES)
+    if settings.DATABASE_REPLICAS:
+        aliases.append(settings.REPLICA_PIN_CACHE)
+
+    return [
+        Error(
+            f'The "{alias}" cache is local to each of the '
+            f'{settings.WEB_CONCURRENCY} processes serving requests.',
+            hint='Set REDIS_URL or use a shared backend for the cache, or '
+                 'set WEB_CONCURRENCY to 1.',
+            id='core.E001',
+        )
+        for alias in dict.fromkeys(aliases)
+        if settings.CACHES[alias]['BACKEND'] in PROCESS_CACHE_BACKENDS
+    ]
@@ -0,0 +1,137 @@
+"""
+Background jobs.
+
+Jobs are rows of the ``Job`` table, the queue needs no broker. Apps
+register a handler per job kind, called with the job and returning its
+JSON result, and the run_worker command claims and runs queued jobs.
+Handlers may run more than once for a job, after a failure or a worker
+crash, so they have to be safe to repeat. The lease of a running job is
+renewed in the background, so only jobs of dead workers are claimed
+again.
+"""
+import contextlib
+import os
+import socket
+import threading
+import traceback
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from core.models import Job
+
+
+JobKind = namedtuple('JobKind', ['handler', 'serializer', 'staff_only'])
+
+# Registered job kinds by name.
+KINDS = {}
+
+
+def register(kind, serializer=None, staff_only=False):
+    """Register the decorated function as the handler of kind jobs.
+
+    Jobs submitted through the API have their payload validated by the
+    serializer class, kinds without one can not be submitted. Staff only
+    kinds are submitted by staff users only.
+    """
+    def decorator(handler):
+        KINDS[kind] = JobKind(handler, serializer, staff_only)
+        return handler
+
+    return decorator
+
+
+def get_submittable_kinds(user):
+    """Return names of the kinds user may submit through the API."""
+    return [name for name, kind in KINDS.items()
+            if kind.serializer and (user.is_staff or not kind.staff_only)]
+
+
+def enqueue(kind, payload=None, owner=None, run_after=None):
+    """Queue a job of a registered kind and return it."""
+    if kind not in KINDS:
+        raise ValueError(f'Unknown job kind "{kind}".')
+    return Job.objects.enqueue(kind, payload, owner, run_after)
+
+
+def get_upload_dir():
+    """Return the directory of files uploaded with submitted jobs."""
+    return Path(settings.JOB_FILES_DIR) / 'uploads'
+
+
+def get_files(job):
+    """Return paths of the files of job, uploaded or written by it."""
+    directory = Path(settings.JOB_FILES_DIR)
+    values = [*job.payload.values(), *(job.result or {}).values()]
+    return [Path(value) for value in values
+            if isinstance(value, str) and directory in Path(value).parents]
+
+
+def delete_uploads(job):
+    """Delete the uploaded files of the job payload."""
+    directory = get_upload_dir()
+    for value in job.payload.values():
+        if isinstance(value, str) and Path(value).parent == directory:
+            Path(value).unlink(missing_ok=True)
+
+
+def get_worker_name():
+    """Return a name of this thread unique among workers."""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+@contextlib.contextmanager
+def heartbeat(job, lease):
+    """Renew the lease of job every third of it while the block runs."""
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(lease.total_seconds() / 3):
+                if not job.renew_lease(lease):
+                    break
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job, lease=None):
+    """Run a claimed job recording its result or failure.
+
+    The job lease is renewed while its handler runs. Uploaded files of
+    the job are deleted once it is finished. Return whether the job
+    succeeded.
+    """
+    kind = KINDS.get(job.kind)
+    if kind is None:
+        job.attempts = job.max_attempts
+        finished = job.fail(f'Unknown job kind "{job.kind}".')
+    else:
+        try:
+            with heartbeat(job, lease or settings.JOB_LEASE):
+                result = kind.handler(job)
+        except Exception:
+            finished = job.fail(traceback.format_exc())
+        else:
+            finished = job.succeed(result)
+
+    if finished and job.status in (Job.SUCCEEDED, Job.FAILED):
+        delete_uploads(job)
+    return job.status == Job.SUCCEEDED
+
+
+def work(worker, limit=1, lease=None):
+    """Claim and run up to limit jobs, return the number claimed."""
+    jobs = Job.objects.claim(worker, limit, lease)
+    for job in jobs:
+        run_job(job, lease)
+    return len(jobs)
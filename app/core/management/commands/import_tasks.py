@@ -0,0 +1,369 @@
+"""
+Django command to bulk import tasks from NDJSON or CSV.
+"""
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    connections,
+    router,
+    transaction,
+)
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.models import ImportCheckpoint
+from todo.api.renderers import CSVRenderer
+from todo.cache import invalidate_owner_listings
+from todo.models import (
+    SyncClock,
+    Tag,
+    Task,
+    TaskStats,
+)
+
+
+class ImportTaskSerializer(serializers.Serializer):
+    """Imported task row serializer.
+
+    Accepts rows of the task export, tags given as names, ``{"name": ...}``
+    objects or, in CSV, names joined with the export tags separator.
+    """
+    owner = serializers.EmailField(required=False)
+    label = serializers.CharField(max_length=80)
+    description = serializers.CharField(
+        required=False, allow_blank=True, default='')
+    event_date = serializers.DateTimeField(
+        required=False, allow_null=True, default=None)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES)
+    is_archived = serializers.BooleanField(required=False, default=False)
+    archived_date = serializers.DateTimeField(
+        required=False, allow_null=True, default=None)
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=15), required=False,
+        default=list)
+    recurrence = serializers.ChoiceField(
+        choices=Task.RECURRENCE_CHOICES, required=False, allow_blank=True,
+        default='')
+    recurrence_interval = serializers.IntegerField(
+        min_value=1, max_value=32767, required=False, default=1)
+    recurrence_end = serializers.DateTimeField(
+        required=False, allow_null=True, default=None)
+
+    def to_internal_value(self, data):
+        """Normalize tags before validation."""
+        tags = data.get('tags')
+        if isinstance(tags, str):
+            data = {**data, 'tags': [name for name in
+                                     tags.split(CSVRenderer.TAGS_SEPARATOR)
+                                     if name]}
+        elif isinstance(tags, list):
+            data = {**data, 'tags': [tag.get('name') if isinstance(tag, dict)
+                                     else tag for tag in tags]}
+
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        """Check recurring tasks repeat from an event date until later."""
+        if attrs['recurrence']:
+            if attrs['event_date'] is None:
+                raise serializers.ValidationError(
+                    {'event_date': 'Recurring tasks need an event date.'})
+            end = attrs['recurrence_end']
+            if end is not None and end <= attrs['event_date']:
+                raise serializers.ValidationError(
+                    {'recurrence_end': 'Must be later than event_date.'})
+
+        return attrs
+
+
+class BulkCreateLoader:
+    """Load tasks and their tags with batched INSERTs."""
+
+    def __init__(self, using):
+        self.using = using
+
+    def insert_tasks(self, tasks):
+        """Insert tasks setting their ids."""
+        Task.objects.using(self.using).bulk_create(tasks)
+
+    def insert_task_tags(self, task_tags):
+        """Insert (task id, tag id) memberships."""
+        through = Task.tags.through
+        through.objects.using(self.using).bulk_create(
+            through(task_id=task_id, tag_id=tag_id)
+            for task_id, tag_id in task_tags)
+
+
+class CopyLoader(BulkCreateLoader):
+    """Load tasks and their tags with PostgreSQL COPY.
+
+    COPY returns no ids, so task ids are drawn from the table sequence up
+    front and copied along with the rows.
+    """
+    NULL = r'\N'
+
+    def copy(self, cursor, model, fields, rows):
+        """Copy rows of field values into the model table."""
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(self.NULL if value is None else value
+                            for value in row)
+        buffer.seek(0)
+
+        columns = ', '.join(quote(field.column) for field in fields)
+        cursor.cursor.copy_expert(
+            f"COPY {quote(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{self.NULL}')", buffer)
+
+    def insert_tasks(self, tasks):
+        """Copy tasks setting their ids."""
+        connection = connections[self.using]
+        fields = Task._meta.concrete_fields
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [Task._meta.db_table, Task._meta.pk.column, len(tasks)])
+            for task, (task_id,) in zip(tasks, cursor.fetchall()):
+                task.id = task_id
+
+            self.copy(cursor, Task, fields, (
+                [field.get_db_prep_save(getattr(task, field.attname),
+                                        connection) for field in fields]
+                for task in tasks))
+
+    def insert_task_tags(self, task_tags):
+        """Copy (task id, tag id) memberships."""
+        through = Task.tags.through
+        with connections[self.using].cursor() as cursor:
+            self.copy(cursor, through,
+                      [through._meta.get_field('task'),
+                       through._meta.get_field('tag')], task_tags)
+
+
+class Command(BaseCommand):
+    """Django command to bulk import tasks."""
+    help = ('Import tasks and their tags from NDJSON or CSV, e.g. a task '
+            'export. Progress is checkpointed after every batch and an '
+            'interrupted import resumes where it stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, "-" reads stdin.')
+        parser.add_argument('--format', choices=['ndjson', 'csv'],
+                            help='Input format, guessed from the extension.')
+        parser.add_argument('--owner',
+                            help='Email of the owner of rows without one.')
+        parser.add_argument('--owner-only', action='store_true',
+                            help='Import every row for --owner, ignoring '
+                                 'the owners of rows.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--method', choices=['auto', 'copy', 'bulk'],
+                            default='auto',
+                            help='Load with COPY on PostgreSQL by default.')
+        parser.add_argument('--checkpoint',
+                            help='Checkpoint name, defaults to the path.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and start over.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.using = router.db_for_write(Task)
+        self.loader = self.get_loader(options['method'])
+        self.default_owner = options['owner']
+        self.owner_only = options['owner_only']
+        if self.owner_only and not self.default_owner:
+            raise CommandError('--owner-only requires --owner.')
+        self.users = {}
+
+        checkpoint = self.get_checkpoint(options)
+        if checkpoint.position:
+            self.stdout.write(f'Resuming after row {checkpoint.position}.')
+
+        started = time.monotonic()
+        imported = 0
+        with self.open_input(options['path']) as stream:
+            records = self.read_records(stream, self.get_format(options))
+            records = itertools.islice(records, checkpoint.position, None)
+            while batch := list(
+                    itertools.islice(records, options['batch_size'])):
+                imported += self.import_batch(checkpoint, batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{checkpoint.position} rows read, {imported} imported, '
+                    f'{imported / elapsed:.0f} rows/s')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {checkpoint.imported} tasks, skipped '
+            f'{checkpoint.skipped} rows ({imported / elapsed:.0f} rows/s).'))
+
+    def get_loader(self, method):
+        """Return the task loader for method."""
+        is_postgres = connections[self.using].vendor == 'postgresql'
+        if method == 'copy' and not is_postgres:
+            raise CommandError('COPY is only supported on PostgreSQL.')
+        if method == 'copy' or (method == 'auto' and is_postgres):
+            return CopyLoader(self.using)
+        return BulkCreateLoader(self.using)
+
+    def get_format(self, options):
+        """Return the input format."""
+        if options['format']:
+            return options['format']
+        return 'csv' if Path(options['path']).suffix == '.csv' else 'ndjson'
+
+    def get_checkpoint(self, options):
+        """Return the checkpoint of the import."""
+        name = options['checkpoint']
+        if name is None:
+            if options['path'] == '-':
+                # Without a name stdin imports can not be resumed.
+                return ImportCheckpoint(name='-')
+            name = str(Path(options['path']).resolve())
+
+        checkpoint, _ = ImportCheckpoint.objects.using(self.using) \
+            .get_or_create(name=name)
+        if options['restart']:
+            checkpoint.position = checkpoint.imported = checkpoint.skipped = 0
+        return checkpoint
+
+    def open_input(self, path):
+        """Open the input for reading."""
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'Can not read {path}: {exc}')
+
+    def read_records(self, stream, input_format):
+        """Yield input rows as dicts, or errors for unreadable ones."""
+        if input_format == 'csv':
+            for row in csv.DictReader(stream):
+                # Empty cells are missing values.
+                yield {key: value for key, value in row.items() if value}
+            return
+
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                record = ValueError(f'Invalid JSON: {exc}')
+            if not isinstance(record, (dict, ValueError)):
+                record = ValueError('Row is not an object.')
+            yield record
+
+    def validate_batch(self, position, batch):
+        """Return valid rows of batch, reporting the invalid ones.
+
+        Fields are validated row by row with a single serializer and the
+        owners of the whole batch are looked up in one query.
+        """
+        serializer = ImportTaskSerializer()
+        results = []
+        for record in batch:
+            if isinstance(record, ValueError):
+                results.append((None, str(record)))
+                continue
+            try:
+                results.append((serializer.run_validation(record), None))
+            except serializers.ValidationError as exc:
+                results.append((None, exc.detail))
+
+        emails = {self.default_owner if self.owner_only else
+                  data.get('owner', self.default_owner)
+                  for data, errors in results if data} \
+            - self.users.keys() - {None}
+        self.users.update(
+            get_user_model().objects.using(self.using)
+            .filter(email__in=emails).values_list('email', 'id'))
+
+        rows = []
+        for number, (data, errors) in enumerate(results, start=position + 1):
+            if data is not None:
+                email = self.default_owner if self.owner_only else \
+                    data.get('owner', self.default_owner)
+                if self.users.get(email) is None:
+                    errors = {'owner': [f'Unknown owner "{email}".']}
+            if errors:
+                self.report(number, errors)
+                continue
+
+            data['owner_id'] = self.users[email]
+            rows.append(data)
+
+        return rows
+
+    def report(self, number, errors):
+        """Report an invalid row."""
+        self.stderr.write(f'Row {number} skipped: {errors}')
+
+    def import_batch(self, checkpoint, batch):
+        """Import a batch of rows and advance the checkpoint."""
+        rows = self.validate_batch(checkpoint.position, batch)
+        with transaction.atomic(using=self.using):
+            self.load(rows)
+            checkpoint.position += len(batch)
+            checkpoint.imported += len(rows)
+            checkpoint.skipped += len(batch) - len(rows)
+            if checkpoint.name != '-':
+                checkpoint.save(using=self.using)
+
+        return len(rows)
+
+    def load(self, rows):
+        """Load rows with their tags."""
+        now = timezone.now()
+        owner_rows = defaultdict(list)
+        for row in rows:
+            owner_rows[row['owner_id']].append(row)
+
+        owner_tasks = {}
+        for owner_id, owned in owner_rows.items():
+            seq = SyncClock.objects.advance(owner_id, len(owned))
+            owner_tasks[owner_id] = [
+                Task(owner_id=owner_id, label=row['label'],
+                     description=row['description'],
+                     event_date=row['event_date'], priority=row['priority'],
+                     is_archived=row['is_archived'],
+                     archived_date=row['archived_date'],
+                     recurrence=row['recurrence'],
+                     recurrence_interval=row['recurrence_interval'],
+                     recurrence_end=row['recurrence_end'],
+                     created_date=now, updated_date=now, sync_seq=seq + index)
+                for index, row in enumerate(owned)
+            ]
+
+        self.loader.insert_tasks(
+            [task for tasks in owner_tasks.values() for task in tasks])
+        TaskStats.objects.add_tasks(
+            task for tasks in owner_tasks.values() for task in tasks)
+
+        task_tags = []
+        for owner_id, owned in owner_rows.items():
+            tags = Tag.objects.get_or_create_many(
+                owner_id, (name for row in owned for name in row['tags']))
+            for task, row in zip(owner_tasks[owner_id], owned):
+                task_tags.extend((task.id, tags[name].id)
+                                 for name in dict.fromkeys(row['tags']))
+            invalidate_owner_listings(owner_id)
+
+        if task_tags:
+            self.loader.insert_task_tags(task_tags)
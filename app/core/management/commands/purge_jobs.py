@@ -0,0 +1,62 @@
+"""
+Django command to purge jobs and job files past their retention.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    """Django command to purge old jobs and their files."""
+    help = ('Delete jobs finished before JOB_RETENTION with their files, '
+            'and other job files as old, such as those of crashed runs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - settings.JOB_RETENTION
+        purged = 0
+        while batch := self.purge_batch(cutoff, options['batch_size']):
+            purged += batch
+        files = self.purge_files(cutoff)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged} jobs and {files} orphaned files.'))
+
+    def purge_batch(self, cutoff, batch_size):
+        """Purge one batch of finished jobs and return its size."""
+        batch = list(Job.objects.filter(finished_date__lt=cutoff)
+                     .order_by('finished_date')[:batch_size])
+        for job in batch:
+            for path in jobs.get_files(job):
+                path.unlink(missing_ok=True)
+
+        return Job.objects.filter(id__in=[job.id for job in batch]) \
+            .delete()[0]
+
+    def purge_files(self, cutoff):
+        """Delete job files older than cutoff of no remaining job.
+
+        Return the number deleted.
+        """
+        directory = Path(settings.JOB_FILES_DIR)
+        if not directory.is_dir():
+            return 0
+
+        kept = {path for job in Job.objects.only('payload', 'result')
+                for path in jobs.get_files(job)}
+        purged = 0
+        for path in directory.rglob('*'):
+            if path.is_file() and path not in kept and \
+                    path.stat().st_mtime < cutoff.timestamp():
+                path.unlink(missing_ok=True)
+                purged += 1
+
+        return purged
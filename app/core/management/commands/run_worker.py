@@ -0,0 +1,93 @@
+"""
+Django command to run background jobs.
+"""
+import signal
+import threading
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    close_old_connections,
+    connection,
+)
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    """Django command to claim and run queued jobs until stopped."""
+    help = ('Run queued background jobs, claimed with SKIP LOCKED so any '
+            'number of workers can share the queue.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Jobs run at once, each in its own thread.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Seconds to wait for jobs when the queue is empty.')
+        parser.add_argument(
+            '--lease-seconds', type=int,
+            help='Seconds a job lease lasts unless renewed by the worker, '
+                 'JOB_LEASE by default.')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['concurrency'] < 1 or options['poll_interval'] <= 0:
+            raise CommandError(
+                'Concurrency and poll interval must be positive.')
+        self.options = options
+        self.lease = options['lease_seconds'] and \
+            timezone.timedelta(seconds=options['lease_seconds'])
+        self.stopped = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        self.lock = threading.Lock()
+        self.runs = 0
+        if options['concurrency'] == 1:
+            self.run_loop()
+        else:
+            threads = [threading.Thread(target=self.run_thread)
+                       for _ in range(options['concurrency'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {self.runs} jobs.'))
+
+    def run_thread(self):
+        """Run jobs in a thread closing its connection at the end."""
+        try:
+            self.run_loop()
+        finally:
+            connection.close()
+
+    def run_loop(self):
+        """Claim and run jobs one by one until stopped."""
+        worker = jobs.get_worker_name()
+        while not self.stopped.is_set():
+            # Connections outside a transaction are renewed once broken
+            # or older than CONN_MAX_AGE.
+            if not connection.in_atomic_block:
+                close_old_connections()
+            Job.objects.release_expired()
+            if claimed := jobs.work(worker, lease=self.lease):
+                with self.lock:
+                    self.runs += claimed
+            elif self.options['burst']:
+                break
+            else:
+                self.stopped.wait(self.options['poll_interval'])
+
+    def stop(self, signum, frame):
+        """Stop the workers after their current jobs."""
+        self.stopped.set()
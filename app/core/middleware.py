@@ -0,0 +1,37 @@
+"""
+Application core middleware.
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_budget import (
+    get_view_query_budget,
+    query_budget,
+)
+
+
+class QueryBudgetMiddleware:
+    """Fail requests whose view exceeds its declared query budget.
+
+    Development aid only, it is disabled unless DEBUG is on. It should be
+    the last middleware as it calls the view itself.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Run the view counting its queries."""
+        action, budget = get_view_query_budget(view_func, request.method)
+        if budget is None:
+            return None
+
+        label = f'{view_func.cls.__name__}.{action}'
+        with query_budget(budget, label):
+            return view_func(request, *view_args, **view_kwargs)
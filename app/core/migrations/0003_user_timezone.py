@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:04
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=63, validators=[core.models.validate_timezone]),
+        ),
+    ]
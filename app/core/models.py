@@ -1,12 +1,27 @@
 """
 Application core models.
 """
-from django.db import models
+import zoneinfo
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import (
+    models,
+    transaction,
+)
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
     PermissionsMixin,
 )
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def validate_timezone(value):
+    """Validate value is an IANA time zone name."""
+    if value not in zoneinfo.available_timezones():
+        raise ValidationError(_('Unknown time zone.'), code='invalid')
 
 
 class UserManager(BaseUserManager):
@@ -39,6 +54,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Days of the user, such as today, start at midnight in this zone.
+    timezone = models.CharField(max_length=63, default=settings.TIME_ZONE,
+                                validators=[validate_timezone])
 
     objects = UserManager()
 
@@ -46,3 +64,179 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.name
+
+    def get_timezone(self):
+        """Return the time zone of the user."""
+        return zoneinfo.ZoneInfo(self.timezone)
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of a resumable data import.
+
+    Updated in the transaction loading each batch, so after a crash the
+    import resumes right after the last committed row.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    position = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    skipped = models.BigIntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class JobManager(models.Manager):
+    """Job model manager."""
+
+    def enqueue(self, kind, payload=None, owner=None, run_after=None):
+        """Create and return a queued job of kind."""
+        return self.create(
+            kind=kind, payload=payload or {}, owner=owner,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            run_after=run_after or timezone.now())
+
+    def claim(self, worker, limit=1, lease=None):
+        """Mark up to limit due jobs running by worker and return them.
+
+        Due jobs are locked with SKIP LOCKED, so concurrent workers claim
+        different jobs without waiting for each other. Databases without
+        row locks, such as SQLite, let two workers select the same jobs;
+        only jobs still queued are updated and only those claimed by this
+        call are returned. A job not finished within the lease is claimed
+        again.
+        """
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            ids = list(self.filter(status=Job.QUEUED, run_after__lte=now)
+                       .order_by('run_after', 'id')
+                       .select_for_update(skip_locked=True)
+                       .values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+            self.filter(id__in=ids, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=worker,
+                locked_until=now + (lease or settings.JOB_LEASE),
+                attempts=models.F('attempts') + 1, started_date=now,
+                updated_date=now)
+            return list(self.filter(id__in=ids, status=Job.RUNNING,
+                                    locked_by=worker, started_date=now)
+                        .order_by('run_after', 'id'))
+
+    def release_expired(self):
+        """Requeue running jobs whose lease expired, return their number.
+
+        Their worker is presumed dead, jobs out of attempts fail instead.
+        """
+        now = timezone.now()
+        expired = self.filter(status=Job.RUNNING, locked_until__lt=now)
+        expired.filter(attempts__gte=models.F('max_attempts')).update(
+            status=Job.FAILED, error='Lease expired.', locked_by='',
+            locked_until=None, finished_date=now, updated_date=now)
+        return expired.update(status=Job.QUEUED, run_after=now,
+                              locked_by='', locked_until=None,
+                              updated_date=now)
+
+
+class Job(models.Model):
+    """Background job run by the run_worker command.
+
+    Jobs are claimed by one worker at a time and retried with exponential
+    backoff when they fail, up to max_attempts runs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True,
+                              on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=31)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    result = models.JSONField(null=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    # Queued jobs are not claimed before this, retries are delayed by it.
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_until = models.DateTimeField(null=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+    started_date = models.DateTimeField(null=True)
+    finished_date = models.DateTimeField(null=True)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+            # Due jobs in claiming order.
+            models.Index(fields=['run_after', 'id'],
+                         condition=models.Q(status='queued'),
+                         name='job_queued_idx'),
+            # Running jobs whose lease may have expired.
+            models.Index(fields=['locked_until'],
+                         condition=models.Q(status='running'),
+                         name='job_running_idx'),
+            models.Index(fields=['owner', '-created_date', '-id'],
+                         name='job_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} job {self.id}: {self.status}'
+
+    def get_retry_delay(self):
+        """Return the backoff before retrying the job after a failure."""
+        return min(settings.JOB_RETRY_BACKOFF * 2 ** (self.attempts - 1),
+                   settings.JOB_RETRY_BACKOFF_MAX)
+
+    def succeed(self, result):
+        """Record the result of the job run by its worker.
+
+        Return False when the job was claimed again meanwhile.
+        """
+        return self._finish(status=Job.SUCCEEDED, result=result, error='')
+
+    def renew_lease(self, lease):
+        """Extend the lease of the job run by its worker by lease.
+
+        Return False when the job was claimed again meanwhile.
+        """
+        now = timezone.now()
+        updated = Job.objects.filter(
+            id=self.id, status=Job.RUNNING, locked_by=self.locked_by,
+        ).update(locked_until=now + lease, updated_date=now)
+        return bool(updated)
+
+    def fail(self, error):
+        """Record a failed run, retrying the job while it has attempts.
+
+        Return False when the job was claimed again meanwhile.
+        """
+        now = timezone.now()
+        if self.attempts < self.max_attempts:
+            return self._finish(
+                now, status=Job.QUEUED, error=error, finished=False,
+                run_after=now + self.get_retry_delay())
+        return self._finish(now, status=Job.FAILED, error=error)
+
+    def _finish(self, now=None, finished=True, **fields):
+        now = now or timezone.now()
+        fields.update(locked_by='', locked_until=None, updated_date=now)
+        if finished:
+            fields['finished_date'] = now
+        updated = Job.objects.filter(
+            id=self.id, status=Job.RUNNING, locked_by=self.locked_by,
+        ).update(**fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return bool(updated)
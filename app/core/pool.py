@@ -0,0 +1,260 @@
+"""
+Application core database connection pool.
+
+Every worker process keeps its own pool of open psycopg2 connections per
+database, so requests reuse a connection instead of paying for the
+connection handshake and authentication. Connections idle for a while
+are health checked before reuse, connections past their lifetime or idle
+above the minimum size are closed, and a pool inherited through fork is
+dropped without touching the parent's connections.
+"""
+import collections
+import os
+import threading
+import time
+
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """No connection became available in time."""
+
+
+class ConnectionPool:
+    """Thread safe pool of database connections of one process.
+
+    ``acquire`` takes a callable opening a new connection, used when no
+    idle connection is left and the pool is below ``max_size``. Otherwise
+    it waits up to ``timeout`` seconds for a connection to be released.
+    """
+
+    def __init__(self, alias, min_size=1, max_size=10, max_lifetime=1800,
+                 max_idle=300, check_after=30, timeout=10):
+        self.alias = alias
+        self.pid = os.getpid()
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.timeout = timeout
+        # Open connections and their creation times.
+        self.connections = {}
+        # Connections, creation and release times, last released at end.
+        self.idle = collections.deque()
+        self.opening = 0
+        self.condition = threading.Condition()
+        self.counters = collections.Counter()
+
+    def acquire(self, connect):
+        """Return a pooled connection or a new one opened by connect."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, released = self.checkout(deadline)
+            if connection is None:
+                return self.open(connect)
+            if time.monotonic() - released < self.check_after or \
+                    self.check(connection):
+                self.count('reused')
+                return connection
+            self.count('failed_checks')
+            self.discard(connection)
+
+    def checkout(self, deadline):
+        """Take an idle connection or reserve a slot for a new one.
+
+        Return the connection and its release time, or ``None`` and
+        ``None`` when a slot was reserved.
+        """
+        with self.condition:
+            while True:
+                self.prune()
+                if self.idle:
+                    connection, _, released = self.idle.pop()
+                    return connection, released
+                if self.size < self.max_size:
+                    self.opening += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No connection of "{self.alias}" available after '
+                        f'{self.timeout} seconds.')
+                started = time.monotonic()
+                self.condition.wait(remaining)
+                self.count('waits')
+                self.count('wait_time', time.monotonic() - started)
+
+    def open(self, connect):
+        """Open a connection in a reserved slot."""
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.connections[connection] = time.monotonic()
+            self.counters['opened'] += 1
+        return connection
+
+    def release(self, connection):
+        """Return connection to the pool or close it when unusable."""
+        with self.condition:
+            created = self.connections.get(connection)
+        if created is None:
+            # Not opened by this pool, e.g. before a fork.
+            return
+        if time.monotonic() - created >= self.max_lifetime:
+            self.count('recycled')
+            self.discard(connection)
+        elif not self.reset(connection):
+            self.count('broken')
+            self.discard(connection)
+        else:
+            with self.condition:
+                self.idle.append((connection, created, time.monotonic()))
+                self.condition.notify()
+
+    def prune(self):
+        """Close idle connections past their lifetime or idle too long.
+
+        Must be called holding the pool condition.
+        """
+        now = time.monotonic()
+        kept = collections.deque()
+        # Least recently released first, so the minimum size keeps the
+        # connections that were in use lately.
+        for connection, created, released in self.idle:
+            if now - created >= self.max_lifetime:
+                self.counters['recycled'] += 1
+            elif self.size > self.min_size and \
+                    now - released >= self.max_idle:
+                self.counters['idle_closed'] += 1
+            else:
+                kept.append((connection, created, released))
+                continue
+            del self.connections[connection]
+            self.close(connection)
+        self.idle = kept
+
+    def count(self, name, value=1):
+        """Add value to the counter name."""
+        with self.condition:
+            self.counters[name] += value
+
+    def discard(self, connection):
+        """Close connection and free its slot."""
+        self.close(connection)
+        with self.condition:
+            self.connections.pop(connection, None)
+            self.condition.notify()
+
+    def check(self, connection):
+        """Return whether connection answers a query."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def reset(self, connection):
+        """Roll back the open transaction of connection.
+
+        Return whether connection can be reused.
+        """
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status not in (extensions.TRANSACTION_STATUS_INTRANS,
+                          extensions.TRANSACTION_STATUS_INERROR):
+            return False
+        try:
+            connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def close(self, connection):
+        """Close connection ignoring errors of broken connections."""
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """Close idle connections, in use ones are closed on release."""
+        with self.condition:
+            idle, self.idle = self.idle, collections.deque()
+            for connection, _, _ in idle:
+                self.connections.pop(connection, None)
+            self.condition.notify_all()
+        for connection, _, _ in idle:
+            self.close(connection)
+        self.max_lifetime = 0
+
+    @property
+    def size(self):
+        """Return number of open and opening connections."""
+        return len(self.connections) + self.opening
+
+    def stats(self):
+        """Return size and counters of the pool."""
+        with self.condition:
+            return {
+                'alias': self.alias,
+                'pid': self.pid,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': len(self.connections) - len(self.idle),
+                'opened': self.counters['opened'],
+                'reused': self.counters['reused'],
+                'recycled': self.counters['recycled'],
+                'idle_closed': self.counters['idle_closed'],
+                'failed_checks': self.counters['failed_checks'],
+                'broken': self.counters['broken'],
+                'waits': self.counters['waits'],
+                'wait_time': round(self.counters['wait_time'], 6),
+                'timeouts': self.counters['timeouts'],
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, key, **options):
+    """Return the pool of alias connecting with key in this process."""
+    with _pools_lock:
+        pool = _pools.get((alias, key))
+        if pool is None or pool.pid != os.getpid():
+            # A pool inherited through fork shares sockets with its parent,
+            # leave them to the parent.
+            pool = _pools[alias, key] = ConnectionPool(alias, **options)
+        return pool
+
+
+def get_stats():
+    """Return statistics of the pools of this process."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    return [pool.stats() for pool in pools]
+
+
+def close_pools():
+    """Close idle connections of every pool of this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close_all()
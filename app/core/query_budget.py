@@ -0,0 +1,73 @@
+"""
+Query budget helpers.
+
+Views declare the maximum number of queries each action may run in a
+``query_budget`` mapping of action name to query count, e.g.::
+
+    query_budget = {'list': 3, 'retrieve': 3}
+
+The budget covers everything executed while the view runs, including the
+authentication lookup.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more queries than its budget allows."""
+
+
+class QueryCounter:
+    """Database execute wrapper collecting executed statements."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def get_query_budget(view_cls, action):
+    """Return the query budget declared for a view action or None."""
+    return (getattr(view_cls, 'query_budget', None) or {}).get(action)
+
+
+def get_view_query_budget(view_func, method):
+    """Return the query budget of a routed DRF view for HTTP method."""
+    actions = getattr(view_func, 'actions', None)
+    if not actions:
+        return None, None
+
+    action = actions.get(method.lower())
+    return action, get_query_budget(getattr(view_func, 'cls', None), action)
+
+
+@contextmanager
+def query_budget(budget, label=''):
+    """Raise QueryBudgetExceeded if the block runs more than budget queries."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+    if len(counter) > budget:
+        raise QueryBudgetExceeded(
+            f'{label or "Block"} ran {len(counter)} queries, '
+            f'budget is {budget}:\n' + '\n'.join(counter.queries)
+        )
+
+
+def assert_query_budget(view_cls, action):
+    """Assert the block stays within the budget declared for view action."""
+    budget = get_query_budget(view_cls, action)
+    if budget is None:
+        raise ValueError(
+            f'{view_cls.__name__} declares no query budget for "{action}".')
+
+    return query_budget(budget, f'{view_cls.__name__}.{action}')
@@ -0,0 +1,85 @@
+"""
+Application core read replicas.
+
+Views opting in with ``ReplicaReadMixin`` read from a random database of
+``DATABASE_REPLICAS`` while serving safe requests, everything else reads
+and writes the primary. A user's successful unsafe request pins their
+reads to the primary for ``REPLICA_PIN_SECONDS``, so they see their own
+writes. Pins are kept in the ``REPLICA_PIN_CACHE`` cache shared by the
+workers. The window should exceed the replication lag, listings cached
+from a lagging replica are otherwise served until the next write.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def _pin_key(user_id):
+    return f'replicas:pin:{user_id}'
+
+
+def pin_primary(user_id):
+    """Read data of user from the primary for the pin window."""
+    if settings.DATABASE_REPLICAS:
+        caches[settings.REPLICA_PIN_CACHE].set(
+            _pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def use_replicas(user_id):
+    """Send reads of the current context to replicas unless user is pinned.
+
+    Return token restoring the previous routing with ``reset``.
+    """
+    enabled = bool(settings.DATABASE_REPLICAS) and \
+        not caches[settings.REPLICA_PIN_CACHE].get(_pin_key(user_id), False)
+    return _replica_reads.set(enabled)
+
+
+def reset(token):
+    """Restore the routing before ``use_replicas`` returned token."""
+    _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Route reads of replica enabled contexts to replicas."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Instances read from a replica would be saved to it otherwise.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve safe requests of an API view from replicas."""
+    replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self.replica_token = use_replicas(request.user.id)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_token is not None:
+            reset(self.replica_token)
+            self.replica_token = None
+        elif request.method not in SAFE_METHODS and \
+                response.status_code < 400 and request.user.is_authenticated:
+            pin_primary(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
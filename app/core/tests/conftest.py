@@ -1,6 +1,21 @@
 """Common setup for tests."""
 import pytest
 
+from core.authentication import clear_caches
+from core.throttling import get_bucket_store
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Start every test without cached tokens and users."""
+    clear_caches()
+
+
+@pytest.fixture(autouse=True)
+def clear_throttle_buckets():
+    """Start every test with full throttle buckets."""
+    get_bucket_store().clear()
+
 
 @pytest.fixture
 def create_user(db, django_user_model):
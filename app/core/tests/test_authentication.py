@@ -0,0 +1,160 @@
+"""
+Tests for the cached JWT authentication.
+"""
+import pytest
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import authentication
+from .factories.user_factory import UserFactory
+
+
+ME_URL = reverse('me')
+
+
+def bearer_client(user):
+    """Return API client and raw access token of user."""
+    token = str(AccessToken.for_user(user))
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, token.encode()
+
+
+def count_queries(client, method='get', **kwargs):
+    """Return response and number of queries of a request."""
+    with CaptureQueriesContext(connection) as queries:
+        res = getattr(client, method)(ME_URL, **kwargs)
+    return res, len(queries)
+
+
+class TestLRUCache:
+    """Test the bounded LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used key is evicted over the size."""
+        cache = authentication.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_expires_entries(self):
+        """Test entries are not served past their TTL."""
+        cache = authentication.LRUCache(2)
+        cache.set('a', 1, ttl=0)
+
+        assert cache.get('a') is None
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Test authentication caches tokens and users."""
+
+    def test_user_loaded_once(self):
+        """Test subsequent requests do not query the user."""
+        client, _ = bearer_client(UserFactory())
+
+        res, first = count_queries(client)
+        res, second = count_queries(client)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert first == 1
+        assert second == 0
+
+    def test_token_verified_once(self, monkeypatch):
+        """Test a token signature is verified only once."""
+        client, _ = bearer_client(UserFactory())
+        calls = []
+        verify = JWTAuthentication.get_validated_token
+
+        def counting_verify(self, raw_token):
+            calls.append(raw_token)
+            return verify(self, raw_token)
+
+        monkeypatch.setattr(JWTAuthentication, 'get_validated_token',
+                            counting_verify)
+        client.get(ME_URL)
+        client.get(ME_URL)
+
+        assert len(calls) == 1
+
+    def test_expired_cached_token_rejected(self, monkeypatch):
+        """Test a cached token is verified again once it expires."""
+        client, raw_token = bearer_client(UserFactory())
+        client.get(ME_URL)
+        expired = authentication.aware_utcnow() + timedelta(days=1)
+
+        def reject(self, raw_token):
+            raise InvalidToken()
+
+        monkeypatch.setattr(authentication, 'aware_utcnow', lambda: expired)
+        monkeypatch.setattr(JWTAuthentication, 'get_validated_token', reject)
+        res = client.get(ME_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert authentication.token_cache.get(raw_token) is None
+
+    def test_user_cache_expires(self, settings):
+        """Test users are reloaded after the TTL."""
+        settings.JWT_USER_CACHE_TTL = 0
+        client, _ = bearer_client(UserFactory())
+        client.get(ME_URL)
+
+        res, queries = count_queries(client)
+
+        assert queries == 1
+
+    def test_inactive_user_rejected(self):
+        """Test deactivated users are rejected once invalidated."""
+        user = UserFactory()
+        client, _ = bearer_client(user)
+        client.get(ME_URL)
+
+        user.is_active = False
+        user.save()
+        authentication.invalidate_user(user.pk)
+        res = client.get(ME_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_change_invalidates_user(self):
+        """Test changing the password drops the cached user."""
+        user = UserFactory()
+        client, _ = bearer_client(user)
+        client.get(ME_URL)
+
+        res = client.patch(ME_URL, {'password': 'newpassword123'})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert authentication.user_cache.get(user.pk) is None
+
+        res, queries = count_queries(client)
+
+        assert queries == 1
+        assert authentication.user_cache.get(user.pk) \
+            .check_password('newpassword123')
+
+    def test_cached_user_not_shared(self):
+        """Test requests get their own copy of the cached user."""
+        user = UserFactory()
+        auth = authentication.CachedJWTAuthentication()
+        token = auth.get_validated_token(
+            str(AccessToken.for_user(user)).encode())
+
+        auth.get_user(token).name = 'Changed'
+
+        assert auth.get_user(token).name == user.name
@@ -0,0 +1,53 @@
+"""
+Tests for the core system checks.
+"""
+from core.checks import check_shared_caches
+
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+REDIS = 'django.core.cache.backends.redis.RedisCache'
+
+
+def set_listings_backend(settings, backend):
+    """Use backend for the listings cache."""
+    settings.CACHES = {**settings.CACHES, 'listings': {'BACKEND': backend}}
+
+
+def test_local_cache_single_process(settings):
+    """Test process local caches are allowed for one process."""
+    settings.WEB_CONCURRENCY = 1
+    set_listings_backend(settings, LOCMEM)
+
+    assert check_shared_caches(None) == []
+
+
+def test_local_cache_several_processes(settings):
+    """Test process local caches are refused for several processes."""
+    settings.WEB_CONCURRENCY = 4
+    set_listings_backend(settings, LOCMEM)
+
+    errors = check_shared_caches(None)
+
+    assert [error.id for error in errors] == ['core.E001']
+    assert '"listings"' in errors[0].msg
+
+
+def test_shared_cache_several_processes(settings):
+    """Test shared caches are allowed for several processes."""
+    settings.WEB_CONCURRENCY = 4
+    set_listings_backend(settings, REDIS)
+
+    assert check_shared_caches(None) == []
+
+
+def test_local_replica_pin_cache(settings):
+    """Test replica pins have to be seen by every process."""
+    settings.WEB_CONCURRENCY = 4
+    settings.DATABASE_REPLICAS = ['replica0']
+    settings.REPLICA_PIN_CACHE = 'default'
+    set_listings_backend(settings, REDIS)
+
+    errors = check_shared_caches(None)
+
+    assert [error.id for error in errors] == ['core.E001']
+    assert '"default"' in errors[0].msg
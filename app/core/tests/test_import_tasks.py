@@ -0,0 +1,243 @@
+"""
+Tests for the import_tasks command.
+"""
+import json
+from io import StringIO
+
+import pytest
+
+from django.core.management import (
+    CommandError,
+    call_command,
+)
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.management.commands import import_tasks
+from core.models import ImportCheckpoint
+from todo import recurrence
+from todo.models import (
+    Tag,
+    Task,
+)
+from .factories.user_factory import UserFactory
+
+
+def write_ndjson(path, rows):
+    """Write rows to an NDJSON file."""
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    return path
+
+
+def import_file(path, **options):
+    """Run the command and return its (stdout, stderr)."""
+    stdout, stderr = StringIO(), StringIO()
+    call_command('import_tasks', str(path), stdout=stdout, stderr=stderr,
+                 **options)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportTasksCommand:
+    """Test bulk importing tasks."""
+
+    def test_import_ndjson(self, tmp_path):
+        """Test tasks are imported with their tags and owners."""
+        owner, other = UserFactory.create_batch(2)
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [
+            {'label': 'First', 'priority': 3, 'tags': ['home', 'work']},
+            {'label': 'Second', 'priority': 0, 'description': 'Text',
+             'event_date': '2023-05-01 10:00:00',
+             'tags': [{'name': 'home'}, {'name': 'home'}]},
+            {'owner': other.email, 'label': 'Other', 'priority': 1,
+             'tags': ['home']},
+        ])
+
+        stdout, stderr = import_file(path, owner=owner.email, batch_size=2)
+
+        assert 'rows/s' in stdout
+        assert stderr == ''
+        tasks = Task.objects.order_by('id')
+        assert [(t.owner, t.label) for t in tasks] == [
+            (owner, 'First'), (owner, 'Second'), (other, 'Other')]
+        assert tasks[1].event_date.hour == 10
+        assert sorted(tasks[0].tags.values_list('name', flat=True)) == \
+            ['home', 'work']
+        assert list(tasks[1].tags.values_list('name', flat=True)) == ['home']
+        assert Tag.objects.filter(owner=owner).count() == 2
+        assert Tag.objects.filter(owner=other).count() == 1
+        assert len({t.sync_seq for t in tasks.filter(owner=owner)}) == 2
+
+    def test_import_csv(self, tmp_path):
+        """Test CSV rows of a task export are imported."""
+        owner = UserFactory()
+        path = tmp_path / 'tasks.csv'
+        path.write_text(
+            'id,label,event_date,priority,tags,description,is_archived\n'
+            '7,First,,2,home|work,,false\n'
+            '8,Second,2023-05-01 10:00:00,1,,"Multi\nline",true\n')
+
+        import_file(path, owner=owner.email)
+
+        first, second = Task.objects.order_by('id')
+        assert first.event_date is None
+        assert sorted(first.tags.values_list('name', flat=True)) == \
+            ['home', 'work']
+        assert second.description == 'Multi\nline'
+        assert second.is_archived
+        assert not second.tags.exists()
+
+    def test_invalid_rows_skipped(self, tmp_path):
+        """Test invalid rows are reported and the valid ones imported."""
+        owner = UserFactory()
+        path = tmp_path / 'tasks.ndjson'
+        path.write_text(
+            json.dumps({'label': 'Valid', 'priority': 1}) + '\n'
+            + '{broken\n'
+            + json.dumps({'label': 'Bad priority', 'priority': 9}) + '\n'
+            + json.dumps({'label': 'Nobody', 'priority': 1,
+                          'owner': 'nobody@example.com'}) + '\n')
+
+        stdout, stderr = import_file(path, owner=owner.email)
+
+        assert list(Task.objects.values_list('label', flat=True)) == \
+            ['Valid']
+        assert 'Row 2 skipped' in stderr
+        assert 'Row 3 skipped' in stderr
+        assert 'Row 4 skipped' in stderr
+        assert 'skipped 3 rows' in stdout
+
+    def test_invalid_recurrence_skipped(self, tmp_path):
+        """Test recurring rows are validated like the task API does."""
+        owner = UserFactory()
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [
+            {'label': 'No date', 'priority': 1,
+             'recurrence': recurrence.DAILY},
+            {'label': 'Early end', 'priority': 1,
+             'recurrence': recurrence.DAILY,
+             'event_date': '2023-05-02 10:00:00',
+             'recurrence_end': '2023-05-01 10:00:00'},
+            {'label': 'Bad rule', 'priority': 1, 'recurrence': 'hourly',
+             'event_date': '2023-05-02 10:00:00'},
+            {'label': 'Bad interval', 'priority': 1,
+             'recurrence': recurrence.DAILY, 'recurrence_interval': 0,
+             'event_date': '2023-05-02 10:00:00'},
+        ])
+
+        _, stderr = import_file(path, owner=owner.email)
+
+        assert not Task.objects.exists()
+        assert 'Recurring tasks need an event date.' in stderr
+        assert 'Must be later than event_date.' in stderr
+        assert 'Row 3 skipped' in stderr
+        assert 'Row 4 skipped' in stderr
+
+    @pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+    def test_export_round_trip(self, tmp_path, export_format):
+        """Test an exported task list is imported unchanged."""
+        owner, other = UserFactory(), UserFactory()
+        event_date = timezone.now().replace(microsecond=0)
+        Task.objects.create(
+            owner=owner, label='Weekly', priority=1, event_date=event_date,
+            recurrence=recurrence.WEEKLY, recurrence_interval=2,
+            recurrence_end=event_date + timezone.timedelta(days=60))
+        Task.objects.create(owner=owner, label='Once', priority=3,
+                            event_date=event_date)
+        client = APIClient()
+        client.force_authenticate(owner)
+        res = client.get(reverse('task-export'), {'format': export_format})
+        path = tmp_path / f'tasks.{export_format}'
+        path.write_bytes(b''.join(res.streaming_content))
+
+        _, stderr = import_file(path, owner=other.email, owner_only=True)
+
+        columns = ['label', 'priority', 'event_date', 'recurrence',
+                   'recurrence_interval', 'recurrence_end']
+        assert stderr == ''
+        assert list(Task.objects.filter(owner=other).order_by('id')
+                    .values_list(*columns)) == \
+            list(Task.objects.filter(owner=owner).order_by('id')
+                 .values_list(*columns))
+
+    def test_owner_only(self, tmp_path):
+        """Test row owners are ignored importing for one owner."""
+        owner, other = UserFactory(), UserFactory()
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [
+            {'label': 'Own', 'priority': 1},
+            {'label': 'Other', 'priority': 1, 'owner': other.email},
+        ])
+
+        import_file(path, owner=owner.email, owner_only=True)
+
+        assert set(Task.objects.values_list('owner', flat=True)) == \
+            {owner.id}
+        with pytest.raises(CommandError):
+            import_file(path, owner_only=True)
+
+    def test_resume_after_crash(self, tmp_path, monkeypatch):
+        """Test an interrupted import resumes after the last batch."""
+        owner = UserFactory()
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [
+            {'label': f'Task{i}', 'priority': 1, 'tags': ['tag']}
+            for i in range(5)
+        ])
+        load = import_tasks.Command.load
+        calls = []
+
+        def crash_on_second_batch(self, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('Crash')
+            return load(self, rows)
+
+        monkeypatch.setattr(import_tasks.Command, 'load',
+                            crash_on_second_batch)
+        with pytest.raises(RuntimeError):
+            import_file(path, owner=owner.email, batch_size=2)
+
+        assert Task.objects.count() == 2
+        assert ImportCheckpoint.objects.get().position == 2
+
+        monkeypatch.setattr(import_tasks.Command, 'load', load)
+        stdout, _ = import_file(path, owner=owner.email, batch_size=2)
+
+        assert 'Resuming after row 2' in stdout
+        assert list(Task.objects.order_by('id')
+                    .values_list('label', flat=True)) == \
+            [f'Task{i}' for i in range(5)]
+        assert Tag.objects.count() == 1
+
+        import_file(path, owner=owner.email)
+        assert Task.objects.count() == 5
+
+        import_file(path, owner=owner.email, restart=True)
+        assert Task.objects.count() == 10
+
+    def test_copy_requires_postgres(self, tmp_path):
+        """Test COPY is refused on other databases."""
+        if connection.vendor == 'postgresql':
+            pytest.skip('COPY is supported.')
+
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [])
+        with pytest.raises(CommandError):
+            import_file(path, method='copy')
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='COPY requires PostgreSQL.')
+    def test_import_with_copy(self, tmp_path):
+        """Test COPY loads the same tasks as INSERTs."""
+        owner = UserFactory()
+        path = write_ndjson(tmp_path / 'tasks.ndjson', [
+            {'label': 'First', 'priority': 3, 'tags': ['home']},
+            {'label': 'Second', 'priority': 0, 'event_date': None},
+        ])
+
+        import_file(path, owner=owner.email, method='copy')
+
+        first, second = Task.objects.order_by('id')
+        assert first.description == ''
+        assert list(first.tags.values_list('name', flat=True)) == ['home']
+        assert second.event_date is None
+        assert Task.objects.create(owner=owner, label='New', priority=1)
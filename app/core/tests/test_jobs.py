@@ -0,0 +1,359 @@
+"""
+Tests for background jobs.
+"""
+import os
+import time
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job
+from .factories.user_factory import UserFactory
+
+
+JOBS_URL = reverse('jobs')
+
+
+def job_url(job_id):
+    """Return the job detail URL."""
+    return reverse('job', args=[job_id])
+
+
+@pytest.fixture
+def runs():
+    """Register test job kinds and return the payloads they ran."""
+    runs = []
+
+    def echo(job):
+        runs.append(job.payload)
+        return {'echo': job.payload}
+
+    def broken(job):
+        runs.append(job.payload)
+        raise RuntimeError('Broken job.')
+
+    jobs.register('echo')(echo)
+    jobs.register('broken')(broken)
+    yield runs
+    del jobs.KINDS['echo'], jobs.KINDS['broken']
+
+
+@pytest.fixture
+def files_dir(settings, tmp_path):
+    """Keep job files in a temporary directory."""
+    settings.JOB_FILES_DIR = str(tmp_path)
+    return tmp_path
+
+
+def run_worker(**options):
+    """Run the worker until no job is due and return its output."""
+    stdout = StringIO()
+    call_command('run_worker', burst=True, stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    """Test claiming and running jobs."""
+
+    def test_claim_due_jobs_in_order(self, runs):
+        """Test due jobs are claimed oldest first, once."""
+        now = timezone.now()
+        later = jobs.enqueue('echo', run_after=now + timezone.timedelta(1))
+        second = jobs.enqueue('echo', run_after=now)
+        first = jobs.enqueue('echo',
+                             run_after=now - timezone.timedelta(seconds=1))
+
+        claimed = Job.objects.claim('worker', limit=5)
+
+        assert [job.id for job in claimed] == [first.id, second.id]
+        assert {(job.status, job.locked_by, job.attempts)
+                for job in claimed} == {(Job.RUNNING, 'worker', 1)}
+        assert Job.objects.claim('other') == []
+        later.refresh_from_db()
+        assert later.status == Job.QUEUED
+
+    def test_claim_race_lost(self, monkeypatch, runs):
+        """Test jobs claimed by another worker meanwhile are not returned."""
+        first = jobs.enqueue('echo')
+        second = jobs.enqueue('echo')
+        update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another worker selected the same jobs and claimed one first.
+            monkeypatch.setattr(QuerySet, 'update', update)
+            Job.objects.filter(id=first.id).update(
+                status=Job.RUNNING, locked_by='other', attempts=1)
+            return update(queryset, **kwargs)
+
+        monkeypatch.setattr(QuerySet, 'update', racing_update)
+        claimed = Job.objects.claim('worker', limit=2)
+
+        assert [job.id for job in claimed] == [second.id]
+        first.refresh_from_db()
+        assert (first.locked_by, first.attempts) == ('other', 1)
+
+    def test_job_succeeds(self, runs):
+        """Test a job run records its result."""
+        job = jobs.enqueue('echo', {'value': 1})
+
+        assert jobs.work('worker') == 1
+
+        job.refresh_from_db()
+        assert runs == [{'value': 1}]
+        assert (job.status, job.result, job.locked_by) == \
+            (Job.SUCCEEDED, {'echo': {'value': 1}}, '')
+        assert job.finished_date is not None
+
+    def test_failure_retried_with_backoff(self, settings, runs):
+        """Test failed jobs are retried after a doubling backoff."""
+        settings.JOB_MAX_ATTEMPTS = 3
+        job = jobs.enqueue('broken')
+
+        delays = []
+        for _ in range(3):
+            Job.objects.filter(id=job.id).update(run_after=timezone.now())
+            jobs.work('worker')
+            job.refresh_from_db()
+            delays.append(job.run_after - job.updated_date)
+
+        assert len(runs) == 3
+        assert job.status == Job.FAILED
+        assert 'RuntimeError: Broken job.' in job.error
+        assert delays[:2] == [settings.JOB_RETRY_BACKOFF,
+                              2 * settings.JOB_RETRY_BACKOFF]
+
+    def test_backoff_capped(self, settings):
+        """Test the retry backoff does not exceed its maximum."""
+        job = Job(attempts=30)
+
+        assert job.get_retry_delay() == settings.JOB_RETRY_BACKOFF_MAX
+
+    def test_unknown_kind_fails(self):
+        """Test jobs of kinds no longer registered fail at once."""
+        job = Job.objects.enqueue('gone')
+
+        jobs.work('worker')
+
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == (Job.FAILED, 1)
+
+    def test_enqueue_unknown_kind_rejected(self):
+        """Test only registered kinds are queued."""
+        with pytest.raises(ValueError):
+            jobs.enqueue('gone')
+
+    def test_expired_lease_released(self, settings, runs):
+        """Test jobs of dead workers are retried, and fail when out of runs.
+        """
+        settings.JOB_MAX_ATTEMPTS = 2
+        retried, exhausted = (jobs.enqueue('echo') for _ in range(2))
+        Job.objects.claim('dead', limit=2)
+        Job.objects.filter(id=exhausted.id).update(attempts=2)
+        Job.objects.update(
+            locked_until=timezone.now() - timezone.timedelta(seconds=1))
+
+        assert Job.objects.release_expired() == 1
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        assert (retried.status, retried.locked_by) == (Job.QUEUED, '')
+        assert (exhausted.status, exhausted.error) == \
+            (Job.FAILED, 'Lease expired.')
+
+    def test_reclaimed_job_not_finished_by_old_worker(self, runs):
+        """Test a worker whose lease expired can not finish the job."""
+        jobs.enqueue('echo')
+        job, = Job.objects.claim('dead')
+        Job.objects.filter(id=job.id).update(locked_by='other')
+
+        assert not job.succeed({})
+
+        job.refresh_from_db()
+        assert job.status == Job.RUNNING
+
+    def test_renew_lease(self, runs):
+        """Test only the worker running a job renews its lease."""
+        jobs.enqueue('echo')
+        job, = Job.objects.claim('worker')
+        Job.objects.update(
+            locked_until=timezone.now() - timezone.timedelta(seconds=1))
+
+        assert job.renew_lease(timezone.timedelta(minutes=1))
+        assert Job.objects.release_expired() == 0
+        Job.objects.update(locked_by='other')
+        assert not job.renew_lease(timezone.timedelta(minutes=1))
+
+    def test_uploads_deleted_once_finished(self, settings, runs, files_dir):
+        """Test uploaded files are kept for retries only."""
+        settings.JOB_MAX_ATTEMPTS = 2
+        upload = jobs.get_upload_dir() / 'upload.ndjson'
+        upload.parent.mkdir()
+        upload.touch()
+        job = jobs.enqueue('broken', {'file': str(upload)})
+
+        jobs.work('worker')
+        retried = upload.exists()
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        jobs.work('worker')
+
+        assert retried
+        assert not upload.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lease_renewed_while_running():
+    """Test the lease of a job outliving it is renewed until it ends."""
+    leases = []
+
+    def slow(job):
+        for _ in range(3):
+            leases.append(Job.objects.get(id=job.id).locked_until)
+            time.sleep(0.2)
+
+    jobs.register('slow')(slow)
+    try:
+        job = jobs.enqueue('slow')
+        jobs.work('worker', lease=timezone.timedelta(seconds=0.3))
+    finally:
+        del jobs.KINDS['slow']
+
+    job.refresh_from_db()
+    assert job.status == Job.SUCCEEDED
+    assert leases == sorted(set(leases))
+
+
+@pytest.mark.django_db
+class TestRunWorkerCommand:
+    """Test the run_worker command."""
+
+    def test_runs_due_jobs(self, runs):
+        """Test the worker runs due jobs and exits in burst mode."""
+        for value in range(3):
+            jobs.enqueue('echo', {'value': value})
+        jobs.enqueue('broken')
+
+        output = run_worker()
+
+        assert 'Ran 4 jobs.' in output
+        assert runs == [{'value': value} for value in range(3)] + [{}]
+        assert Job.objects.filter(status=Job.SUCCEEDED).count() == 3
+        assert Job.objects.get(kind='broken').status == Job.QUEUED
+
+
+@pytest.mark.django_db
+class TestPurgeJobsCommand:
+    """Test the purge_jobs command."""
+
+    def make_file(self, path, age=None):
+        """Create a job file, age old, and return its path."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        if age is not None:
+            mtime = (timezone.now() - age).timestamp()
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_purges_old_jobs_and_files(self, settings, files_dir):
+        """Test old finished jobs, their files and orphans are deleted."""
+        old = settings.JOB_RETENTION + timezone.timedelta(hours=1)
+        expired_output = self.make_file(files_dir / 'job-1-tasks.csv')
+        expired = Job.objects.enqueue('export')
+        Job.objects.filter(id=expired.id).update(
+            status=Job.SUCCEEDED, finished_date=timezone.now() - old,
+            result={'path': str(expired_output)})
+        recent_output = self.make_file(files_dir / 'job-2-tasks.csv', old)
+        recent = Job.objects.enqueue('export')
+        Job.objects.filter(id=recent.id).update(
+            status=Job.SUCCEEDED, finished_date=timezone.now(),
+            result={'path': str(recent_output)})
+        queued_upload = self.make_file(files_dir / 'uploads' / 'a.csv', old)
+        Job.objects.enqueue('import', {'file': str(queued_upload)})
+        orphan = self.make_file(files_dir / 'job-3-tasks.csv.x.tmp', old)
+        fresh = self.make_file(files_dir / 'job-4-tasks.csv.y.tmp')
+
+        output = StringIO()
+        call_command('purge_jobs', stdout=output)
+
+        assert 'Purged 1 jobs and 1 orphaned files.' in output.getvalue()
+        assert not Job.objects.filter(id=expired.id).exists()
+        assert not expired_output.exists() and not orphan.exists()
+        assert recent_output.exists() and queued_upload.exists()
+        assert fresh.exists()
+
+
+@pytest.mark.django_db
+class TestJobsAPI:
+    """Test submitting jobs and reading their status."""
+
+    @pytest.fixture
+    def user(self):
+        return UserFactory()
+
+    @pytest.fixture
+    def api_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_auth_required(self):
+        """Test jobs are not available anonymously."""
+        res = APIClient().get(JOBS_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_submit_and_follow(self, api_client, user, files_dir):
+        """Test a submitted job is queued and its result then shown."""
+        res = api_client.post(JOBS_URL, {'kind': 'export', 'format': 'csv'})
+
+        assert res.status_code == status.HTTP_202_ACCEPTED
+        assert res.data['status'] == Job.QUEUED
+        job = Job.objects.get(id=res.data['id'])
+        assert (job.owner, job.payload) == (user, {'format': 'csv'})
+
+        run_worker()
+        res = api_client.get(job_url(job.id))
+        file = api_client.get(reverse('job_file', args=[job.id]))
+
+        assert res.data['status'] == Job.SUCCEEDED
+        assert file.status_code == status.HTTP_200_OK
+        assert b''.join(file.streaming_content).startswith(b'id,')
+
+    def test_invalid_payload_rejected(self, api_client):
+        """Test payloads are validated by the serializer of the kind."""
+        res = api_client.post(JOBS_URL, {'kind': 'export', 'format': 'xml'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'format' in res.data
+        assert not Job.objects.exists()
+
+    def test_staff_only_kind(self, api_client, user):
+        """Test staff only kinds are rejected for other users."""
+        res = api_client.post(JOBS_URL, {'kind': 'rebuild_task_stats'})
+        user.is_staff = True
+        user.save()
+        staff = api_client.post(JOBS_URL, {'kind': 'rebuild_task_stats'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert staff.status_code == status.HTTP_202_ACCEPTED
+
+    def test_only_own_jobs(self, api_client, user):
+        """Test jobs of other users are neither listed nor shown."""
+        own = Job.objects.enqueue('export', owner=user)
+        other = Job.objects.enqueue('export', owner=UserFactory())
+
+        listed = api_client.get(JOBS_URL)
+        res = api_client.get(job_url(other.id))
+        file = api_client.get(reverse('job_file', args=[own.id]))
+
+        assert [job['id'] for job in listed.data['results']] == [own.id]
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert file.status_code == status.HTTP_404_NOT_FOUND
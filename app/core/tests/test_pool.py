@@ -0,0 +1,300 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+from unittest import mock
+
+import psycopg2
+import pytest
+
+from django.db import connection
+from django.db.backends.postgresql import base
+from django.urls import reverse
+from psycopg2 import extensions
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import pool
+from core.backends.postgresql.base import DatabaseWrapper
+from .factories.user_factory import (
+    SuperuserFactory,
+    UserFactory,
+)
+
+
+POOLS_URL = reverse('db_pools')
+
+
+class FakeConnection:
+    """Stand-in of a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.alive = True
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        if not self.alive:
+            raise psycopg2.OperationalError('server closed the connection')
+        return mock.MagicMock()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections_pool():
+    """Return a pool factory and the connections it opened."""
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    def make_pool(**options):
+        connection_pool = pool.ConnectionPool('test', **options)
+        connection_pool.connect = connect
+        return connection_pool
+
+    make_pool.opened = opened
+    return make_pool
+
+
+def acquire(connection_pool):
+    """Acquire a connection opened by the fixture connect."""
+    return connection_pool.acquire(connection_pool.connect)
+
+
+class TestConnectionPool:
+    """Test pooling of connections."""
+
+    def test_connection_reused(self, connections_pool):
+        """Test released connections are handed out again."""
+        connection_pool = connections_pool()
+
+        first = acquire(connection_pool)
+        connection_pool.release(first)
+        second = acquire(connection_pool)
+
+        assert second is first
+        assert len(connections_pool.opened) == 1
+        stats = connection_pool.stats()
+        assert stats['opened'] == 1
+        assert stats['reused'] == 1
+        assert stats['in_use'] == 1
+
+    def test_max_size_timeout(self, connections_pool):
+        """Test acquiring beyond the max size times out."""
+        connection_pool = connections_pool(max_size=1, timeout=0.01)
+        acquire(connection_pool)
+
+        with pytest.raises(pool.PoolTimeout):
+            acquire(connection_pool)
+
+        assert connection_pool.stats()['timeouts'] == 1
+
+    def test_waits_for_release(self, connections_pool):
+        """Test a full pool hands out a connection once released."""
+        connection_pool = connections_pool(max_size=1, timeout=5)
+        first = acquire(connection_pool)
+        timer = threading.Timer(0.05, connection_pool.release, [first])
+        timer.start()
+
+        second = acquire(connection_pool)
+        timer.join()
+
+        assert second is first
+        assert connection_pool.stats()['waits'] >= 1
+
+    def test_failed_health_check_replaced(self, connections_pool):
+        """Test idle connections failing the check are replaced."""
+        connection_pool = connections_pool(check_after=0)
+        first = acquire(connection_pool)
+        connection_pool.release(first)
+        first.alive = False
+
+        second = acquire(connection_pool)
+
+        assert second is not first
+        assert first.closed
+        assert connection_pool.stats()['failed_checks'] == 1
+        assert connection_pool.size == 1
+
+    def test_recently_used_not_checked(self, connections_pool):
+        """Test connections released lately skip the health check."""
+        connection_pool = connections_pool(check_after=60)
+        first = acquire(connection_pool)
+        connection_pool.release(first)
+        first.alive = False
+
+        assert acquire(connection_pool) is first
+
+    def test_old_connections_recycled(self, connections_pool):
+        """Test connections past their lifetime are closed."""
+        connection_pool = connections_pool(max_lifetime=0)
+        first = acquire(connection_pool)
+
+        connection_pool.release(first)
+
+        assert first.closed
+        assert connection_pool.size == 0
+        assert connection_pool.stats()['recycled'] == 1
+
+    def test_idle_closed_above_min_size(self, connections_pool):
+        """Test idle connections are closed down to the min size."""
+        connection_pool = connections_pool(min_size=1, max_idle=0)
+        connections = [acquire(connection_pool) for _ in range(3)]
+        for opened in connections:
+            connection_pool.release(opened)
+
+        last = acquire(connection_pool)
+
+        assert last is connections[-1]
+        assert [opened.closed for opened in connections] == [1, 1, 0]
+        assert connection_pool.stats()['idle_closed'] == 2
+
+    def test_open_transaction_rolled_back(self, connections_pool):
+        """Test transactions left open are rolled back on release."""
+        connection_pool = connections_pool()
+        first = acquire(connection_pool)
+        first.status = extensions.TRANSACTION_STATUS_INERROR
+
+        connection_pool.release(first)
+
+        assert first.rollbacks == 1
+        assert acquire(connection_pool) is first
+
+    @pytest.mark.parametrize('broken', ['closed', 'unknown'])
+    def test_broken_connection_discarded(self, connections_pool, broken):
+        """Test closed or lost connections are not reused."""
+        connection_pool = connections_pool()
+        first = acquire(connection_pool)
+        if broken == 'closed':
+            first.closed = 2
+        else:
+            first.status = extensions.TRANSACTION_STATUS_UNKNOWN
+
+        connection_pool.release(first)
+
+        assert connection_pool.size == 0
+        assert acquire(connection_pool) is not first
+
+    def test_failed_connect_frees_slot(self, connections_pool):
+        """Test a failed connect does not leak its slot."""
+        connection_pool = connections_pool(max_size=1, timeout=0.01)
+
+        def refuse():
+            raise psycopg2.OperationalError('connection refused')
+
+        with pytest.raises(psycopg2.OperationalError):
+            connection_pool.acquire(refuse)
+
+        assert acquire(connection_pool)
+
+    def test_pool_not_shared_after_fork(self, monkeypatch):
+        """Test a child process gets its own pool."""
+        parent = pool.get_pool('fork', 'key')
+        monkeypatch.setattr(pool.os, 'getpid', lambda: parent.pid + 1)
+
+        child = pool.get_pool('fork', 'key')
+
+        assert child is not parent
+        assert pool.get_pool('fork', 'key') is child
+        pool.close_pools()
+
+
+class TestPooledBackend:
+    """Test the pooled PostgreSQL backend."""
+
+    @pytest.fixture
+    def wrapper(self, monkeypatch):
+        """Return backend wrapper connecting to stand-in connections."""
+        monkeypatch.setattr(base.DatabaseWrapper, 'get_new_connection',
+                            lambda self, conn_params: FakeConnection())
+        yield DatabaseWrapper({
+            'NAME': 'todo', 'USER': '', 'PASSWORD': '', 'HOST': '',
+            'PORT': '', 'OPTIONS': {}, 'TIME_ZONE': None, 'TEST': {},
+            'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'POOL': {'max_size': 1, 'timeout': 0.01},
+        }, alias='pooled')
+        pool.close_pools()
+
+    def test_close_returns_connection(self, wrapper):
+        """Test closing the connection releases it to the pool."""
+        wrapper.connection = wrapper.get_new_connection({'dbname': 'todo'})
+        first = wrapper.connection
+
+        wrapper.close()
+        wrapper.connection = wrapper.get_new_connection({'dbname': 'todo'})
+
+        assert wrapper.connection is first
+        assert not first.closed
+        stats, = pool.get_stats()
+        assert stats['alias'] == 'pooled'
+        assert stats['reused'] == 1
+
+    def test_exhausted_pool_raises_operational_error(self, wrapper):
+        """Test a pool timeout surfaces as a database error."""
+        wrapper.get_new_connection({'dbname': 'todo'})
+
+        with pytest.raises(psycopg2.OperationalError):
+            wrapper.get_new_connection({'dbname': 'todo'})
+
+    def test_pools_per_connection_params(self, wrapper):
+        """Test databases of other names get their own pool."""
+        first = wrapper.get_new_connection({'dbname': 'todo'})
+        wrapper.connection_pool.release(first)
+
+        assert wrapper.get_new_connection({'dbname': 'test_todo'}) \
+            is not first
+
+    @pytest.mark.django_db(transaction=True)
+    def test_postgres_connection_reused(self):
+        """Test closed PostgreSQL connections are reused."""
+        if not isinstance(connection, DatabaseWrapper):
+            pytest.skip('Requires the pooled PostgreSQL backend.')
+        connection.ensure_connection()
+        first = connection.connection
+
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        assert connection.connection is first
+        assert not first.closed
+
+
+@pytest.mark.django_db
+class TestPoolsAPI:
+    """Test the pool statistics endpoint."""
+
+    def test_admin_gets_stats(self):
+        """Test admins get statistics of the worker pools."""
+        client = APIClient()
+        pool.get_pool('default', 'key')
+        client.force_authenticate(SuperuserFactory())
+
+        res = client.get(POOLS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert {'alias': 'default', 'in_use': 0}.items() <= \
+            res.json()[0].items()
+        pool.close_pools()
+
+    def test_users_forbidden(self):
+        """Test regular users cannot read pool statistics."""
+        client = APIClient()
+        client.force_authenticate(UserFactory())
+
+        res = client.get(POOLS_URL)
+
+        assert res.status_code == status.HTTP_403_FORBIDDEN
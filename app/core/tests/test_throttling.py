@@ -0,0 +1,123 @@
+"""
+Tests for the shared token bucket throttles.
+"""
+import multiprocessing
+
+import pytest
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import throttling
+from .factories.user_factory import UserFactory
+
+
+REGISTER_URL = reverse('register')
+TOKEN_URL = reverse('get_token')
+ME_URL = reverse('me')
+TASKS_URL = reverse('task-list')
+
+
+def take_tokens(path, count, results):
+    """Take count tokens from a fresh store mapping of path."""
+    store = throttling.BucketStore(path, 16)
+    results.put(sum(store.take('key', 20, 1e-9)[0] for _ in range(count)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Return bucket store in a temporary file."""
+    return throttling.BucketStore(str(tmp_path / 'buckets'), 16)
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    """Set the rates of throttle scopes."""
+    def set_rates(**rates):
+        monkeypatch.setattr(throttling.ScopedTokenBucketThrottle,
+                            'THROTTLE_RATES', rates)
+    return set_rates
+
+
+class TestBucketStore:
+    """Test the shared token buckets."""
+
+    def test_burst_then_refill(self, store):
+        """Test a bucket allows a burst and refills over time."""
+        results = [store.take('key', 3, 1.0, now=100)[0] for _ in range(4)]
+
+        assert results == [True, True, True, False]
+        assert store.take('key', 3, 1.0, now=100) == (False, 1.0)
+        assert store.take('key', 3, 1.0, now=101)[0]
+        assert not store.take('key', 3, 1.0, now=101)[0]
+
+    def test_keys_independent(self, store):
+        """Test every key has its own bucket."""
+        assert store.take('first', 1, 1.0, now=100)[0]
+        assert not store.take('first', 1, 1.0, now=100)[0]
+        assert store.take('second', 1, 1.0, now=100)[0]
+
+    def test_clear(self, store):
+        """Test clearing refills every bucket."""
+        store.take('key', 1, 1.0, now=100)
+        store.clear()
+
+        assert store.take('key', 1, 1.0, now=100)[0]
+
+    def test_shared_between_processes(self, store):
+        """Test processes draw from the same buckets."""
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=take_tokens,
+                                     args=(store.path, 10, results))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert sum(results.get() for _ in processes) == 20
+
+
+@pytest.mark.django_db
+class TestScopedThrottles:
+    """Test throttle scopes of the API views."""
+
+    def test_token_throttled(self, client, rates):
+        """Test obtaining tokens is throttled."""
+        rates(token='2/min')
+        payload = {'email': 'nobody@example.com', 'password': 'badpass'}
+
+        codes = [client.post(TOKEN_URL, payload).status_code
+                 for _ in range(3)]
+
+        assert codes[-1] == status.HTTP_429_TOO_MANY_REQUESTS
+        assert status.HTTP_429_TOO_MANY_REQUESTS not in codes[:2]
+
+    def test_register_throttled(self, client, rates):
+        """Test registering is throttled with a Retry-After hint."""
+        rates(register='1/hour')
+        client.post(REGISTER_URL, {})
+
+        res = client.post(REGISTER_URL, {})
+
+        assert res.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(res['Retry-After']) > 0
+
+    def test_tasks_throttled_per_user(self, rates):
+        """Test task requests are throttled per user."""
+        rates(tasks='1/min')
+        clients = []
+        for user in UserFactory.create_batch(2):
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            clients.append(client)
+
+        assert clients[0].get(TASKS_URL).status_code == status.HTTP_200_OK
+        assert clients[0].get(TASKS_URL).status_code == \
+            status.HTTP_429_TOO_MANY_REQUESTS
+        assert clients[1].get(TASKS_URL).status_code == status.HTTP_200_OK
+        assert clients[0].get(ME_URL).status_code == status.HTTP_200_OK
@@ -0,0 +1,117 @@
+"""
+Application core throttling.
+
+Token bucket throttles sharing their buckets between worker processes
+through a memory mapped file. The file is an array of fixed size slots,
+a key hashes to one slot and only that slot is locked while its bucket
+is refilled and drawn from, so workers contend only on the same key.
+Keys colliding on a slot reset each other's bucket, which errs on the
+side of allowing requests.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import throttling
+
+
+# Key hash, tokens left and time of the last update.
+SLOT = struct.Struct('=Qdd')
+
+
+class BucketStore:
+    """Token buckets in a memory mapped file shared across processes."""
+    LOCK_STRIPES = 64
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * SLOT.size
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        # Record locks are held per process, threads need their own.
+        self.thread_locks = [threading.Lock()
+                             for _ in range(self.LOCK_STRIPES)]
+
+    def take(self, key, capacity, rate, now=None):
+        """Take a token from the bucket of key.
+
+        The bucket holds at most capacity tokens and gains rate tokens per
+        second. Return whether a token was taken and the seconds until the
+        next one is available.
+        """
+        now = time.time() if now is None else now
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        index = digest % self.slots
+        offset = index * SLOT.size
+
+        with self.thread_locks[index % self.LOCK_STRIPES]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                key_hash, tokens, updated = SLOT.unpack_from(self.map, offset)
+                if key_hash != digest:
+                    tokens, updated = capacity, now
+                tokens = min(capacity,
+                             tokens + max(now - updated, 0) * rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                SLOT.pack_into(self.map, offset, digest, tokens, now)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        """Empty every bucket."""
+        self.map[:] = bytes(len(self.map))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Return the bucket store configured in settings."""
+    key = (settings.THROTTLE_BUCKETS_PATH, settings.THROTTLE_BUCKETS_SLOTS)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = BucketStore(*key)
+        return _stores[key]
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """Rate throttle drawing from a shared token bucket per cache key.
+
+    A rate of N/period allows bursts of N requests and refills N tokens
+    per period.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self.wait_time = get_bucket_store().take(
+            self.key, self.num_requests, self.num_requests / self.duration)
+        return allowed
+
+    def wait(self):
+        """Return seconds until the next request is allowed."""
+        return self.wait_time
+
+
+class ScopedTokenBucketThrottle(throttling.ScopedRateThrottle,
+                                TokenBucketThrottle):
+    """Token bucket throttle of views setting ``throttle_scope``."""
@@ -13,6 +13,15 @@ urlpatterns = [
          name='refresh_token'),
 
     # Authenticated user
-    path('me', views.ManageUserAPIView.as_view(), name='me')
+    path('me', views.ManageUserAPIView.as_view(), name='me'),
+
+    # Database connection pools of the serving worker
+    path('db/pools', views.DatabasePoolsAPIView.as_view(), name='db_pools'),
+
+    # Background jobs of authenticated user
+    path('jobs', views.JobListCreateAPIView.as_view(), name='jobs'),
+    path('jobs/<int:pk>', views.JobRetrieveAPIView.as_view(), name='job'),
+    path('jobs/<int:pk>/file', views.JobFileAPIView.as_view(),
+         name='job_file'),
 
 ]
@@ -0,0 +1,243 @@
+"""
+Todo API async views.
+
+Read-only async counterparts of the task and tag viewset reads. They use
+the async ORM end to end, so under an ASGI server a slow query suspends
+only its own request instead of blocking a worker. Responses match the
+synchronous ones, task listings taking the same filter, search and
+ordering parameters; conditional requests and the listings cache are
+only served by the synchronous views.
+"""
+import functools
+
+from django.http import (
+    Http404,
+    HttpResponse,
+)
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework import (
+    exceptions,
+    status,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from core import replicas
+from core.authentication import CachedJWTAuthentication
+from core.throttling import ScopedTokenBucketThrottle
+from todo import models
+from . import (
+    filters,
+    pagination,
+    serializers,
+)
+from .rows import (
+    RowSerializer,
+    get_task_row_serializer,
+)
+
+
+class AsyncReadViewSet(View):
+    """Async read-only view dispatching GET requests to an action.
+
+    Authenticates with JWTs, applies the scoped throttle, reads from
+    replicas and renders ``APIException`` errors like DRF does.
+    """
+    http_method_names = ['get', 'head']
+    authentication = CachedJWTAuthentication()
+    throttle_class = ScopedTokenBucketThrottle
+    throttle_scope = None
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = None
+    action = None
+
+    @classonlymethod
+    def as_view(cls, action, **initkwargs):
+        """Return async view running action."""
+        view = super().as_view(action=action, **initkwargs)
+        view.actions = {'get': action}
+        return view
+
+    async def get(self, request, *args, **kwargs):
+        """Authenticate and throttle request and run the action."""
+        request = Request(request, authenticators=[])
+        try:
+            await self.perform_authentication(request)
+            self.check_throttles(request)
+            token = replicas.use_replicas(request.user.id)
+            try:
+                data = await getattr(self, self.action)(
+                    request, *args, **kwargs)
+            finally:
+                replicas.reset(token)
+        except Http404:
+            return self.error_response(exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+
+        return HttpResponse(JSONRenderer().render(data),
+                            content_type='application/json')
+
+    async def perform_authentication(self, request):
+        """Set the request user or raise NotAuthenticated."""
+        result = await self.authentication.aauthenticate(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+
+    def check_throttles(self, request):
+        """Raise Throttled if the request is over its rate."""
+        throttle = self.throttle_class()
+        if not throttle.allow_request(request, self):
+            raise exceptions.Throttled(throttle.wait())
+
+    def error_response(self, exc):
+        """Return JSON response of an API exception."""
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else \
+            {'detail': exc.detail}
+        response = HttpResponse(JSONRenderer().render(data),
+                                status=exc.status_code,
+                                content_type='application/json')
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response['WWW-Authenticate'] = \
+                self.authentication.authenticate_header(None)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(int(exc.wait))
+        return response
+
+    async def paginate(self, request, rows, serialize):
+        """Return paginated representation of rows."""
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(rows, request, self)
+        return paginator.get_paginated_response(await serialize(page)).data
+
+    async def get_row(self, rows, pk):
+        """Return the row with primary key pk or raise Http404."""
+        try:
+            return await rows.aget(pk=pk)
+        except rows.model.DoesNotExist:
+            raise Http404
+
+
+class AsyncTaskViewSet(filters.TaskListingMixin, AsyncReadViewSet):
+    """Async task reads, listings taking the synchronous parameters."""
+    throttle_scope = 'tasks'
+
+    def get_queryset(self, request):
+        """Return tasks of the request user."""
+        return models.Task.objects.get_owner_tasks(request.user)
+
+    def get_archived_queryset(self, request):
+        """Return tasks of the archive table of the request user."""
+        return models.ArchivedTask.objects.get_owner_tasks(request.user)
+
+    def filter_queryset(self, request, queryset):
+        """Return queryset restricted by the filter backends."""
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        return queryset
+
+    async def listing(self, request, queryset, archived=None,
+                      occurrences=None):
+        """Return paginated task listing of queryset.
+
+        Tasks of the archived queryset, of the archive table, are merged.
+        Recurring tasks with an occurrence, mapped by task id, are listed
+        at that occurrence.
+        """
+        serializer = get_task_row_serializer(serializers.TaskSerializer)
+        extra = [field.lstrip('-')
+                 for field in self.get_keyset_ordering(request)]
+        rows = serializer.get_rows(self.filter_queryset(request, queryset),
+                                   extra=extra)
+        if archived is None:
+            async def serialize(rows):
+                return serializer.to_occurrences(
+                    await serializer.ato_representation(rows),
+                    occurrences or {})
+
+            return await self.paginate(request, rows, serialize)
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_querysets(
+            [rows, serializer.get_rows(
+                self.filter_queryset(request, archived), extra=extra)],
+            request, self)
+        return paginator.get_paginated_response(
+            await serializer.ato_representation(page, archived=True)).data
+
+    async def list(self, request):
+        """List tasks, those of the archive table unless unarchived only."""
+        archived = self.get_archived_queryset(request) \
+            if self.includes_archive_table(request) else None
+        return await self.listing(request, self.get_queryset(request),
+                                  archived)
+
+    async def today_tasks(self, request):
+        """Return today tasks, recurring ones at their occurrence today."""
+        tz = request.user.get_timezone()
+        occurrences = {
+            occurrence.task_id: occurrence
+            for occurrence in await self.get_queryset(request)
+            .get_unarchived_tasks()
+            .aget_occurrences(*models.get_today_range(tz), tz)
+        }
+        return await self.listing(
+            request, self.get_queryset(request).get_today_tasks(tz) |
+            self.get_queryset(request).filter(id__in=occurrences),
+            occurrences=occurrences)
+
+    async def archived_tasks(self, request):
+        """Return archived tasks."""
+        return await self.listing(
+            request, self.get_queryset(request).get_archived_tasks(),
+            self.get_archived_queryset(request))
+
+    async def retrieve(self, request, pk):
+        """Return task detail."""
+        serializer = get_task_row_serializer(
+            serializers.TaskDetailSerializer)
+        try:
+            row = await self.get_row(
+                serializer.get_rows(self.get_queryset(request)), pk)
+        except Http404:
+            row = await self.get_row(
+                serializer.get_rows(self.get_archived_queryset(request)), pk)
+            return (await serializer.ato_representation(
+                [row], archived=True))[0]
+        return (await serializer.ato_representation([row]))[0]
+
+
+class AsyncTagViewSet(AsyncReadViewSet):
+    """Async tag reads."""
+    keyset_ordering = ('name', 'id')
+
+    def get_rows(self, request):
+        """Return value rows of the request user tags."""
+        serializer = get_tag_row_serializer()
+        return models.Tag.objects.get_owner_tags(request.user).values(
+            *dict.fromkeys([*serializer.columns, *self.keyset_ordering]))
+
+    async def list(self, request):
+        """List tags."""
+        serializer = get_tag_row_serializer()
+
+        async def serialize(rows):
+            return serializer.to_representation(rows)
+
+        return await self.paginate(request, self.get_rows(request),
+                                   serialize)
+
+    async def retrieve(self, request, pk):
+        """Return tag detail."""
+        row = await self.get_row(self.get_rows(request), pk)
+        return get_tag_row_serializer().to_representation([row])[0]
+
+
+@functools.cache
+def get_tag_row_serializer():
+    """Return the row serializer of tags."""
+    return RowSerializer(serializers.TagSerializer)
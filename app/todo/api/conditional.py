@@ -0,0 +1,146 @@
+"""
+Todo API conditional requests.
+
+Listings and details carry weak ETags and Last-Modified headers. GET and
+HEAD requests with matching If-None-Match or If-Modified-Since get 304 Not
+Modified, unsafe requests failing If-Match or If-Unmodified-Since get 412
+Precondition Failed. Weak tags have no byte-exact guarantee, so If-Match
+compares them weakly, which still detects any change of the resource.
+"""
+import functools
+import hashlib
+import json
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import parse_etags
+from django.utils.http import (
+    http_date,
+    parse_http_date_safe,
+)
+from django.utils.translation import gettext_lazy as _
+from rest_framework import (
+    exceptions,
+    status,
+)
+from rest_framework.response import Response
+
+
+class PreconditionFailed(exceptions.APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('The resource has been modified.')
+    default_code = 'precondition_failed'
+
+
+def make_etag(*parts):
+    """Return weak ETag identifying parts."""
+    digest = hashlib.md5(
+        json.dumps(parts, sort_keys=True, default=str).encode(),
+        usedforsecurity=False)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _weak_match(etag, etags):
+    return '*' in etags or \
+        any(tag.removeprefix('W/') == etag.removeprefix('W/')
+            for tag in etags)
+
+
+def evaluate_preconditions(request, etag, last_modified):
+    """Return 304 response for unmodified GET or raise PreconditionFailed.
+
+    last_modified is a timestamp in seconds.
+    """
+    meta = request.META
+    last_modified = int(last_modified)
+    if if_match := parse_etags(meta.get('HTTP_IF_MATCH', '')):
+        if not _weak_match(etag, if_match):
+            raise PreconditionFailed()
+    elif since := parse_http_date_safe(
+            meta.get('HTTP_IF_UNMODIFIED_SINCE', '')):
+        if last_modified > since:
+            raise PreconditionFailed()
+
+    if request.method not in ('GET', 'HEAD'):
+        return None
+
+    if if_none_match := parse_etags(meta.get('HTTP_IF_NONE_MATCH', '')):
+        modified = not _weak_match(etag, if_none_match)
+    elif since := parse_http_date_safe(
+            meta.get('HTTP_IF_MODIFIED_SINCE', '')):
+        modified = last_modified > since
+    else:
+        modified = True
+
+    return None if modified else HttpResponseNotModified()
+
+
+def set_validators(response, etag, last_modified):
+    """Set ETag and Last-Modified headers of response."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_listing(view_method):
+    """Answer conditional requests of a viewset listing action.
+
+    Validators come from the view ``get_listing_validators(request)``,
+    so a 304 is returned without querying or serializing the listing.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        etag, last_modified = self.get_listing_validators(request)
+        response = evaluate_preconditions(request, etag, last_modified) or \
+            view_method(self, request, *args, **kwargs)
+
+        return set_validators(response, etag, last_modified)
+
+    return wrapper
+
+
+class ConditionalDetailMixin:
+    """Answer conditional retrieve and update requests.
+
+    The ETag of an object is derived from its serialized representation
+    and Last-Modified from its ``updated_date`` or from the owner sync
+    clock when the model has none.
+    """
+
+    def get_object(self):
+        """Return the object, looked up once per request."""
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+
+        return self._object
+
+    def get_detail_validators(self, instance, data=None):
+        """Return ETag and Last-Modified of instance."""
+        if data is None:
+            data = self.get_serializer(instance).data
+
+        return make_etag(data), self.get_last_modified(instance)
+
+    def get_last_modified(self, instance):
+        """Return instance last modification timestamp."""
+        return instance.updated_date.timestamp()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve the object unless the client copy is current."""
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        etag, last_modified = self.get_detail_validators(
+            instance, serializer.data)
+        response = evaluate_preconditions(request, etag, last_modified) or \
+            Response(serializer.data)
+
+        return set_validators(response, etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        """Update the object unless it changed since the client read it."""
+        instance = self.get_object()
+        evaluate_preconditions(
+            request, *self.get_detail_validators(instance))
+
+        response = super().update(request, *args, **kwargs)
+        return set_validators(
+            response, *self.get_detail_validators(instance, response.data))
@@ -0,0 +1,49 @@
+"""
+Todo API view decorators.
+"""
+import functools
+
+from django.http import HttpResponse
+from rest_framework import status
+
+from todo.cache import (
+    get_listing_key,
+    get_listings_cache,
+    get_max_entry_size,
+)
+
+
+def cache_listing(view_method):
+    """Serve the rendered response of a viewset action from the cache.
+
+    Only successful JSON responses are cached, per user and action, keyed
+    by the full request URL so every page and filter is stored apart, and
+    by the ``get_listing_time_parts`` of the view, so listings depending
+    on the current time or the user time zone expire with them.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return view_method(self, request, *args, **kwargs)
+
+        cache = get_listings_cache()
+        key = get_listing_key(request.user.id, self.action,
+                              request.accepted_media_type,
+                              request.build_absolute_uri(),
+                              *self.get_listing_time_parts(request))
+        if (cached := cache.get(key)) is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            def store(rendered):
+                if len(rendered.content) <= get_max_entry_size():
+                    cache.set(key, (rendered['Content-Type'],
+                                    rendered.content))
+
+            response.add_post_render_callback(store)
+
+        return response
+
+    return wrapper
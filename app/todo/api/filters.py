@@ -0,0 +1,121 @@
+"""
+Todo API filters.
+"""
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import (
+    exceptions,
+    filters,
+    serializers,
+)
+
+from .serializers import TaskFilterSerializer
+
+
+class TaskFilter(filters.BaseFilterBackend):
+    """Restrict tasks by the query parameters of ``TaskFilterSerializer``.
+
+    Every filter is answered by an index on the owner tasks, tags are
+    matched with EXISTS subqueries so tasks are never duplicated.
+    """
+
+    def get_filters(self, request):
+        """Return validated filters of request."""
+        serializer = TaskFilterSerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def filter_queryset(self, request, queryset, view):
+        params = self.get_filters(request)
+        if priorities := params.get('priority'):
+            queryset = queryset.filter(priority__in=priorities)
+        if (archived := params.get('archived')) is not None:
+            queryset = queryset.filter(is_archived=archived)
+        if (overdue := params.get('overdue')) is not None:
+            condition = Q(event_date__lt=timezone.now(), is_archived=False,
+                          recurrence='')
+            queryset = queryset.filter(condition) if overdue else \
+                queryset.exclude(condition)
+        queryset = queryset.get_event_date_range(
+            params.get('event_after'), params.get('event_before'))
+        if tags := params.get('tags'):
+            queryset = queryset.with_all_tags(tags) \
+                if params['tags_match'] == 'all' else \
+                queryset.with_any_tags(tags)
+
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = []
+        for name, field in TaskFilterSerializer().fields.items():
+            schema = {'type': 'boolean'} \
+                if isinstance(field, serializers.BooleanField) else \
+                {'type': 'string'}
+            parameters.append({
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': str(field.help_text or ''),
+                'schema': schema,
+            })
+        return parameters
+
+
+class TaskSearchFilter(filters.BaseFilterBackend):
+    """Restrict tasks to those matching the ``search`` query parameter.
+
+    Matches are annotated with their ``rank``, views order them by it.
+    """
+    search_param = 'search'
+    search_description = _('Words of the task label or description.')
+
+    def get_search_terms(self, request):
+        """Return search terms of request or an empty string."""
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        if terms := self.get_search_terms(request):
+            return queryset.search(terms)
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': str(self.search_description),
+            'schema': {'type': 'string'},
+        }]
+
+
+class TaskListingMixin:
+    """Filter, search and order task listings by query parameters.
+
+    Shared by the synchronous and async task views.
+    """
+    keyset_ordering = ('-created_date', '-id')
+    search_keyset_ordering = ('-rank', '-id')
+    # Values of the ordering parameter, each backed by an owner index.
+    orderings = {
+        f'{sign}{field}': (f'{sign}{field}', f'{sign}id')
+        for field in ('created_date', 'updated_date', 'event_date',
+                      'priority')
+        for sign in ('', '-')
+    }
+    filter_backends = (TaskFilter, TaskSearchFilter)
+
+    def get_keyset_ordering(self, request):
+        """Return listing order, searches are ordered by rank by default."""
+        if ordering := request.query_params.get('ordering'):
+            if ordering not in self.orderings:
+                raise exceptions.ValidationError(
+                    {'ordering': _('Invalid ordering.')})
+            return self.orderings[ordering]
+        if TaskSearchFilter().get_search_terms(request):
+            return self.search_keyset_ordering
+        return self.keyset_ordering
+
+    def includes_archive_table(self, request):
+        """Return whether filters of request may match archived tasks."""
+        return TaskFilter().get_filters(request).get('archived') is not False
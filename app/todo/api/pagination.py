@@ -0,0 +1,265 @@
+"""
+Todo API pagination.
+"""
+import json
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ValidationError,
+)
+from django.db.models import (
+    F,
+    Q,
+)
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """Opaque cursor pagination over a unique composite ordering.
+
+    The cursor holds the ordering values of the last item served and the
+    next page is selected with a keyset condition on them instead of an
+    OFFSET, so every page costs the same regardless of its depth and no
+    COUNT query is issued. The last ordering field must be unique. Only
+    the first may be a nullable model field, nulls sort after every value
+    as PostgreSQL does by default. Views can override the ordering with a
+    ``keyset_ordering`` attribute or a ``get_keyset_ordering(request)``
+    method.
+    """
+    ordering = ('-created_date', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Return the keyset ordering of the view."""
+        if hasattr(view, 'get_keyset_ordering'):
+            return tuple(view.get_keyset_ordering(request))
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of queryset results."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Return a single page of queryset results read asynchronously."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.set_page([item async for item in queryset.aiterator()])
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """Return a single page of results merged from querysets.
+
+        The querysets must hold distinct rows sharing the ordering fields,
+        a page worth of each is read and the leading items are kept.
+        """
+        results = []
+        for queryset in querysets:
+            queryset = self.get_page_queryset(queryset, request, view)
+            if queryset is None:
+                return None
+            results.extend(queryset)
+
+        return self.set_page(self.merge_results(results))
+
+    async def apaginate_querysets(self, querysets, request, view=None):
+        """Return a merged page of querysets read asynchronously."""
+        results = []
+        for queryset in querysets:
+            queryset = self.get_page_queryset(queryset, request, view)
+            if queryset is None:
+                return None
+            results.extend([item async for item in queryset.aiterator()])
+
+        return self.set_page(self.merge_results(results))
+
+    def merge_results(self, results):
+        """Sort results of several page querysets and cut them to a page.
+
+        Sorts like ``get_order_by`` does, nulls following every value.
+        """
+        reverse = self.cursor is not None and self.cursor.reverse
+        for field in reversed(self.ordering):
+            name = field.lstrip('-')
+
+            def key(item):
+                value = item[name] if isinstance(item, dict) else \
+                    getattr(item, name)
+                return value is None, value
+
+            results.sort(key=key, reverse=field.startswith('-') != reverse)
+
+        return results[:self.page_size + 1]
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return queryset of the requested page and one more item."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        queryset = self.filter_page_queryset(queryset, self.cursor)
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """Set the page from results of the page queryset and return it."""
+        reverse = self.cursor is not None and self.cursor.reverse
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def filter_page_queryset(self, queryset, cursor):
+        """Order queryset and restrict it to the items after cursor."""
+        reverse = cursor is not None and cursor.reverse
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else
+                             f'-{field}' for field in ordering)
+
+        self.nullable = self.get_nullable_fields(queryset, ordering)
+        queryset = queryset.order_by(*self.get_order_by(ordering))
+        if cursor is None or cursor.position is None:
+            return queryset
+
+        values = self.decode_position(cursor.position)
+        try:
+            return queryset.filter(
+                self.get_keyset_condition(ordering, values))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_nullable_fields(self, queryset, ordering):
+        """Return names of the nullable model fields of ordering."""
+        nullable = set()
+        for field in ordering:
+            name = field.lstrip('-')
+            try:
+                if queryset.model._meta.get_field(name).null:
+                    nullable.add(name)
+            except FieldDoesNotExist:
+                pass
+
+        return nullable
+
+    def get_order_by(self, ordering):
+        """Return order_by arguments of ordering sorting nulls last."""
+        order_by = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if name not in self.nullable:
+                order_by.append(field)
+            elif field.startswith('-'):
+                order_by.append(F(name).desc(nulls_first=True))
+            else:
+                order_by.append(F(name).asc(nulls_last=True))
+
+        return order_by
+
+    def get_keyset_condition(self, ordering, values):
+        """Return condition selecting rows following values in ordering."""
+        names = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt'
+                   for field in ordering]
+
+        condition = Q()
+        for index, name in enumerate(names):
+            condition |= Q(
+                *[self.get_equal_condition(*item)
+                  for item in zip(names[:index], values[:index])],
+                self.get_following_condition(name, lookups[index],
+                                             values[index]),
+            )
+
+        if names[0] in self.nullable:
+            return condition
+
+        # Leading range bound lets the database seek the index directly.
+        bound = {f'{names[0]}__{lookups[0]}e': values[0]}
+        return Q(**bound) & condition
+
+    def get_equal_condition(self, name, value):
+        """Return condition selecting rows whose name equals value."""
+        if value is None:
+            return Q(**{f'{name}__isnull': True})
+        return Q(**{name: value})
+
+    def get_following_condition(self, name, lookup, value):
+        """Return condition selecting rows whose name follows value."""
+        if value is None:
+            # Nulls sort last, only values follow them in descending order.
+            if lookup == 'gt':
+                return Q(pk__in=[])
+            return Q(**{f'{name}__isnull': False})
+        condition = Q(**{f'{name}__{lookup}': value})
+        if name in self.nullable and lookup == 'gt':
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def get_next_link(self):
+        """Return link to the page following the current one."""
+        if not self.has_next:
+            return None
+
+        position = self.cursor.position if not self.page else \
+            self.encode_position(self.page[-1])
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        """Return link to the page preceding the current one."""
+        if not self.has_previous:
+            return None
+
+        position = self.cursor.position if not self.page else \
+            self.encode_position(self.page[0])
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position))
+
+    def encode_position(self, item):
+        """Return cursor position of item."""
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = item[name] if isinstance(item, dict) else \
+                getattr(item, name)
+            values.append(
+                None if value is None else
+                value.isoformat() if hasattr(value, 'isoformat')
+                else str(value))
+
+        return json.dumps(values, separators=(',', ':'))
+
+    def decode_position(self, position):
+        """Return ordering values stored in cursor position."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values
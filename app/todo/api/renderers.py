@@ -0,0 +1,83 @@
+"""
+Todo API renderers.
+
+Line oriented formats used by task exports. Besides ``render`` they can
+render items one line at a time, so a streaming response never holds more
+than one line of output.
+"""
+import csv
+import itertools
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class Echo:
+    """File-like object returning what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Newline delimited JSON renderer, one item per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render item or list of items."""
+        items = data if isinstance(data, list) else [data]
+        return ''.join(self.render_lines(items)).encode(self.charset)
+
+    def render_lines(self, items, fields=None):
+        """Yield a line of every item."""
+        for item in items:
+            yield json.dumps(item, cls=encoders.JSONEncoder,
+                             ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """CSV renderer with a header line and one item per line.
+
+    Lists of nested items, like task tags, are written as their names
+    joined with ``TAGS_SEPARATOR``.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    TAGS_SEPARATOR = '|'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render item or list of items."""
+        items = data if isinstance(data, list) else [data]
+        return ''.join(self.render_lines(items)).encode(self.charset)
+
+    def render_lines(self, items, fields=None):
+        """Yield the header line and a line of every item."""
+        items = iter(items)
+        if fields is None:
+            first = next(items, None)
+            if first is None:
+                return
+            fields = list(first)
+            items = itertools.chain([first], items)
+
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for item in items:
+            yield writer.writerow(
+                [self.to_cell(item[field]) for field in fields])
+
+    def to_cell(self, value):
+        """Return CSV cell of a value."""
+        match value:
+            case None:
+                return ''
+            case bool():
+                return 'true' if value else 'false'
+            case list():
+                return self.TAGS_SEPARATOR.join(
+                    item['name'] if isinstance(item, dict) else str(item)
+                    for item in value)
+
+        return value
@@ -0,0 +1,255 @@
+"""
+Todo API row serializers.
+
+Read-only counterparts of the task serializers for listings. They build
+the same representation from ``.values()`` rows and a tag map grouped in
+one query, converting each column with an accessor compiled once from
+the DRF serializer fields instead of introspecting fields and calling
+``to_representation`` for every object.
+"""
+import datetime
+import functools
+import itertools
+
+from django.utils import timezone
+from rest_framework import (
+    ISO_8601,
+    fields,
+    serializers,
+)
+from rest_framework.settings import api_settings
+
+from todo import recurrence
+from todo.models import (
+    ArchivedTask,
+    Task,
+)
+
+
+def make_datetime_converter(field):
+    """Return function formatting datetimes like DateTimeField does.
+
+    The field timezone is the active one, so the converter must be made
+    for every serialization rather than once.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+
+    field_timezone = field.timezone if hasattr(field, 'timezone') else \
+        field.default_timezone()
+
+    def localize(value):
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                return value.astimezone(field_timezone)
+            return timezone.make_aware(value, field_timezone)
+        if timezone.is_aware(value):
+            return timezone.make_naive(value, datetime.timezone.utc)
+        return value
+
+    if output_format.lower() == ISO_8601:
+        def convert(value):
+            value = localize(value).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+    else:
+        def convert(value):
+            return localize(value).strftime(output_format)
+
+    return convert
+
+
+def compile_field(field):
+    """Return converter of a column value to the field representation.
+
+    Plain fields get a static converter, datetime fields a factory called
+    once per serialization, other fields fall back to the field itself.
+    """
+    match field:
+        case fields.BooleanField():
+            return bool
+        case fields.IntegerField():
+            return int
+        case fields.ChoiceField():
+            choices = field.choice_strings_to_values
+            return lambda value: choices.get(str(value), value)
+        case fields.CharField():
+            return str
+        case fields.DateTimeField():
+            return functools.partial(make_datetime_converter, field)
+
+    return field.to_representation
+
+
+class RowSerializer:
+    """Read-only serializer of ``.values()`` rows of a model serializer.
+
+    Nested serializer fields are left out, subclasses supply them.
+    """
+
+    def __init__(self, serializer_class, prefix=''):
+        self.fields = []
+        self.dynamic = set()
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, serializers.BaseSerializer):
+                continue
+            self.fields.append((name, prefix + field.source,
+                                compile_field(field)))
+            if isinstance(field, fields.DateTimeField):
+                self.dynamic.add(name)
+
+    @property
+    def columns(self):
+        """Return the columns rows must contain."""
+        return [column for name, column, convert in self.fields]
+
+    def get_converters(self):
+        """Return (name, column, converter) of every field."""
+        return [
+            (name, column, convert() if name in self.dynamic else convert)
+            for name, column, convert in self.fields
+        ]
+
+    def to_representation(self, rows):
+        """Return representation of rows."""
+        converters = self.get_converters()
+        return [self.to_item(row, converters) for row in rows]
+
+    @staticmethod
+    def to_item(row, converters):
+        """Return representation of a single row."""
+        item = {}
+        for name, column, convert in converters:
+            value = row[column]
+            item[name] = value if value is None or convert is None else \
+                convert(value)
+        return item
+
+
+class TaskRowSerializer(RowSerializer):
+    """Read-only task serializer of ``.values()`` rows.
+
+    Produces output identical to ``serializer_class(many=True).data`` with
+    tags read from the through table in a single query, ordered by id the
+    same way as ``TaskQuerySet.with_tags``. Rows of archive table tasks
+    need ``archived=True`` for their tags to be read from its table too.
+    """
+
+    def __init__(self, serializer_class):
+        super().__init__(serializer_class)
+        serializer_fields = serializer_class().fields
+        self.names = list(serializer_fields)
+        self.event_date = serializer_fields['event_date']
+        self.tags = RowSerializer(
+            type(serializer_fields['tags'].child), prefix='tag__')
+
+    def get_rows(self, queryset, extra=()):
+        """Return values queryset selecting columns and extra ones."""
+        columns = dict.fromkeys([*self.columns, *extra])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def get_tag_rows(self, task_ids, archived=False):
+        """Return values queryset of tags of the tasks ordered by id."""
+        columns = ['task_id', *self.tags.columns]
+        rows = Task.tags.through.objects.filter(task_id__in=task_ids) \
+            .values(*columns)
+        if archived:
+            rows = rows.union(
+                ArchivedTask.tags.through.objects
+                .filter(task_id__in=task_ids).values(*columns), all=True)
+        return rows.order_by(self.tags.columns[0])
+
+    def get_tag_map(self, task_ids, archived=False):
+        """Return tag representations grouped by task id."""
+        tag_map = {task_id: [] for task_id in task_ids}
+        if tag_map:
+            self.group_tags(tag_map, self.get_tag_rows(tag_map, archived))
+        return tag_map
+
+    async def aget_tag_map(self, task_ids, archived=False):
+        """Return tag representations grouped by task id read async."""
+        tag_map = {task_id: [] for task_id in task_ids}
+        if tag_map:
+            rows = [row async for row in
+                    self.get_tag_rows(tag_map, archived).aiterator()]
+            self.group_tags(tag_map, rows)
+        return tag_map
+
+    def group_tags(self, tag_map, rows):
+        """Add representations of tag rows to tag_map."""
+        converters = self.tags.get_converters()
+        for row in rows:
+            tag_map[row['task_id']].append(self.to_item(row, converters))
+
+    def get_converters(self, tag_map):
+        """Return converters in serializer field order, tags included."""
+        converters = {name: (name, column, convert) for name, column, convert
+                      in super().get_converters()}
+        converters['tags'] = ('tags', 'id', tag_map.__getitem__)
+        return [converters[name] for name in self.names]
+
+    def to_representation(self, rows, archived=False):
+        """Return representation of task rows."""
+        rows = list(rows)
+        converters = self.get_converters(
+            self.get_tag_map((row['id'] for row in rows), archived))
+        return [self.to_item(row, converters) for row in rows]
+
+    def to_occurrence(self, item, occurrence):
+        """Return representation of a recurring task at an occurrence.
+
+        It is the task item with the occurrence date as event date and
+        whether the occurrence is completed.
+        """
+        return {**item,
+                'event_date': self.event_date.to_representation(
+                    occurrence.date),
+                'is_completed': occurrence.state == recurrence.COMPLETED}
+
+    def to_occurrences(self, tasks, occurrences):
+        """Return task items with recurring ones at their occurrence.
+
+        occurrences map task ids to an occurrence, items of other tasks are
+        returned unchanged.
+        """
+        return [self.to_occurrence(task, occurrences[task['id']])
+                if task['id'] in occurrences else task for task in tasks]
+
+    async def ato_representation(self, rows, archived=False):
+        """Return representation of task rows reading tags async."""
+        converters = self.get_converters(
+            await self.aget_tag_map((row['id'] for row in rows), archived))
+        return [self.to_item(row, converters) for row in rows]
+
+    def iter_representation(self, rows, chunk_size, archived=False):
+        """Yield representation of rows streamed in chunks.
+
+        Rows are read through a server-side cursor where the database
+        supports one and tags are resolved once per chunk, so memory use
+        does not depend on the number of rows.
+        """
+        rows = rows.iterator(chunk_size=chunk_size)
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            yield from self.to_representation(chunk, archived)
+
+    def render_lines(self, tasks, archived_tasks, renderer, chunk_size):
+        """Yield lines of tasks and then archived tasks in id order.
+
+        The task export, rendered by a line oriented renderer.
+        """
+        return renderer.render_lines(
+            itertools.chain(
+                self.iter_representation(
+                    self.get_rows(tasks).order_by('id'), chunk_size),
+                self.iter_representation(
+                    self.get_rows(archived_tasks).order_by('id'), chunk_size,
+                    archived=True)),
+            fields=self.names)
+
+
+@functools.cache
+def get_task_row_serializer(serializer_class):
+    """Return the row serializer of a task serializer class."""
+    return TaskRowSerializer(serializer_class)
@@ -1,12 +1,22 @@
 """
 Todo API serializers.
 """
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import gettext as _
-from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework import (
+    serializers,
+    status,
+)
 
+from todo.cache import invalidate_owner_listings
 from todo.models import (
+    SyncClock,
     Task,
+    TaskOccurrence,
+    TaskStats,
     Tag,
 )
 
@@ -34,34 +44,114 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ['id', 'label', 'event_date', 'priority', 'tags']
+        fields = ['id', 'label', 'event_date', 'priority', 'tags',
+                  'recurrence', 'recurrence_interval', 'recurrence_end']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, task):
-        """Handle getting or creating tags as needed."""
-        owner = task.owner
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(owner=owner, **tag)
-            task.tags.add(tag_obj)
+    def validate(self, attrs):
+        """Check recurring tasks repeat from an event date until later."""
+        def get(name):
+            return attrs[name] if name in attrs else \
+                getattr(self.instance, name, None)
+
+        if get('recurrence'):
+            if get('event_date') is None:
+                raise serializers.ValidationError(
+                    {'event_date': _('Recurring tasks need an event date.')})
+            end = get('recurrence_end')
+            if end is not None and end <= get('event_date'):
+                raise serializers.ValidationError(
+                    {'recurrence_end': _('Must be later than event_date.')})
+
+        return attrs
 
+    def _set_tags(self, tags, task):
+        """Set task tags getting or creating them as needed."""
+        tag_objs = Tag.objects.get_or_create_many(
+            task.owner_id, (tag['name'] for tag in tags))
+        Task.objects.set_tags(
+            {task.id: [tag.id for tag in tag_objs.values()]})
+        invalidate_owner_listings(task.owner_id)
+
+    @transaction.atomic
     def create(self, validated_data):
         """Create a task."""
         tags = validated_data.pop('tags', [])
         task = super().create(validated_data)
-        self._get_or_create_tags(tags, task)
+        if tags:
+            self._set_tags(tags, task)
 
         return task
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a task."""
         tags = validated_data.pop('tags', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_tags(tags, instance)
 
         return super().update(instance, validated_data)
 
 
+class CommaSeparatedListField(serializers.ListField):
+    """List field also accepting comma separated values."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [item.strip() for item in data.split(',') if item.strip()]
+        return super().to_internal_value(data)
+
+
+class TaskFilterSerializer(serializers.Serializer):
+    """Task listing filter query parameters."""
+    priority = CommaSeparatedListField(
+        child=serializers.ChoiceField(choices=Task.PRIORITY_CHOICES),
+        required=False, help_text=_('Comma separated priorities.'))
+    archived = serializers.BooleanField(required=False)
+    overdue = serializers.BooleanField(
+        required=False,
+        help_text=_('Unarchived one-off tasks past their event.'))
+    event_after = serializers.DateTimeField(
+        required=False, help_text=_('Earliest event date, inclusive.'))
+    event_before = serializers.DateTimeField(
+        required=False, help_text=_('Latest event date, exclusive.'))
+    tags = CommaSeparatedListField(
+        child=serializers.CharField(max_length=15), required=False,
+        help_text=_('Comma separated tag names.'))
+    tags_match = serializers.ChoiceField(
+        choices=['any', 'all'], default='any',
+        help_text=_('Whether tasks need any or all of the tags.'))
+
+    def validate(self, attrs):
+        """Check the event date range is not empty."""
+        after, before = attrs.get('event_after'), attrs.get('event_before')
+        if after is not None and before is not None and after >= before:
+            raise serializers.ValidationError(
+                {'event_before': _('Must be later than event_after.')})
+
+        return attrs
+
+
+class TaskCalendarSerializer(serializers.Serializer):
+    """Task calendar window query parameters."""
+    MAX_DAYS = 62
+
+    start = serializers.DateField(help_text=_('First day, inclusive.'))
+    end = serializers.DateField(help_text=_('Last day, exclusive.'))
+
+    def validate(self, attrs):
+        """Check the window has between one and MAX_DAYS days."""
+        days = (attrs['end'] - attrs['start']).days
+        if days < 1:
+            raise serializers.ValidationError(
+                {'end': _('Must be later than start.')})
+        if days > self.MAX_DAYS:
+            raise serializers.ValidationError(
+                {'end': _(f'At most {self.MAX_DAYS} days can be requested.')})
+
+        return attrs
+
+
 class TaskDetailSerializer(TaskSerializer):
     """Task model detail serializer."""
 
@@ -73,3 +163,227 @@ class TaskDetailSerializer(TaskSerializer):
         read_only_fields = TaskSerializer.Meta.read_only_fields + [
             'created_date', 'updated_date', 'is_archived', 'archived_date'
         ]
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    """Task bulk changes serializer.
+
+    Creates, partial updates and deletes are validated item by item with
+    TaskSerializer and written in one transaction with a fixed number of
+    queries. Any invalid item rejects the whole batch, errors are reported
+    by item index.
+    """
+    MAX_ITEMS = 500
+
+    def get_fields(self):
+        """Return batch fields, declared here as they shadow save hooks."""
+        return {
+            'create': serializers.ListField(
+                child=serializers.DictField(), required=False, default=list),
+            'update': serializers.ListField(
+                child=serializers.DictField(), required=False, default=list),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(min_value=1),
+                required=False, default=list),
+        }
+
+    def validate(self, attrs):
+        """Validate every item of the batch."""
+        if sum(map(len, attrs.values())) > self.MAX_ITEMS:
+            raise serializers.ValidationError(
+                _(f'Batch may contain at most {self.MAX_ITEMS} items.'))
+
+        owner = self.context['request'].user
+        ids = [item.get('id') for item in attrs['update']] + attrs['delete']
+        instances = Task.objects.get_owner_tasks(owner) \
+            .filter(id__in=[i for i in ids if isinstance(i, int)]) \
+            .in_bulk()
+
+        errors = {'create': {}, 'update': {}, 'delete': {}}
+        creates, updates, deletes = [], [], []
+        seen = set()
+
+        def get_instance(task_id, key, index):
+            if task_id not in instances:
+                errors[key][index] = {'id': [_('Task not found.')]}
+            elif task_id in seen:
+                errors[key][index] = {'id': [_('Task is duplicated.')]}
+            else:
+                seen.add(task_id)
+                return instances[task_id]
+
+        for index, item in enumerate(attrs['create']):
+            serializer = TaskSerializer(data=item)
+            if serializer.is_valid():
+                creates.append(serializer.validated_data)
+            else:
+                errors['create'][index] = serializer.errors
+
+        for index, item in enumerate(attrs['update']):
+            if task := get_instance(item.get('id'), 'update', index):
+                serializer = TaskSerializer(task, data=item, partial=True)
+                if serializer.is_valid():
+                    updates.append((task, serializer.validated_data))
+                else:
+                    errors['update'][index] = serializer.errors
+
+        for index, task_id in enumerate(attrs['delete']):
+            if task := get_instance(task_id, 'delete', index):
+                deletes.append(task)
+
+        if any(errors.values()):
+            raise serializers.ValidationError(
+                {key: value for key, value in errors.items() if value})
+
+        return {'create': creates, 'update': updates, 'delete': deletes}
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Write the batch and return per item results."""
+        owner = validated_data['owner']
+        now = timezone.now()
+        task_tag_names = []
+
+        created = []
+        for data in validated_data['create']:
+            data = dict(data)
+            tag_names = data.pop('tags', [])
+            task = Task(owner=owner, **data)
+            task_tag_names.append((task, tag_names))
+            created.append(task)
+
+        updated = []
+        fields = {'updated_date'}
+        for task, data in validated_data['update']:
+            data = dict(data)
+            if 'tags' in data:
+                task_tag_names.append((task, data.pop('tags')))
+            for attr, value in data.items():
+                setattr(task, attr, value)
+            task.updated_date = now
+            fields.update(data)
+            updated.append(task)
+
+        if changed := created + updated:
+            seq = SyncClock.objects.advance(owner.id, len(changed))
+            for i, task in enumerate(changed):
+                task.sync_seq = seq + i
+
+        Task.objects.bulk_create(created)
+        if updated:
+            Task.objects.bulk_update(updated, fields | {'sync_seq'})
+
+        stats = Counter()
+        for task in created:
+            stats.update(TaskStats.get_changes(None, task.get_stats_state()))
+        for task in updated:
+            new = task.get_stats_state()
+            stats.update(TaskStats.get_changes(task._stats_state, new))
+            task._stats_state = new
+        TaskStats.objects.apply({owner.id: stats})
+
+        if task_tag_names:
+            tags = Tag.objects.get_or_create_many(
+                owner.id, (tag['name'] for task, names in task_tag_names
+                           for tag in names))
+            Task.objects.set_tags({
+                task.id: {tags[tag['name']].id for tag in names}
+                for task, names in task_tag_names
+            })
+
+        deleted = [task.id for task in validated_data['delete']]
+        if deleted:
+            Task.objects.filter(id__in=deleted).delete()
+
+        invalidate_owner_listings(owner.id)
+
+        return {
+            'create': [{'id': task.id, 'status': status.HTTP_201_CREATED}
+                       for task in created],
+            'update': [{'id': task.id, 'status': status.HTTP_200_OK}
+                       for task in updated],
+            'delete': [{'id': task_id, 'status': status.HTTP_204_NO_CONTENT}
+                       for task_id in deleted],
+        }
+
+    def to_representation(self, instance):
+        """Return per item results."""
+        return instance
+
+
+class TaskOccurrenceSerializer(serializers.Serializer):
+    """Occurrence state of a recurring task serializer.
+
+    Needs the task and the time zone its occurrences are generated in as
+    context. Scheduled occurrences are not recorded, so setting that state
+    drops the record.
+    """
+    SCHEDULED = 'scheduled'
+
+    original_date = serializers.DateTimeField()
+    state = serializers.ChoiceField(choices=[
+        SCHEDULED, *(state for state, label in TaskOccurrence.STATE_CHOICES)])
+
+    def validate_original_date(self, value):
+        """Check the task occurs at value."""
+        task = self.context['task']
+        if not task.recurrence:
+            raise serializers.ValidationError(_('Task is not recurring.'))
+        end = value + timezone.timedelta(microseconds=1)
+        if next(task.get_occurrence_dates(value, end, self.context['tz']),
+                None) is None:
+            raise serializers.ValidationError(
+                _('Task does not occur at this date.'))
+
+        return value
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Record the occurrence state marking the task as changed."""
+        task = self.context['task']
+        state = validated_data['state']
+        occurrences = TaskOccurrence.objects.filter(
+            task=task, original_date=validated_data['original_date'])
+        if state == self.SCHEDULED:
+            occurrences.delete()
+        elif not occurrences.update(state=state, updated_date=timezone.now()):
+            TaskOccurrence.objects.create(
+                task=task, original_date=validated_data['original_date'],
+                state=state)
+        task.save(update_fields=['updated_date'])
+
+        return validated_data
+
+
+class TaskIdsSerializer(serializers.Serializer):
+    """Task ids of a bulk action serializer."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=TaskBulkSerializer.MAX_ITEMS)
+
+
+class TaskChangesSerializer(serializers.Serializer):
+    """Task and tag changes since a sync token serializer."""
+    token = serializers.CharField()
+    more = serializers.BooleanField()
+    tasks = TaskDetailSerializer(many=True)
+    tags = TagSerializer(many=True)
+    deleted_tasks = serializers.ListField(child=serializers.IntegerField())
+    deleted_tags = serializers.ListField(child=serializers.IntegerField())
+
+
+class TaskStatsSerializer(serializers.Serializer):
+    """Task statistics of a user serializer."""
+    total = serializers.IntegerField()
+    active = serializers.SerializerMethodField()
+    archived = serializers.IntegerField()
+    high_priority = serializers.IntegerField()
+    medium_priority = serializers.IntegerField()
+    low_priority = serializers.IntegerField()
+    no_priority = serializers.IntegerField()
+    overdue = serializers.IntegerField()
+    today = serializers.IntegerField()
+
+    def get_active(self, stats):
+        """Return the number of unarchived tasks."""
+        return stats['total'] - stats['archived']
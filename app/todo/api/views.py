@@ -1,6 +1,13 @@
 """
 Todo API views.
 """
+import itertools
+
+from django.http import (
+    Http404,
+    StreamingHttpResponse,
+)
+from django.utils import timezone
 from django.utils.translation import gettext as _
 from rest_framework import (
     viewsets,
@@ -8,18 +15,42 @@ from rest_framework import (
     exceptions
 )
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from core.replicas import ReplicaReadMixin
 from todo import models
-from . import serializers
+from todo.cache import invalidate_owner_listings
+from todo.sync import get_changes
+from . import (
+    filters,
+    pagination,
+    renderers,
+    serializers,
+)
+from .conditional import (
+    ConditionalDetailMixin,
+    conditional_listing,
+    make_etag,
+)
+from .decorators import cache_listing
+from .rows import get_task_row_serializer
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReplicaReadMixin, ConditionalDetailMixin,
+                 viewsets.ModelViewSet):
     """Manage tag API."""
     queryset = models.Tag.objects.all()
     serializer_class = serializers.TagSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ('name', 'id')
+    query_budget = {
+        'list': 3,
+        'retrieve': 2,
+        'destroy': 9,
+    }
 
     def get_queryset(self):
         """Retrieve tasks for authenticated user."""
@@ -30,52 +61,376 @@ class TagViewSet(viewsets.ModelViewSet):
         """Create a new tag."""
         serializer.save(owner=self.request.user)
 
+    @conditional_listing
+    def list(self, request, *args, **kwargs):
+        """List tags."""
+        return super().list(request, *args, **kwargs)
+
+    def get_listing_validators(self, request):
+        """Return ETag and Last-Modified of the user tags listing.
+
+        Both come from the user sync clock, advanced by every tag change.
+        """
+        seq, changed = models.SyncClock.objects.get_state(request.user.id)
+        etag = make_etag(self.action, request.accepted_media_type, seq)
+        return etag, changed
+
+    def get_last_modified(self, instance):
+        """Return last modification of the owner tasks and tags."""
+        return models.SyncClock.objects.get_state(instance.owner_id)[1]
+
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(filters.TaskListingMixin, ReplicaReadMixin,
+                  ConditionalDetailMixin, viewsets.ModelViewSet):
     """Manage tasks API."""
     queryset = models.Task.objects.all()
     serializer_class = serializers.TaskDetailSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = pagination.KeysetPagination
+    throttle_scope = 'tasks'
+    # The export body is streamed after the view returns, its queries per
+    # chunk are checked by the export tests instead.
+    query_budget = {
+        'list': 5,
+        'retrieve': 3,
+        'create': 15,
+        'update': 17,
+        'partial_update': 17,
+        'destroy': 9,
+        'today_tasks': 6,
+        'calendar': 8,
+        'archived_tasks': 5,
+        'archive': 5,
+        'unarchive': 5,
+        'bulk_archive': 8,
+        'bulk_unarchive': 8,
+        'bulk': 26,
+        'changes': 7,
+        'stats': 3,
+        'occurrence': 9,
+    }
+    export_chunk_size = 2000
+    # Detail actions also serving tasks of the archive table.
+    archived_object_actions = ('retrieve', 'update', 'partial_update',
+                               'destroy', 'archive', 'unarchive')
 
     def get_queryset(self):
         """Retrieve tasks for authenticated user."""
-        self.queryset = models.Task.objects.get_owner_tasks(self.request.user)
+        queryset = models.Task.objects.get_owner_tasks(self.request.user)
+        if self.action not in ('destroy', 'archive', 'unarchive',
+                               'bulk_archive', 'bulk_unarchive',
+                               'occurrence'):
+            queryset = queryset.with_tags()
+
+        self.queryset = queryset
         return super().get_queryset()
 
     def get_serializer_class(self, *args, **kwargs):
         """Return the serializer class for request."""
         match self.action:
-            case 'list' | 'todays_tasks' | 'archived_tasks':
+            case 'list' | 'today_tasks' | 'archived_tasks':
                 return serializers.TaskSerializer
+            case 'bulk':
+                return serializers.TaskBulkSerializer
+            case 'changes':
+                return serializers.TaskChangesSerializer
+            case 'stats':
+                return serializers.TaskStatsSerializer
+            case 'calendar':
+                return serializers.TaskCalendarSerializer
+            case 'occurrence':
+                return serializers.TaskOccurrenceSerializer
             case 'archive' | 'unarchive':
                 return None
+            case 'bulk_archive' | 'bulk_unarchive':
+                return serializers.TaskIdsSerializer
 
         return self.serializer_class
 
+    @conditional_listing
+    @cache_listing
+    def list(self, request, *args, **kwargs):
+        """List tasks, those of the archive table unless unarchived only."""
+        archived = self.get_archived_queryset() \
+            if self.includes_archive_table(request) else None
+        return self.paginated_response(self.get_queryset(), archived)
+
+    def get_archived_queryset(self):
+        """Retrieve tasks of the archive table for authenticated user."""
+        return models.ArchivedTask.objects.get_owner_tasks(self.request.user)
+
+    def get_object(self):
+        """Return the task, falling back to the archive table.
+
+        Archived tasks are read from it and restored to the task table
+        before being changed. Archiving them again is refused as it is
+        for tasks of the task table, without restoring them.
+        """
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action not in self.archived_object_actions:
+                raise
+
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        archived = self.get_archived_queryset()
+        if self.action == 'retrieve':
+            return get_object_or_404(archived.with_tags(), pk=lookup)
+        if self.action == 'archive' and lookup.isdigit() \
+                and archived.filter(pk=lookup).exists():
+            raise exceptions.ValidationError(
+                {'error': _('Task is already archived.')})
+        if not lookup.isdigit() or not archived.filter(pk=lookup).restore():
+            raise Http404
+        return super().get_object()
+
+    def get_listing_validators(self, request):
+        """Return ETag and Last-Modified of a user tasks listing.
+
+        Both come from the user sync clock, advanced in the transaction of
+        every task and tag change including deletes and retagging, so all
+        processes agree on them.
+        """
+        seq, changed = models.SyncClock.objects.get_state(request.user.id)
+        etag = make_etag(self.action, request.accepted_media_type, seq,
+                         *self.get_listing_time_parts(request))
+        return etag, changed
+
+    def get_listing_time_parts(self, request):
+        """Return parts of a listing key changing without task changes.
+
+        Days are those of the user time zone, and today tasks change with
+        the date. Tasks become overdue as time passes.
+        """
+        parts = []
+        if self.action in ('today_tasks', 'calendar'):
+            parts.append(request.user.timezone)
+        if self.action == 'today_tasks':
+            parts.append(
+                timezone.localdate(timezone=request.user.get_timezone()))
+        if 'overdue' in request.query_params:
+            parts.append(int(timezone.now().timestamp() // 60))
+        return parts
+
     def perform_create(self, serializer):
         """Create a new task."""
         serializer.save(owner=self.request.user)
 
+    def paginated_response(self, queryset, archived=None, occurrences=None):
+        """Return paginated response with serialized queryset.
+
+        Listings are read-only, so they are serialized from ``.values()``
+        rows by the row serializer of the action serializer class. Tasks
+        of the archived queryset, of the archive table, are merged in.
+        Recurring tasks with an occurrence, mapped by task id, are listed
+        at that occurrence.
+        """
+        serializer = get_task_row_serializer(self.get_serializer_class())
+        extra = [field.lstrip('-')
+                 for field in self.get_keyset_ordering(self.request)]
+        rows = serializer.get_rows(self.filter_queryset(queryset),
+                                   extra=extra)
+        if archived is None:
+            page = self.paginate_queryset(rows)
+        else:
+            rows = [rows, serializer.get_rows(self.filter_queryset(archived),
+                                              extra=extra)]
+            page = self.paginator.paginate_querysets(rows, self.request,
+                                                     view=self)
+            rows = itertools.chain(*rows)
+        tasks = serializer.to_representation(
+            rows if page is None else page, archived is not None)
+        if occurrences:
+            tasks = serializer.to_occurrences(tasks, occurrences)
+        if page is None:
+            return Response(tasks, status=status.HTTP_200_OK)
+
+        return self.get_paginated_response(tasks)
+
     @action(methods=['GET'],
             detail=False,
             url_path='today')
+    @conditional_listing
+    @cache_listing
     def today_tasks(self, request):
-        """Return today tasks."""
-        queryset = models.Task.objects.get_today_tasks()
-        serializer = self.get_serializer(queryset, many=True)
+        """Return today tasks, recurring ones at their occurrence today."""
+        tz = request.user.get_timezone()
+        occurrences = {
+            occurrence.task_id: occurrence
+            for occurrence in self.get_queryset().get_unarchived_tasks()
+            .get_occurrences(*models.get_today_range(tz), tz)
+        }
+        queryset = self.get_queryset().get_today_tasks(tz) | \
+            self.get_queryset().filter(id__in=occurrences)
+        return self.paginated_response(queryset, occurrences=occurrences)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @action(methods=['GET'],
+            detail=False,
+            url_path='calendar')
+    @conditional_listing
+    @cache_listing
+    def calendar(self, request):
+        """Return tasks with event on the requested days, grouped by day.
+
+        Days are dates of the user time zone from start up to, but not
+        including, end. Every day is listed, its tasks in event date order
+        read from the owner event date index of both tables. Recurring
+        tasks are listed at each of their occurrences on these days.
+        """
+        window = self.get_serializer(data=request.query_params.dict())
+        window.is_valid(raise_exception=True)
+        start, end = window.validated_data['start'], \
+            window.validated_data['end']
+        tz = request.user.get_timezone()
+
+        tasks = self.filter_queryset(self.get_queryset())
+        querysets = [tasks.get_one_off_tasks().get_days(start, end, tz)]
+        if archived := self.includes_archive_table(request):
+            querysets.append(self.filter_queryset(
+                self.get_archived_queryset()).get_days(start, end, tz))
+        occurrences = list(tasks.get_occurrences(
+            models.get_day_start(start, tz), models.get_day_start(end, tz),
+            tz))
+        if occurrences:
+            querysets.append(tasks.filter(
+                id__in={occurrence.task_id for occurrence in occurrences}))
+        serializer = get_task_row_serializer(serializers.TaskSerializer)
+        rows = list(itertools.chain.from_iterable(
+            serializer.get_rows(queryset).order_by()
+            for queryset in querysets))
+
+        entries = []
+        recurring = {}
+        for row, task in zip(rows,
+                             serializer.to_representation(rows, archived)):
+            if row['recurrence']:
+                recurring[row['id']] = task
+            else:
+                entries.append((row['event_date'], row['id'], task))
+        entries.extend(
+            (occurrence.date, occurrence.task_id,
+             serializer.to_occurrence(recurring[occurrence.task_id],
+                                      occurrence))
+            for occurrence in occurrences)
+        days = {start + timezone.timedelta(days=offset): []
+                for offset in range((end - start).days)}
+        for date, task_id, task in sorted(entries,
+                                          key=lambda entry: entry[:2]):
+            days[timezone.localdate(date, tz)].append(task)
+
+        return Response({
+            'start': start,
+            'end': end,
+            'timezone': request.user.timezone,
+            'days': [{'date': date, 'tasks': tasks}
+                     for date, tasks in days.items()],
+        }, status=status.HTTP_200_OK)
 
     @action(methods=['GET'],
             detail=False,
             url_path='archived')
+    @conditional_listing
+    @cache_listing
     def archived_tasks(self, request):
-        """Return archived tasks."""
-        queryset = models.Task.objects.get_archived_tasks()
-        serializer = self.get_serializer(queryset, many=True)
+        """Return archived tasks of both tables."""
+        queryset = self.get_queryset().get_archived_tasks()
+        return self.paginated_response(queryset,
+                                       self.get_archived_queryset())
+
+    @action(methods=['POST'],
+            detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """Create, update and delete many tasks at once."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(owner=request.user)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=['POST'],
+            detail=False,
+            url_path='bulk/archive')
+    def bulk_archive(self, request):
+        """Archive many tasks at once."""
+        return self.set_archived(request, True)
+
+    @action(methods=['POST'],
+            detail=False,
+            url_path='bulk/unarchive')
+    def bulk_unarchive(self, request):
+        """Unarchive many tasks at once."""
+        return self.set_archived(request, False)
+
+    def set_archived(self, request, archived):
+        """Set archived state of the requested tasks.
+
+        Tasks already in the state are skipped, ids of the changed tasks
+        are returned.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changed = self.get_queryset() \
+            .filter(id__in=serializer.validated_data['ids']) \
+            .set_archived(archived)
+        if changed:
+            invalidate_owner_listings(request.user.id)
+
+        return Response({'ids': [task_id for task_id, owner_id in changed]},
+                        status=status.HTTP_200_OK)
+
+    @action(methods=['GET'],
+            detail=False,
+            url_path='changes')
+    def changes(self, request):
+        """Return tasks and tags changed since the sync token."""
+        since = request.query_params.get('since')
+        if since is not None and not since.isdigit():
+            raise exceptions.ValidationError(
+                {'since': _('Invalid sync token.')})
+
+        changes = get_changes(
+            request.user, since=None if since is None else int(since),
+            limit=self.paginator.get_page_size(request))
+        serializer = self.get_serializer(changes)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'],
+            detail=False,
+            url_path='stats')
+    def stats(self, request):
+        """Return task counts of the user."""
+        stats = models.TaskStats.objects.filter(owner=request.user).first() \
+            or models.TaskStats(owner=request.user)
+        due = models.Task.objects.get_owner_tasks(request.user) \
+            .count_due(request.user.get_timezone())
+        serializer = self.get_serializer({**stats.get_counters(), **due})
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'],
+            detail=False,
+            url_path='export',
+            renderer_classes=[renderers.NDJSONRenderer,
+                              renderers.CSVRenderer])
+    def export(self, request):
+        """Stream every task of the user as NDJSON or CSV.
+
+        Tasks of the archive table follow those of the task table.
+        """
+        renderer = request.accepted_renderer
+        lines = get_task_row_serializer(self.get_serializer_class()) \
+            .render_lines(self.get_queryset(), self.get_archived_queryset(),
+                          renderer, self.export_chunk_size)
+
+        response = StreamingHttpResponse(
+            lines, content_type=f'{renderer.media_type}; '
+                                f'charset={renderer.charset}')
+        response['Content-Disposition'] = \
+            f'attachment; filename="tasks.{renderer.format}"'
+        return response
+
     @action(methods=['POST'],
             detail=True,
             url_path='archive')
@@ -109,3 +464,18 @@ class TaskViewSet(viewsets.ModelViewSet):
             {'message': _(f'Task "{task}" has been successfully unarchived.')},
             status=status.HTTP_200_OK,
         )
+
+    @action(methods=['POST'],
+            detail=True,
+            url_path='occurrences')
+    def occurrence(self, request, pk=None):
+        """Complete, skip or reschedule an occurrence of a recurring task."""
+        task = self.get_object()
+        serializer = self.get_serializer(
+            data=request.data,
+            context={**self.get_serializer_context(), 'task': task,
+                     'tz': request.user.get_timezone()})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,65 @@
+"""
+Todo listings cache.
+
+Rendered task listings are cached per user. Every key embeds a per-user
+version token, so invalidating all listings of a user only replaces the
+token and the orphaned entries age out of the LRU.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+LISTINGS_CACHE = 'listings'
+
+
+def get_listings_cache():
+    """Return cache holding rendered listings."""
+    return caches[LISTINGS_CACHE]
+
+
+def _version_key(owner_id):
+    return f'todo:listings:version:{owner_id}'
+
+
+def get_owner_version(owner_id):
+    """Return current listings version of owner."""
+    cache = get_listings_cache()
+    key = _version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def _bump_owner_version(owner_id):
+    get_listings_cache().set(_version_key(owner_id), uuid4().hex,
+                             timeout=None)
+
+
+def invalidate_owner_listings(owner_id):
+    """Invalidate cached listings of owner.
+
+    The version is replaced right away and again once the transaction
+    commits, so listings cached from uncommitted state are dropped too.
+    """
+    _bump_owner_version(owner_id)
+    transaction.on_commit(lambda: _bump_owner_version(owner_id))
+
+
+def get_listing_key(owner_id, action, *parts):
+    """Return cache key of owner listing identified by action and parts."""
+    digest = hashlib.md5(
+        '|'.join(map(str, parts)).encode(), usedforsecurity=False)
+    return (f'todo:listings:{owner_id}:{get_owner_version(owner_id)}:'
+            f'{action}:{digest.hexdigest()}')
+
+
+def get_max_entry_size():
+    """Return size in bytes of the largest listing worth caching."""
+    return getattr(settings, 'LISTINGS_CACHE_MAX_ENTRY_SIZE', 512 * 1024)
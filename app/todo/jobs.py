@@ -0,0 +1,129 @@
+"""
+Todo background jobs.
+
+Heavy task operations run by the run_worker command instead of a request,
+see ``core.jobs``. Each of them is safe to run again after a failure.
+"""
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from rest_framework import serializers
+
+from core.jobs import register
+from core.models import ImportCheckpoint
+from todo.api import renderers
+from todo.api.rows import get_task_row_serializer
+from todo.api.serializers import (
+    TaskDetailSerializer,
+    TaskIdsSerializer,
+)
+from todo.cache import invalidate_owner_listings
+from todo.models import (
+    ArchivedTask,
+    Task,
+)
+
+
+EXPORT_RENDERERS = {
+    renderer.format: renderer
+    for renderer in (renderers.NDJSONRenderer, renderers.CSVRenderer)
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ExportJobSerializer(serializers.Serializer):
+    """Task export job payload serializer."""
+    format = serializers.ChoiceField(choices=list(EXPORT_RENDERERS),
+                                     default='ndjson')
+
+
+class ImportJobSerializer(serializers.Serializer):
+    """Task import job payload serializer."""
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=list(EXPORT_RENDERERS),
+                                     required=False)
+
+
+class BulkArchiveJobSerializer(TaskIdsSerializer):
+    """Bulk archive job payload serializer."""
+    archived = serializers.BooleanField(default=True)
+
+
+def get_job_path(job, name):
+    """Return the path of a file of job, creating its directory."""
+    directory = Path(settings.JOB_FILES_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'job-{job.id}-{name}'
+
+
+@register('export', ExportJobSerializer)
+def export_tasks(job):
+    """Export every task of the job owner to a file.
+
+    The file is written aside, to a file of its own for every run, and
+    renamed when complete, so a repeated run replaces it and overlapping
+    runs never write to the same file.
+    """
+    renderer = EXPORT_RENDERERS[job.payload.get('format', 'ndjson')]()
+    path = get_job_path(job, f'tasks.{renderer.format}')
+    lines = get_task_row_serializer(TaskDetailSerializer).render_lines(
+        Task.objects.get_owner_tasks(job.owner),
+        ArchivedTask.objects.get_owner_tasks(job.owner),
+        renderer, EXPORT_CHUNK_SIZE)
+    with tempfile.NamedTemporaryFile(
+            'w', encoding=renderer.charset, newline='', dir=path.parent,
+            prefix=f'{path.name}.', suffix='.tmp', delete=False) as file:
+        try:
+            file.writelines(lines)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    os.replace(file.name, path)
+
+    return {'path': str(path), 'format': renderer.format,
+            'media_type': renderer.media_type}
+
+
+@register('import', ImportJobSerializer)
+def import_tasks(job):
+    """Import tasks of an uploaded file for the job owner.
+
+    Owners of the rows are ignored. The import is checkpointed under the
+    job, so a repeated run resumes after the rows already imported.
+    """
+    name = f'job-{job.id}'
+    call_command('import_tasks', job.payload['file'],
+                 format=job.payload.get('format'), owner=job.owner.email,
+                 owner_only=True, checkpoint=name, stdout=io.StringIO(),
+                 stderr=io.StringIO())
+    invalidate_owner_listings(job.owner_id)
+
+    checkpoint = ImportCheckpoint.objects.get(name=name)
+    return {'imported': checkpoint.imported, 'skipped': checkpoint.skipped}
+
+
+@register('bulk_archive', BulkArchiveJobSerializer)
+def bulk_archive_tasks(job):
+    """Archive or unarchive tasks of the job owner by their ids."""
+    changed = Task.objects.get_owner_tasks(job.owner) \
+        .filter(id__in=job.payload['ids']) \
+        .set_archived(job.payload.get('archived', True))
+    if changed:
+        invalidate_owner_listings(job.owner_id)
+
+    return {'ids': [task_id for task_id, owner_id in changed]}
+
+
+@register('rebuild_task_stats', serializers.Serializer,
+          staff_only=True)
+def rebuild_task_stats(job):
+    """Recount the task stats of every user."""
+    output = io.StringIO()
+    call_command('rebuild_task_stats', stdout=output)
+
+    return {'output': output.getvalue().strip()}
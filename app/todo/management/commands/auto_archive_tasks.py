@@ -0,0 +1,69 @@
+"""
+Django command to archive done and stale tasks of every user.
+"""
+import time
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db.models import Q
+from django.utils import timezone
+
+from todo.cache import invalidate_owner_listings
+from todo.models import Task
+
+
+class Command(BaseCommand):
+    """Django command to auto-archive tasks in batches."""
+    help = ('Archive tasks whose event, or recurrence end, passed '
+            '--done-days ago or which were not updated for --stale-days.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--done-days', type=int, default=7)
+        parser.add_argument('--stale-days', type=int, default=180)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['done_days'] < 0 or options['stale_days'] < 0:
+            raise CommandError('Ages must not be negative.')
+
+        now = timezone.now()
+        done = now - timezone.timedelta(options['done_days'])
+        # Recurring tasks are done once their recurrence ended, their event
+        # date is only the first occurrence.
+        candidates = Task.objects.get_unarchived_tasks().filter(
+            Q(recurrence='', event_date__lt=done)
+            | Q(recurrence_end__lt=done)
+            | Q(updated_date__lt=now - timezone.timedelta(
+                options['stale_days'])),
+        )
+        candidate_ids = candidates.order_by('id').values_list('id', flat=True)
+
+        archived = 0
+        last_id = 0
+        while ids := list(candidate_ids.filter(id__gt=last_id)
+                          [:options['batch_size']]):
+            last_id = ids[-1]
+            archived += self.archive_batch(candidates.filter(id__in=ids))
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tasks.'))
+
+    def archive_batch(self, tasks):
+        """Archive one batch of tasks and return the number archived.
+
+        Every batch commits on its own, so its row locks are held for one
+        batch only. Tasks changed since they were selected are checked
+        again while locked.
+        """
+        changed = tasks.set_archived()
+        for owner_id in {owner_id for task_id, owner_id in changed}:
+            invalidate_owner_listings(owner_id)
+
+        return len(changed)
@@ -0,0 +1,94 @@
+"""
+Django command to measure active task listings as archived tasks pile up.
+"""
+import statistics
+import time
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+from django.utils import timezone
+
+from todo.api.pagination import KeysetPagination
+from todo.api.rows import get_task_row_serializer
+from todo.api.serializers import TaskSerializer
+from todo.models import (
+    ArchivedTask,
+    Task,
+)
+
+
+class Command(BaseCommand):
+    """Django command benchmarking listings against archive volume."""
+    help = ('Read the first page of the unarchived tasks listing of a user '
+            'with growing numbers of archived tasks, kept in the task table '
+            'and moved to the archive table. Data is created in a '
+            'transaction rolled back at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--active', type=int, default=1000)
+        parser.add_argument('--archived', default='0,10000,100000',
+                            help='Comma separated archived task counts.')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            volumes = sorted(int(volume)
+                             for volume in options['archived'].split(','))
+        except ValueError:
+            raise CommandError('Archived counts must be integers.')
+
+        with transaction.atomic():
+            owner = get_user_model().objects.create_user(
+                email=f'benchmark-{uuid4().hex}@example.com')
+            self.create_tasks(owner, options['active'], archived=False)
+            self.stdout.write(f'{"archived":>10} {"hot p50":>9} '
+                              f'{"hot p99":>9} {"cold p50":>9} '
+                              f'{"cold p99":>9}')
+            created = 0
+            for volume in volumes:
+                # Tasks moved before are brought back to measure them hot.
+                ArchivedTask.objects.filter(owner=owner).restore()
+                self.create_tasks(owner, volume - created, archived=True)
+                created = volume
+                hot = self.measure(owner, options['repeat'])
+                ArchivedTask.objects.move(
+                    Task.objects.filter(owner=owner, is_archived=True))
+                cold = self.measure(owner, options['repeat'])
+                self.stdout.write(
+                    f'{volume:>10} {hot[0]:>6.2f} ms {hot[1]:>6.2f} ms '
+                    f'{cold[0]:>6.2f} ms {cold[1]:>6.2f} ms')
+            transaction.set_rollback(True)
+
+    def create_tasks(self, owner, count, archived):
+        """Create count tasks of owner."""
+        now = timezone.now()
+        Task.objects.bulk_create(
+            [Task(owner=owner, label=f'Task{i}', priority=i % 4,
+                  is_archived=archived,
+                  archived_date=now if archived else None)
+             for i in range(count)], batch_size=5000)
+
+    def measure(self, owner, repeat):
+        """Return p50 and p99 milliseconds of the unarchived first page."""
+        serializer = get_task_row_serializer(TaskSerializer)
+        ordering = KeysetPagination.ordering
+        rows = serializer.get_rows(
+            Task.objects.get_owner_tasks(owner).get_unarchived_tasks(),
+            extra=[field.lstrip('-') for field in ordering],
+        ).order_by(*ordering)[:KeysetPagination.page_size + 1]
+
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serializer.to_representation(rows.all())
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        quantiles = statistics.quantiles(latencies, n=100) \
+            if len(latencies) > 1 else latencies * 99
+        return quantiles[49], quantiles[98]
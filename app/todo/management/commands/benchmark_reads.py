@@ -0,0 +1,89 @@
+"""
+Django command to compare read throughput of WSGI and ASGI deployments.
+"""
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+# Synchronous paths and their async counterparts.
+READ_PATHS = {
+    '/api/todo/tasks/': '/api/todo/async/tasks/',
+    '/api/todo/tasks/today/': '/api/todo/async/tasks/today/',
+    '/api/todo/tags/': '/api/todo/async/tags/',
+}
+
+
+class Command(BaseCommand):
+    """Django command benchmarking concurrent reads."""
+    help = ('Send concurrent task and tag reads to a WSGI deployment '
+            '(scripts/run.sh) and an ASGI one (scripts/run_asgi.sh) started '
+            'with the same number of workers and report their throughput. '
+            'Throttle rates of the tasks scope should be raised for the run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://localhost:8000')
+        parser.add_argument('--asgi-url', default='http://localhost:8001')
+        parser.add_argument('--email', required=True,
+                            help='User whose data is read.')
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User "{options["email"]}" does not exist.')
+        token = str(AccessToken.for_user(user))
+
+        targets = [
+            ('WSGI', options['wsgi_url'], list(READ_PATHS)),
+            ('ASGI', options['asgi_url'], list(READ_PATHS.values())),
+        ]
+        for name, base_url, paths in targets:
+            urls = [base_url.rstrip('/') + paths[i % len(paths)]
+                    for i in range(options['requests'])]
+            result = self.run(urls, token, options['concurrency'])
+            self.stdout.write(
+                f'{name}: {result["throughput"]:.0f} req/s, '
+                f'p50 {result["p50"]:.1f} ms, p99 {result["p99"]:.1f} ms, '
+                f'{result["errors"]} errors')
+
+    def run(self, urls, token, concurrency):
+        """Request urls concurrently and return throughput and latencies."""
+        def fetch(url):
+            request = urllib.request.Request(
+                url, headers={'Authorization': f'Bearer {token}'})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for ok, latency in results if ok)
+        quantiles = statistics.quantiles(latencies, n=100) \
+            if len(latencies) > 1 else latencies * 99 or [0] * 99
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': quantiles[49],
+            'p99': quantiles[98],
+            'errors': len(results) - len(latencies),
+        }
@@ -0,0 +1,60 @@
+"""
+Django command to move archived tasks to the archive table.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from todo.models import (
+    ArchivedTask,
+    Task,
+)
+
+
+class Command(BaseCommand):
+    """Django command to move archived tasks out of the task table."""
+    help = ('Move tasks archived longer than TASK_ARCHIVE_GRACE to the '
+            'archive table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-days', type=int,
+            help='Days tasks stay archived in the task table, overrides '
+                 'TASK_ARCHIVE_GRACE.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        grace = settings.TASK_ARCHIVE_GRACE \
+            if options['grace_days'] is None else \
+            timezone.timedelta(days=options['grace_days'])
+        # Served by the partial archived_date index of archived tasks.
+        due = Task.objects.get_archived_tasks().filter(
+            archived_date__lt=timezone.now() - grace)
+        candidates = due.order_by('archived_date', 'id') \
+            .values_list('archived_date', 'id')
+
+        moved = 0
+        last = None
+        while True:
+            batch = candidates if last is None else candidates.filter(
+                Q(archived_date__gt=last[0]) |
+                Q(archived_date=last[0], id__gt=last[1]))
+            batch = list(batch[:options['batch_size']])
+            if not batch:
+                break
+            last = batch[-1]
+            # Each batch commits on its own. Tasks changed or locked
+            # meanwhile are left in place.
+            moved += ArchivedTask.objects.move(due.filter(
+                id__in=[task_id for archived_date, task_id in batch]))
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} tasks.'))
@@ -0,0 +1,53 @@
+"""
+Django command to purge tombstones past their retention.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    F,
+    Max,
+)
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from todo.models import (
+    SyncClock,
+    Tombstone,
+)
+from todo.sync import get_tombstone_retention
+
+
+class Command(BaseCommand):
+    """Django command to purge expired tombstones."""
+    help = 'Delete tombstones older than SYNC_TOMBSTONE_RETENTION.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - get_tombstone_retention()
+        purged = 0
+        while batch := self.purge_batch(cutoff, options['batch_size']):
+            purged += batch
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} tombstones.'))
+
+    @transaction.atomic
+    def purge_batch(self, cutoff, batch_size):
+        """Purge one batch of tombstones and return its size."""
+        ids = list(Tombstone.objects.filter(deleted_date__lt=cutoff)
+                   .order_by('deleted_date')
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        tombstones = Tombstone.objects.filter(id__in=ids)
+        horizons = tombstones.order_by().values('owner_id') \
+            .annotate(horizon=Max('seq'))
+        for row in horizons:
+            # Tokens older than a purged tombstone could miss its deletion.
+            SyncClock.objects.filter(owner_id=row['owner_id']).update(
+                horizon=Greatest(F('horizon'), row['horizon']))
+
+        return tombstones.delete()[0]
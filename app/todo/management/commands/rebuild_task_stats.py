@@ -0,0 +1,79 @@
+"""
+Django command to rebuild the task stats from a full recount.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+
+from todo.models import TaskStats
+
+
+class Command(BaseCommand):
+    """Django command to recount task stats of every user."""
+    help = 'Recount the task stats of every user and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drifted stats, failing if there are any.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        owner_ids = get_user_model().objects.order_by('id') \
+            .values_list('id', flat=True)
+        batch_size = options['batch_size']
+        checked = drifted = 0
+        last_id = 0
+        while batch := list(owner_ids.filter(id__gt=last_id)[:batch_size]):
+            last_id = batch[-1]
+            checked += len(batch)
+            for owner_id, stored, counted in self.rebuild_batch(
+                    batch, options['check']):
+                drifted += 1
+                changes = ', '.join(
+                    f'{name} {stored[name]} != {counted[name]}'
+                    for name in TaskStats.COUNTER_FIELDS
+                    if stored[name] != counted[name])
+                self.stdout.write(f'User {owner_id}: {changes}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(
+                    f'Task stats of {drifted} of {checked} users drifted.')
+            self.stdout.write(self.style.SUCCESS(
+                f'Task stats of {checked} users are correct.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed task stats of {drifted} of {checked} users.'))
+
+    @transaction.atomic
+    def rebuild_batch(self, owner_ids, check):
+        """Recount stats of owners and return those drifted.
+
+        The stats rows are locked before counting, so task writes racing
+        the recount are counted either in it or on top of its result.
+        """
+        if not check:
+            TaskStats.objects.bulk_create(
+                [TaskStats(owner_id=owner_id) for owner_id in owner_ids],
+                ignore_conflicts=True)
+        stored = TaskStats.objects.select_for_update() \
+            .filter(owner_id__in=owner_ids).in_bulk()
+        counted = TaskStats.objects.recount(owner_ids)
+
+        drifted = []
+        for owner_id, counters in counted.items():
+            stats = stored.get(owner_id) or TaskStats(owner_id=owner_id)
+            if stats.get_counters() == counters:
+                continue
+            drifted.append((owner_id, stats.get_counters(), counters))
+            if not check:
+                for name, value in counters.items():
+                    setattr(stats, name, value)
+                stats.save(update_fields=TaskStats.COUNTER_FIELDS)
+
+        return drifted
@@ -0,0 +1,96 @@
+"""
+Django command to run the task reminder scheduler.
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.utils import timezone
+
+from todo.reminders import (
+    ReminderScheduler,
+    get_sink,
+)
+
+
+class Command(BaseCommand):
+    """Django command to deliver task reminders until stopped."""
+    help = ('Deliver reminders TASK_REMINDER_LEAD before task events, '
+            'following task changes as they are made.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sink', default='log',
+            help='Sink name, log or file, or dotted path of a sink class.')
+        parser.add_argument('--sink-path', help='File of the file sink.')
+        parser.add_argument(
+            '--horizon-minutes', type=int, default=60,
+            help='Minutes of upcoming reminders kept in memory.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=5,
+            help='Seconds between reads of task changes.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--metrics-file',
+            help='File the metrics are written to in the Prometheus text '
+                 'format after every tick.')
+        parser.add_argument(
+            '--run-for', type=float, default=0,
+            help='Seconds to run for, forever by default.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['horizon_minutes'] < 1 or options['poll_interval'] <= 0:
+            raise CommandError('Horizon and poll interval must be positive.')
+        sink_options = {}
+        if options['sink_path']:
+            sink_options['path'] = options['sink_path']
+        try:
+            sink = get_sink(options['sink'], **sink_options)
+        except (ImportError, TypeError) as error:
+            raise CommandError(f'Invalid sink: {error}')
+
+        self.stopped = False
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        scheduler = ReminderScheduler(
+            sink, settings.TASK_REMINDER_LEAD,
+            timezone.timedelta(minutes=options['horizon_minutes']),
+            batch_size=options['batch_size'])
+        deadline = options['run_for'] and \
+            time.monotonic() + options['run_for']
+        try:
+            scheduler.start()
+            while not self.stopped:
+                scheduler.tick()
+                if options['metrics_file']:
+                    scheduler.metrics.export(options['metrics_file'])
+                if deadline and time.monotonic() >= deadline:
+                    break
+                self.sleep(scheduler, options['poll_interval'], deadline)
+        finally:
+            sink.close()
+
+        metrics = scheduler.metrics
+        self.stdout.write(self.style.SUCCESS(
+            f'Delivered {metrics.delivered} reminders, '
+            f'p99 lag {metrics.get_lag(0.99):.3f}s.'))
+
+    def sleep(self, scheduler, poll_interval, deadline):
+        """Sleep until the next reminder is due or the next poll."""
+        seconds = poll_interval
+        if (due := scheduler.get_next_due()) is not None:
+            seconds = min(seconds, (due - timezone.now()).total_seconds())
+        if deadline:
+            seconds = min(seconds, deadline - time.monotonic())
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def stop(self, signum, frame):
+        """Stop the scheduler after its current tick."""
+        self.stopped = True
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:37
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Label words weigh more than description words in search ranking.
+CREATE_SEARCH = """
+CREATE FUNCTION todo_task_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.label, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER todo_task_search_vector_update
+    BEFORE INSERT OR UPDATE OF label, description, search_vector
+    ON todo_task FOR EACH ROW EXECUTE FUNCTION todo_task_search_vector();
+
+UPDATE todo_task SET search_vector = NULL;
+
+CREATE INDEX task_search_vector_idx ON todo_task USING gin (search_vector);
+CREATE INDEX task_label_trgm_idx ON todo_task USING gin (label gin_trgm_ops);
+"""
+
+DROP_SEARCH = """
+DROP INDEX task_label_trgm_idx;
+DROP INDEX task_search_vector_idx;
+DROP TRIGGER todo_task_search_vector_update ON todo_task;
+DROP FUNCTION todo_task_search_vector();
+"""
+
+
+def create_search(apps, schema_editor):
+    """Maintain and index task search vectors on PostgreSQL."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0003_sync'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0004_task_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_owner_archived_created',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_owner_priority_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_owner_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'is_archived', '-created_date', '-id'], name='task_owner_archived_created'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'event_date', 'id'], name='task_owner_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'priority', 'id'], name='task_owner_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'updated_date', 'id'], name='task_owner_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+PRIORITY_FIELDS = {
+    3: 'high_priority',
+    2: 'medium_priority',
+    1: 'low_priority',
+    0: 'no_priority',
+}
+
+
+def count_tasks(apps, schema_editor):
+    """Create the stats of every user from their tasks."""
+    Task = apps.get_model('todo', 'Task')
+    TaskStats = apps.get_model('todo', 'TaskStats')
+    using = schema_editor.connection.alias
+    active = models.Q(is_archived=False)
+    counts = Task.objects.using(using).order_by().values('owner_id').annotate(
+        total=models.Count('id'),
+        archived=models.Count('id', filter=models.Q(is_archived=True)),
+        **{name: models.Count('id', filter=active & models.Q(priority=priority))
+           for priority, name in PRIORITY_FIELDS.items()})
+    counts = {row.pop('owner_id'): row for row in counts}
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    owner_ids = User.objects.using(using).values_list('id', flat=True)
+    TaskStats.objects.using(using).bulk_create(
+        [TaskStats(owner_id=owner_id, **counts.get(owner_id, {}))
+         for owner_id in owner_ids.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_import_checkpoint'),
+        ('todo', '0005_task_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStats',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('archived', models.IntegerField(default=0)),
+                ('high_priority', models.IntegerField(default=0)),
+                ('medium_priority', models.IntegerField(default=0)),
+                ('low_priority', models.IntegerField(default=0)),
+                ('no_priority', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'task stats',
+            },
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
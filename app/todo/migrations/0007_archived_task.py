@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:57
+
+from django.conf import settings
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo', '0006_task_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('sync_seq', models.BigIntegerField(default=0, editable=False)),
+                ('label', models.CharField(max_length=80)),
+                ('description', models.TextField(blank=True)),
+                ('created_date', models.DateTimeField()),
+                ('updated_date', models.DateTimeField()),
+                ('event_date', models.DateTimeField(null=True)),
+                ('is_archived', models.BooleanField(default=True)),
+                ('archived_date', models.DateTimeField(blank=True, null=True)),
+                ('priority', models.PositiveSmallIntegerField(choices=[(3, 'High'), (2, 'Medium'), (1, 'Low'), (0, '-')])),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTaskTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', True)), fields=['archived_date', 'id'], name='task_archived_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedtasktag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='todo.tag'),
+        ),
+        migrations.AddField(
+            model_name='archivedtasktag',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='todo.archivedtask'),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='tags',
+            field=models.ManyToManyField(related_name='archived_tasks', through='todo.ArchivedTaskTag', to='todo.tag'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedtasktag',
+            unique_together={('task', 'tag')},
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['owner', '-created_date', '-id'], name='archivedtask_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['owner', 'sync_seq'], name='archivedtask_owner_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:15
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0007_archived_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateTimeField()),
+                ('state', models.CharField(choices=[('completed', 'Completed'), ('skipped', 'Skipped')], max_length=9)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('recurrence', ''), _negated=True), fields=['owner', 'event_date'], name='task_owner_recurring_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskoccurrence',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='todo.task'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskoccurrence',
+            unique_together={('task', 'original_date')},
+        ),
+    ]
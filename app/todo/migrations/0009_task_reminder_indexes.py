@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0008_task_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False), ('recurrence', '')), fields=['event_date', 'id'], name='task_reminder_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_date', 'id'], name='task_updated_idx'),
+        ),
+    ]
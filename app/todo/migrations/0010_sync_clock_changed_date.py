@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0009_task_reminder_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncclock',
+            name='changed_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
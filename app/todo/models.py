@@ -1,20 +1,301 @@
-from django.db import models
+import datetime
+import re
+from collections import (
+    Counter,
+    defaultdict,
+)
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+    TrigramSimilarity,
+)
+from django.db import (
+    connections,
+    models,
+    router,
+    transaction,
+)
+from django.db.models.functions import Cast
 from django.conf import settings
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.contrib.auth.models import BaseUserManager
+from django.core.validators import MinValueValidator
 
+from todo import recurrence
 
-class TaskManager(BaseUserManager):
-    """Task model manager."""
+
+class SyncClockManager(models.Manager):
+    """Sync clock model manager."""
+
+    def advance(self, owner_id, count=1):
+        """Reserve count change numbers of owner and return the first one.
+
+        Must run inside the transaction writing the changes. The clock row
+        stays locked until it ends, so the changes of an owner become
+        visible in the order of their numbers.
+        """
+        using = router.db_for_write(self.model)
+        if not transaction.get_connection(using).in_atomic_block:
+            raise transaction.TransactionManagementError(
+                'Sync clock can only be advanced inside a transaction.')
+
+        clock = self.using(using).filter(owner_id=owner_id)
+        changes = {'seq': models.F('seq') + count,
+                   'changed_date': timezone.now()}
+        if not clock.update(**changes):
+            self.using(using).get_or_create(owner_id=owner_id)
+            clock.update(**changes)
+
+        return clock.values_list('seq', flat=True).get() - count + 1
+
+    def get_state(self, owner_id):
+        """Return the last change number of owner and its timestamp.
+
+        Owners without any change have both zero.
+        """
+        state = self.filter(owner_id=owner_id) \
+            .values_list('seq', 'changed_date').first()
+        if state is None:
+            return 0, 0
+
+        return state[0], state[1].timestamp()
+
+
+class TombstoneManager(models.Manager):
+    """Tombstone model manager."""
+
+    def record(self, kind, objects):
+        """Record deletion of objects given as (id, owner id) pairs."""
+        owner_objects = defaultdict(list)
+        for object_id, owner_id in objects:
+            owner_objects[owner_id].append(object_id)
+
+        tombstones = []
+        for owner_id, object_ids in owner_objects.items():
+            seq = SyncClock.objects.advance(owner_id, len(object_ids))
+            tombstones.extend(
+                self.model(owner_id=owner_id, kind=kind,
+                           object_id=object_id, seq=seq + i)
+                for i, object_id in enumerate(object_ids))
+
+        self.bulk_create(tombstones)
+
+
+class SyncedQuerySet(models.QuerySet):
+    """Queryset of models whose changes are numbered for delta sync."""
+
+    def delete(self):
+        """Delete objects leaving tombstones behind."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            Tombstone.objects.record(self.model.TOMBSTONE_KIND,
+                                     self.values_list('id', 'owner_id'))
+            return super().delete()
+
+    def update_synced(self, **kwargs):
+        """Update objects giving each of them a new change number.
+
+        Every owner reserves a block of change numbers spanning the ids of
+        its objects, so a single UPDATE numbers each row differently.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            id_ranges = self.order_by().values('owner_id').annotate(
+                low=models.Min('id'), high=models.Max('id'))
+            updated = 0
+            for id_range in id_ranges:
+                low, high = id_range['low'], id_range['high']
+                seq = SyncClock.objects.advance(
+                    id_range['owner_id'], high - low + 1)
+                updated += self.filter(
+                    owner_id=id_range['owner_id'], id__range=(low, high),
+                ).update(sync_seq=models.F('id') + (seq - low), **kwargs)
+
+            return updated
+
+
+def get_day_start(day, tz):
+    """Return the aware datetime at which day starts in tz.
+
+    Days are half-open ranges between two such starts, so they last 23 or
+    25 hours across daylight saving changes.
+    """
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=tz)
+
+
+def get_today_range(tz):
+    """Return the start of the current date in tz and of the next one."""
+    today = timezone.localdate(timezone=tz)
+    return get_day_start(today, tz), \
+        get_day_start(today + timezone.timedelta(days=1), tz)
+
+
+class TaskQuerySet(SyncedQuerySet):
+    """Task model queryset."""
+
+    def delete(self):
+        """Delete tasks taking them off the owner stats."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            TaskStats.objects.apply(self._stats_changes())
+            return super().delete()
+
+    def update_synced(self, **kwargs):
+        """Update tasks moving them between the owner stats counters.
+
+        Counted fields may only be set to constants.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            if kwargs.keys() & TaskStats.STATE_FIELDS:
+                TaskStats.objects.apply(self._stats_changes(kwargs))
+            return super().update_synced(**kwargs)
+
+    def set_archived(self, archived=True):
+        """Archive or unarchive tasks not in that state yet.
+
+        The tasks are locked and then changed by one UPDATE per owner of
+        the archive fields only. Return (id, owner id) of changed tasks.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            changed = list(self.filter(is_archived=not archived)
+                           .select_for_update().order_by('id')
+                           .values_list('id', 'owner_id'))
+            if changed:
+                now = timezone.now()
+                self.model.objects.filter(
+                    id__in=[task_id for task_id, owner_id in changed],
+                ).update_synced(is_archived=archived,
+                                archived_date=now if archived else None,
+                                updated_date=now)
+
+        return changed
+
+    def _stats_changes(self, values=None):
+        """Return stats changes of updating tasks to values or deleting."""
+        changes = defaultdict(Counter)
+        groups = self.order_by().values('owner_id', *TaskStats.STATE_FIELDS) \
+            .annotate(count=models.Count('id'))
+        for group in groups:
+            old = {name: group[name] for name in TaskStats.STATE_FIELDS}
+            new = None if values is None else {**old, **{
+                name: values[name] for name in TaskStats.STATE_FIELDS
+                if name in values}}
+            changes[group['owner_id']].update(
+                TaskStats.get_changes(old, new, group['count']))
+
+        return changes
 
     def get_owner_tasks(self, owner):
         return self.filter(owner=owner)
 
-    def get_today_tasks(self):
-        """Retrieve archived tasks. """
-        now = timezone.now().date()
-        return self.filter(event_date__date=now, is_archived=True)
+    def get_tagged_with(self, tags):
+        """Retrieve tasks having any of the tags."""
+        through = self.model.tags.through
+        return self.filter(id__in=through.objects.filter(tag__in=tags)
+                           .values('task_id'))
+
+    def with_tags(self):
+        """Fetch task tags ordered by id in one additional query."""
+        return self.prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.order_by('id')))
+
+    def search(self, terms):
+        """Retrieve tasks matching terms annotated with their ``rank``.
+
+        On PostgreSQL every word must prefix a word of the label or the
+        description, matched against the stored search vector, or the label
+        must be similar to terms, matched by trigrams. Label matches rank
+        higher. Other databases fall back to case insensitive substring
+        matches of every word.
+        """
+        words = re.findall(r'\w+', terms)
+        if not words:
+            return self.annotate(rank=models.Value(0.0)).none()
+
+        if connections[self.db].vendor == 'postgresql':
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words),
+                                config=self.model.SEARCH_CONFIG,
+                                search_type='raw')
+            return self.filter(
+                models.Q(search_vector=query) |
+                models.Q(label__trigram_similar=terms),
+            ).annotate(rank=Cast(
+                SearchRank(models.F('search_vector'), query) +
+                TrigramSimilarity('label', terms),
+                models.FloatField()))
+
+        condition = models.Q()
+        rank = models.Value(0)
+        for word in words:
+            condition &= models.Q(label__icontains=word) | \
+                models.Q(description__icontains=word)
+            rank += models.Case(
+                models.When(label__icontains=word, then=2),
+                models.When(description__icontains=word, then=1),
+                default=0)
+        return self.filter(condition).annotate(
+            rank=Cast(rank, models.FloatField()))
+
+    def get_today_tasks(self, tz=None):
+        """Retrieve unarchived one-off tasks with event today in tz.
+
+        Today is the current date in tz, the current time zone by default,
+        matched as an event date range rather than a date cast of the
+        column so the owner event date index serves it. Recurring tasks
+        occurring today are found by ``get_occurrences``.
+        """
+        return self.get_one_off_tasks().get_event_date_range(
+            *get_today_range(tz or timezone.get_current_timezone()),
+        ).filter(is_archived=False)
+
+    def get_days(self, start, end, tz=None):
+        """Retrieve tasks with event on dates [start, end) in tz."""
+        tz = tz or timezone.get_current_timezone()
+        return self.get_event_date_range(get_day_start(start, tz),
+                                         get_day_start(end, tz))
+
+    def get_one_off_tasks(self):
+        """Retrieve tasks not recurring."""
+        return self.filter(recurrence='')
+
+    def get_recurring_tasks(self, start=None, end=None):
+        """Retrieve recurring tasks, those which may occur in [start, end).
+
+        Tasks first occurring at or after end, or ending at or before
+        start, are left out.
+        """
+        queryset = self.exclude(recurrence='')
+        if end is not None:
+            queryset = queryset.filter(event_date__lt=end)
+        if start is not None:
+            queryset = queryset.filter(
+                models.Q(recurrence_end__isnull=True) |
+                models.Q(recurrence_end__gt=start))
+        return queryset
+
+    def get_occurrences(self, start, end, tz):
+        """Return an iterator of occurrences of the tasks in [start, end).
+
+        The recurring tasks and the recorded states of their occurrences
+        are read in one query each, the occurrences are generated from
+        them in date order, see ``recurrence.expand``.
+        """
+        rules = list(self._get_rules(start, end))
+        states = TaskOccurrence.objects.get_states(
+            [rule['id'] for rule in rules], start, end)
+        return recurrence.expand(rules, states, start, end, tz)
+
+    async def aget_occurrences(self, start, end, tz):
+        """Return occurrences of the tasks in [start, end) read async."""
+        rules = [rule async for rule in
+                 self._get_rules(start, end).aiterator()]
+        states = await TaskOccurrence.objects.aget_states(
+            [rule['id'] for rule in rules], start, end)
+        return recurrence.expand(rules, states, start, end, tz)
+
+    def _get_rules(self, start, end):
+        return self.get_recurring_tasks(start, end).prefetch_related(None) \
+            .order_by().values(*recurrence.RULE_COLUMNS)
 
     def get_archived_tasks(self):
         """Retrieve archived tasks. """
@@ -41,13 +322,63 @@ class TaskManager(BaseUserManager):
         return self.filter(priority=Task.NO_PRIORITY)
 
     def get_overdue_tasks(self):
-        """Retrieve tasks that are overdue."""
+        """Retrieve one-off tasks that are overdue.
+
+        The event date of recurring tasks is their first occurrence, they
+        are never overdue.
+        """
         now = timezone.now()
-        return self.filter(event_date__lt=now, is_archived=False)
+        return self.get_one_off_tasks().filter(event_date__lt=now,
+                                               is_archived=False)
 
     def get_tasks_by_tags(self, tags):
-        """Retrieve tasks filtered by a specific tags."""
-        return self.filter(tags__name__in=tags, is_archived=False)
+        """Retrieve unarchived tasks having any of the tag names."""
+        return self.with_any_tags(tags).filter(is_archived=False)
+
+    def with_any_tags(self, names):
+        """Retrieve tasks having any of the tag names.
+
+        Membership is tested with EXISTS, so tasks matching several tags
+        are not duplicated as with a join.
+        """
+        return self.filter(models.Exists(self._tagged_with(names)))
+
+    def with_all_tags(self, names):
+        """Retrieve tasks having every one of the tag names."""
+        return self.filter(*(models.Exists(self._tagged_with([name]))
+                             for name in set(names)))
+
+    def _tagged_with(self, names):
+        return self.model.tags.through.objects.filter(
+            task_id=models.OuterRef('id'), tag__name__in=names)
+
+    def count_due(self, tz=None):
+        """Count unarchived one-off tasks overdue and due today in tz.
+
+        Both depend on the current time so they are counted on every call,
+        from the active tasks event date index. Recurring tasks are left
+        out, their event date is only their first occurrence.
+        """
+        tz = tz or timezone.get_current_timezone()
+        now = timezone.now()
+        date = timezone.localdate(now, timezone=tz)
+        today = get_day_start(date, tz)
+        due = self.get_unarchived_tasks().get_one_off_tasks() \
+            .get_event_date_range(
+                end=get_day_start(date + timezone.timedelta(days=1), tz))
+        return due.aggregate(
+            overdue=models.Count('id', filter=models.Q(event_date__lt=now)),
+            today=models.Count('id', filter=models.Q(event_date__gte=today)),
+        )
+
+    def get_event_date_range(self, start=None, end=None):
+        """Retrieve tasks whose event date is in [start, end)."""
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(event_date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(event_date__lt=end)
+        return queryset
 
     def get_recently_updated_tasks(self, days=7):
         """Retrieve tasks updated within the last 'days'."""
@@ -55,15 +386,113 @@ class TaskManager(BaseUserManager):
         return self.filter(updated_date__gte=cutoff_date, is_archived=False)
 
 
-class TagManager(BaseUserManager):
+class TaskManager(BaseUserManager.from_queryset(TaskQuerySet)):
+    """Task model manager."""
+
+    def set_tags(self, task_tags):
+        """Set tags of many tasks writing only the membership difference.
+
+        task_tags maps task ids to the collection of their tag ids.
+        """
+        through = self.model.tags.through
+        current = defaultdict(set)
+        rows = through.objects.filter(task_id__in=task_tags) \
+            .values_list('task_id', 'tag_id')
+        for task_id, tag_id in rows:
+            current[task_id].add(tag_id)
+
+        removed = models.Q()
+        added = []
+        for task_id, tag_ids in task_tags.items():
+            tag_ids = set(tag_ids)
+            if stale := current[task_id] - tag_ids:
+                removed |= models.Q(task_id=task_id, tag_id__in=stale)
+            added.extend(through(task_id=task_id, tag_id=tag_id)
+                         for tag_id in tag_ids - current[task_id])
+
+        if removed:
+            through.objects.filter(removed).delete()
+        if added:
+            through.objects.bulk_create(added, ignore_conflicts=True)
+
+
+class TagQuerySet(SyncedQuerySet):
+    """Tag model queryset."""
+
+    def delete(self):
+        """Delete tags marking the tasks losing them as changed."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            Task.objects.get_tagged_with(self).update_synced()
+            return super().delete()
+
+
+class TagManager(BaseUserManager.from_queryset(TagQuerySet)):
     """Tag model manager."""
 
     def get_owner_tags(self, owner):
         return self.filter(owner=owner)
 
+    def get_or_create_many(self, owner_id, names):
+        """Return owner tags by name creating the missing ones.
+
+        Existing tags are fetched in one query and the missing ones inserted
+        in bulk. Tags inserted concurrently by another transaction violate
+        the (owner, name) constraint, so they are skipped on insert and
+        fetched afterwards instead.
+        """
+        names = set(names)
+        if not names:
+            return {}
+
+        tags = {tag.name: tag
+                for tag in self.filter(owner_id=owner_id, name__in=names)}
+        if missing := names - tags.keys():
+            with transaction.atomic(using=self.db, savepoint=False):
+                seq = SyncClock.objects.advance(owner_id, len(missing))
+                self.bulk_create(
+                    [self.model(owner_id=owner_id, name=name, sync_seq=seq + i)
+                     for i, name in enumerate(missing)],
+                    ignore_conflicts=True)
+                tags.update((tag.name, tag) for tag in
+                            self.filter(owner_id=owner_id, name__in=missing))
+
+        return tags
+
+
+class SyncedModel(models.Model):
+    """Model whose changes are numbered for delta sync.
+
+    Every save takes the next change number of the owner sync clock and
+    every delete leaves a tombstone. Bulk writes must assign ``sync_seq``
+    themselves, e.g. with ``SyncedQuerySet.update_synced``.
+    """
+    sync_seq = models.BigIntegerField(default=0, editable=False)
 
-class Task(models.Model):
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Save the object with a new change number."""
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            self.sync_seq = SyncClock.objects.advance(self.owner_id)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'],
+                                           'sync_seq'}
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete the object leaving a tombstone behind."""
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            Tombstone.objects.record(self.TOMBSTONE_KIND,
+                                     [(self.pk, self.owner_id)])
+            return super().delete(*args, **kwargs)
+
+
+class Task(SyncedModel):
     """Application task model."""
+    TOMBSTONE_KIND = 'task'
+    SEARCH_CONFIG = 'simple'
+
     HIGH_PRIORITY = 3
     MEDIUM_PRIORITY = 2
     LOW_PRIORITY = 1
@@ -75,6 +504,14 @@ class Task(models.Model):
         (LOW_PRIORITY, 'Low'),
         (NO_PRIORITY, '-'),
     )
+    RECURRENCE_CHOICES = (
+        ('', 'None'),
+        (recurrence.DAILY, 'Daily'),
+        (recurrence.WEEKLY, 'Weekly'),
+        (recurrence.MONTHLY, 'Monthly'),
+    )
+    # Fields written by archiving and unarchiving.
+    ARCHIVE_FIELDS = ('is_archived', 'archived_date', 'updated_date')
 
     owner = models.ForeignKey(settings.AUTH_USER_MODEL,
                               on_delete=models.CASCADE, related_name='tasks')
@@ -87,15 +524,101 @@ class Task(models.Model):
     archived_date = models.DateTimeField(null=True, blank=True)
     priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES)
     tags = models.ManyToManyField('todo.Tag', related_name='tasks')
+    # Repeats from event_date every recurrence_interval periods, up to but
+    # excluding recurrence_end, see todo.recurrence.
+    recurrence = models.CharField(max_length=7, choices=RECURRENCE_CHOICES,
+                                  blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1)])
+    recurrence_end = models.DateTimeField(null=True, blank=True)
+    # Weighted label and description words, kept up to date by a trigger
+    # on PostgreSQL and unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = TaskManager()
 
     class Meta:
         ordering = ['-created_date']
+        indexes = [
+            # Task listings, optionally split by archived state.
+            models.Index(fields=['owner', '-created_date', '-id'],
+                         name='task_owner_created_idx'),
+            models.Index(fields=['owner', 'is_archived', '-created_date',
+                                 '-id'],
+                         name='task_owner_archived_created'),
+            # Today and overdue tasks, only active tasks have a due date.
+            models.Index(fields=['owner', 'event_date'],
+                         condition=models.Q(is_archived=False),
+                         name='task_owner_active_event_idx'),
+            # Filters and orderings of the listing parameters.
+            models.Index(fields=['owner', 'event_date', 'id'],
+                         name='task_owner_event_idx'),
+            models.Index(fields=['owner', 'priority', 'id'],
+                         name='task_owner_priority_idx'),
+            models.Index(fields=['owner', 'updated_date', 'id'],
+                         name='task_owner_updated_idx'),
+            models.Index(fields=['owner', 'sync_seq'],
+                         name='task_owner_sync_idx'),
+            # Recurring tasks, expanded for the days listed.
+            models.Index(fields=['owner', 'event_date'],
+                         condition=~models.Q(recurrence=''),
+                         name='task_owner_recurring_idx'),
+            # Upcoming events of every user loaded by the reminder scheduler,
+            # and tasks changed since its previous poll.
+            models.Index(fields=['event_date', 'id'],
+                         condition=models.Q(is_archived=False,
+                                            recurrence=''),
+                         name='task_reminder_event_idx'),
+            models.Index(fields=['updated_date', 'id'],
+                         name='task_updated_idx'),
+            # Archived tasks due to be moved to the archive table.
+            models.Index(fields=['archived_date', 'id'],
+                         condition=models.Q(is_archived=True),
+                         name='task_archived_date_idx'),
+        ]
 
     def __str__(self):
         return self.label
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load the task remembering the state counted in its stats."""
+        task = super().from_db(db, field_names, values)
+        task._stats_state = task.get_stats_state()
+        return task
+
+    def get_occurrence_dates(self, start, end, tz):
+        """Return an iterator of dates the recurring task occurs at."""
+        return recurrence.iter_occurrences(
+            self.event_date, self.recurrence, self.recurrence_interval,
+            self.recurrence_end, start, end, tz)
+
+    def get_stats_state(self):
+        """Return the field values counted in the owner stats."""
+        return {name: getattr(self, name) for name in TaskStats.STATE_FIELDS}
+
+    def save(self, *args, **kwargs):
+        """Save the task updating the owner stats."""
+        old = None if self._state.adding else \
+            getattr(self, '_stats_state', None)
+        new = self.get_stats_state()
+        if old is not None and kwargs.get('update_fields') is not None:
+            new = {name: new[name] if name in kwargs['update_fields']
+                   else old[name] for name in new}
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            TaskStats.objects.apply(
+                {self.owner_id: TaskStats.get_changes(old, new)})
+        self._stats_state = new
+
+    def delete(self, *args, **kwargs):
+        """Delete the task taking it off the owner stats."""
+        old = getattr(self, '_stats_state', None) or self.get_stats_state()
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            TaskStats.objects.apply(
+                {self.owner_id: TaskStats.get_changes(old, None)})
+            return super().delete(*args, **kwargs)
+
     def archive(self):
         """Task class method to archive task."""
         if self.is_archived:
@@ -103,7 +626,7 @@ class Task(models.Model):
 
         self.is_archived = True
         self.archived_date = timezone.now()
-        self.save()
+        self.save(update_fields=self.ARCHIVE_FIELDS)
 
     def unarchive(self):
         """Task class method to unarchive task."""
@@ -112,10 +635,12 @@ class Task(models.Model):
 
         self.is_archived = False
         self.archived_date = None
-        self.save()
+        self.save(update_fields=self.ARCHIVE_FIELDS)
+
 
+class Tag(SyncedModel):
+    TOMBSTONE_KIND = 'tag'
 
-class Tag(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL,
                               on_delete=models.CASCADE, related_name='tags')
     name = models.CharField(max_length=15)
@@ -124,6 +649,345 @@ class Tag(models.Model):
 
     class Meta:
         unique_together = ('owner', 'name')
+        indexes = [
+            models.Index(fields=['owner', 'sync_seq'],
+                         name='tag_owner_sync_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def delete(self, *args, **kwargs):
+        """Delete the tag marking the tasks losing it as changed."""
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            Task.objects.get_tagged_with([self]).update_synced()
+            return super().delete(*args, **kwargs)
+
+
+class ArchivedTaskQuerySet(TaskQuerySet):
+    """Archived task model queryset."""
+
+    def restore(self):
+        """Move archived tasks back to the task table, keeping their ids.
+
+        Restored tasks stay archived and keep their change numbers, for
+        syncing clients nothing changed. Return the number restored.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            return move_tasks(self, Task)
+
+
+class ArchivedTaskManager(BaseUserManager.from_queryset(ArchivedTaskQuerySet)):
+    """Archived task model manager."""
+
+    def move(self, tasks):
+        """Move archived tasks of the task table into the archive table.
+
+        Tasks locked by other transactions are skipped. Recurring tasks,
+        or tasks with recorded occurrences, stay in the task table. Return
+        the number moved.
+        """
+        with transaction.atomic(using=tasks.db, savepoint=False):
+            return move_tasks(
+                tasks.get_one_off_tasks().filter(is_archived=True)
+                .exclude(models.Exists(TaskOccurrence.objects.filter(
+                    task_id=models.OuterRef('id'))))
+                .select_for_update(skip_locked=True), self.model)
+
+
+class ArchivedTask(models.Model):
+    """Archived task moved out of the task table.
+
+    Mirrors the ``Task`` columns and ids, so its rows are served by the
+    same querysets, filters and serializers, and moving a task between
+    the tables is a plain copy.
+    """
+    TOMBSTONE_KIND = Task.TOMBSTONE_KIND
+    SEARCH_CONFIG = Task.SEARCH_CONFIG
+
+    id = models.BigIntegerField(primary_key=True)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL,
+                              on_delete=models.CASCADE,
+                              related_name='archived_tasks')
+    label = models.CharField(max_length=80)
+    description = models.TextField(blank=True)
+    created_date = models.DateTimeField()
+    updated_date = models.DateTimeField()
+    event_date = models.DateTimeField(null=True)
+    is_archived = models.BooleanField(default=True)
+    archived_date = models.DateTimeField(null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(
+        choices=Task.PRIORITY_CHOICES)
+    tags = models.ManyToManyField('todo.Tag', through='todo.ArchivedTaskTag',
+                                  related_name='archived_tasks')
+    recurrence = models.CharField(max_length=7,
+                                  choices=Task.RECURRENCE_CHOICES,
+                                  blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_end = models.DateTimeField(null=True, blank=True)
+    # Copied from the task, searched the same way.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ArchivedTaskManager()
+
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['owner', '-created_date', '-id'],
+                         name='archivedtask_owner_created'),
+            models.Index(fields=['owner', 'sync_seq'],
+                         name='archivedtask_owner_sync_idx'),
+        ]
+
+    def __str__(self):
+        return self.label
+
+
+class ArchivedTaskTag(models.Model):
+    """Tag of an archived task, named like the task tags through table."""
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('task', 'tag')
+
+
+class TaskOccurrenceManager(models.Manager):
+    """Task occurrence model manager."""
+
+    def get_states(self, task_ids, start, end):
+        """Return states of occurrences of the tasks in [start, end).
+
+        States are mapped by (task id, occurrence date). No query is made
+        without tasks.
+        """
+        if not task_ids:
+            return {}
+        return {(task_id, date): state for task_id, date, state in
+                self._get_states(task_ids, start, end)}
+
+    async def aget_states(self, task_ids, start, end):
+        """Return states of occurrences of the tasks read async."""
+        if not task_ids:
+            return {}
+        return {(task_id, date): state async for task_id, date, state in
+                self._get_states(task_ids, start, end)}
+
+    def _get_states(self, task_ids, start, end):
+        return self.filter(task_id__in=task_ids, original_date__gte=start,
+                           original_date__lt=end) \
+            .values_list('task_id', 'original_date', 'state')
+
+
+class TaskOccurrence(models.Model):
+    """Recorded state of one occurrence of a recurring task.
+
+    Occurrences are generated from their task, only those completed or
+    skipped are stored, keyed by the date they were generated at.
+    """
+    STATE_CHOICES = (
+        (recurrence.COMPLETED, 'Completed'),
+        (recurrence.SKIPPED, 'Skipped'),
+    )
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE,
+                             related_name='occurrences')
+    original_date = models.DateTimeField()
+    state = models.CharField(max_length=9, choices=STATE_CHOICES)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    objects = TaskOccurrenceManager()
+
+    class Meta:
+        unique_together = ('task', 'original_date')
+
+    def __str__(self):
+        return f'{self.task_id} at {self.original_date}: {self.state}'
+
+
+def move_tasks(tasks, model):
+    """Copy tasks and their tags to the table of model and remove them.
+
+    Must run inside a transaction. Neither table records the move as a
+    change or counts it in the stats.
+    """
+    columns = [field.attname for field in tasks.model._meta.concrete_fields]
+    rows = list(tasks.order_by('id').values(*columns))
+    if not rows:
+        return 0
+
+    ids = [row['id'] for row in rows]
+    source_tags = tasks.model.tags.through.objects.filter(task_id__in=ids)
+    tag_ids = list(source_tags.values_list('task_id', 'tag_id'))
+
+    model.objects.bulk_create([model(**row) for row in rows])
+    if auto_dates := [field.name for field in model._meta.concrete_fields
+                      if getattr(field, 'auto_now', False)
+                      or getattr(field, 'auto_now_add', False)]:
+        # Inserting stamps them with the current time.
+        model.objects.bulk_update([model(**row) for row in rows], auto_dates)
+    model.tags.through.objects.bulk_create(
+        [model.tags.through(task_id=task_id, tag_id=tag_id)
+         for task_id, tag_id in tag_ids])
+
+    source_tags._raw_delete(source_tags.db)
+    # Deleting through the queryset would record tombstones and stats.
+    source = tasks.model.objects.filter(id__in=ids)
+    source._raw_delete(source.db)
+    return len(rows)
+
+
+class TaskStatsManager(models.Manager):
+    """Task stats model manager."""
+
+    def apply(self, changes):
+        """Add changes, Counters of stats fields by owner id, to the stats.
+
+        Must run inside the transaction writing the tasks. Stats are created
+        along with users, owners missing them get them here.
+        """
+        using = router.db_for_write(self.model)
+        for owner_id, counts in changes.items():
+            update = {name: models.F(name) + count
+                      for name, count in counts.items() if count}
+            if not update:
+                continue
+            stats = self.using(using).filter(owner_id=owner_id)
+            if not stats.update(**update):
+                self.using(using).get_or_create(owner_id=owner_id)
+                stats.update(**update)
+
+    def add_tasks(self, tasks):
+        """Count new tasks in the stats of their owners."""
+        changes = defaultdict(Counter)
+        for task in tasks:
+            changes[task.owner_id].update(
+                TaskStats.get_changes(None, task.get_stats_state()))
+        self.apply(changes)
+
+    def recount(self, owner_ids):
+        """Return stats field values of owners counted from their tasks.
+
+        Tasks of the archive table count as archived.
+        """
+        active = models.Q(is_archived=False)
+        counts = Task.objects.filter(owner_id__in=owner_ids).order_by() \
+            .values('owner_id').annotate(
+                total=models.Count('id'),
+                archived=models.Count('id', filter=models.Q(is_archived=True)),
+                **{name: models.Count('id', filter=active & models.Q(
+                    priority=priority))
+                   for priority, name in TaskStats.PRIORITY_FIELDS.items()})
+        cold_counts = ArchivedTask.objects.filter(owner_id__in=owner_ids) \
+            .order_by().values('owner_id').annotate(count=models.Count('id'))
+
+        recounted = {owner_id: dict.fromkeys(TaskStats.COUNTER_FIELDS, 0)
+                     for owner_id in owner_ids}
+        for row in counts:
+            recounted[row.pop('owner_id')] = row
+        for row in cold_counts:
+            counters = recounted[row['owner_id']]
+            counters['total'] += row['count']
+            counters['archived'] += row['count']
+        return recounted
+
+
+class TaskStats(models.Model):
+    """Per user task counters, updated along with the tasks.
+
+    Every task write goes through ``TaskStatsManager.apply`` in its own
+    transaction, except plain queryset updates and raw SQL, which the
+    ``rebuild_task_stats`` command repairs.
+    """
+    # Fields of a task deciding which counters include it.
+    STATE_FIELDS = ('priority', 'is_archived')
+    # Counters of unarchived tasks by priority.
+    PRIORITY_FIELDS = {
+        Task.HIGH_PRIORITY: 'high_priority',
+        Task.MEDIUM_PRIORITY: 'medium_priority',
+        Task.LOW_PRIORITY: 'low_priority',
+        Task.NO_PRIORITY: 'no_priority',
+    }
+    COUNTER_FIELDS = ('total', 'archived', *PRIORITY_FIELDS.values())
+
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                 on_delete=models.CASCADE, primary_key=True,
+                                 related_name='task_stats')
+    total = models.IntegerField(default=0)
+    archived = models.IntegerField(default=0)
+    high_priority = models.IntegerField(default=0)
+    medium_priority = models.IntegerField(default=0)
+    low_priority = models.IntegerField(default=0)
+    no_priority = models.IntegerField(default=0)
+
+    objects = TaskStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'task stats'
+
+    @classmethod
+    def get_changes(cls, old, new, count=1):
+        """Return counter changes of count tasks going from old to new.
+
+        States are dicts of ``STATE_FIELDS`` values, None for tasks that
+        do not exist before or after the change.
+        """
+        changes = Counter()
+        for state, sign in ((old, -count), (new, count)):
+            if state is None:
+                continue
+            changes['total'] += sign
+            if state['is_archived']:
+                changes['archived'] += sign
+            else:
+                changes[cls.PRIORITY_FIELDS[state['priority']]] += sign
+
+        return changes
+
+    def get_counters(self):
+        """Return counter field values."""
+        return {name: getattr(self, name) for name in self.COUNTER_FIELDS}
+
+
+class SyncClock(models.Model):
+    """Per user counter numbering task and tag changes for delta sync."""
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                 on_delete=models.CASCADE, primary_key=True,
+                                 related_name='sync_clock')
+    seq = models.BigIntegerField(default=0)
+    changed_date = models.DateTimeField(default=timezone.now)
+    # Sync tokens older than this have lost tombstones to retention.
+    horizon = models.BigIntegerField(default=0)
+
+    objects = SyncClockManager()
+
+
+class Tombstone(models.Model):
+    """Deleted task or tag kept for delta sync."""
+    KIND_CHOICES = (
+        (Task.TOMBSTONE_KIND, 'Task'),
+        (Tag.TOMBSTONE_KIND, 'Tag'),
+    )
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL,
+                              on_delete=models.CASCADE,
+                              related_name='tombstones')
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    seq = models.BigIntegerField()
+    deleted_date = models.DateTimeField(auto_now_add=True)
+
+    objects = TombstoneManager()
+
+    class Meta:
+        indexes = [
+            # Covers the sync range scan so it reads the index only.
+            models.Index(fields=['owner', 'seq', 'kind', 'object_id'],
+                         name='tombstone_owner_seq_idx'),
+            models.Index(fields=['deleted_date'],
+                         name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
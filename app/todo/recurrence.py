@@ -0,0 +1,100 @@
+"""
+Todo task recurrence.
+
+A recurring task repeats from its event date every interval days, weeks
+or months, until its recurrence end if it has one. Occurrences are not
+stored: they are generated for the requested window only, keeping the
+wall clock time of the event date in the time zone of the user. Only the
+completed and skipped ones are recorded, as ``TaskOccurrence`` rows, so
+storage grows with the rules and not with their occurrences.
+"""
+import calendar
+import datetime
+import heapq
+from collections import namedtuple
+
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+COMPLETED = 'completed'
+SKIPPED = 'skipped'
+
+# Task columns a recurrence is expanded from.
+RULE_COLUMNS = ('id', 'event_date', 'recurrence', 'recurrence_interval',
+                'recurrence_end')
+
+Occurrence = namedtuple('Occurrence', ['task_id', 'date', 'state'])
+
+
+def add_months(value, months):
+    """Return naive datetime value months later, clamping the day.
+
+    Monthly tasks of the 31st occur on the last day of shorter months.
+    """
+    year, month = divmod(value.month - 1 + months, 12)
+    year += value.year
+    month += 1
+    return value.replace(
+        year=year, month=month,
+        day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def iter_occurrences(first, frequency, interval, until, start, end, tz):
+    """Yield the aware datetimes of occurrences in [start, end) in order.
+
+    first is the date of the first occurrence and until, when given, the
+    date no occurrence may start at or after. Occurrences before start
+    are skipped arithmetically rather than generated.
+    """
+    if until is not None:
+        end = min(end, until)
+    local = timezone_naive(first, tz)
+    window = timezone_naive(start, tz)
+    # Step back one more period, so DST shifts never skip an occurrence.
+    if frequency == MONTHLY:
+        months = (window.year - local.year) * 12 + window.month - local.month
+        index = max(0, months // interval - 1)
+
+        def get(index):
+            return add_months(local, index * interval)
+    else:
+        days = interval * (7 if frequency == WEEKLY else 1)
+        index = max(0, (window - local).days // days - 1)
+
+        def get(index):
+            return local + datetime.timedelta(days=index * days)
+
+    while (date := get(index).replace(tzinfo=tz)
+           .astimezone(datetime.timezone.utc)) < end:
+        if date >= start:
+            yield date
+        index += 1
+
+
+def timezone_naive(value, tz):
+    """Return aware datetime value as the naive wall clock time in tz."""
+    return value.astimezone(tz).replace(tzinfo=None)
+
+
+def expand(rules, states, start, end, tz):
+    """Return an iterator of occurrences of rules in [start, end).
+
+    rules are mappings of ``RULE_COLUMNS``, states map (task id, date)
+    to the recorded state of an occurrence. Occurrences come in date and
+    task id order, generated only as consumed; skipped ones are left out.
+    """
+    def iter_rule(rule):
+        for date in iter_occurrences(
+                rule['event_date'], rule['recurrence'],
+                rule['recurrence_interval'], rule['recurrence_end'],
+                start, end, tz):
+            yield Occurrence(rule['id'], date,
+                             states.get((rule['id'], date)))
+
+    occurrences = heapq.merge(
+        *map(iter_rule, rules),
+        key=lambda occurrence: (occurrence.date, occurrence.task_id))
+    return (occurrence for occurrence in occurrences
+            if occurrence.state != SKIPPED)
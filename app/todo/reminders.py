@@ -0,0 +1,393 @@
+"""
+Todo task reminders.
+
+Reminders fire TASK_REMINDER_LEAD before the event date of active tasks,
+or at once for tasks edited inside that lead. The scheduler keeps the
+reminders due within a horizon in a heap and, once less than half of it
+is left, loads the next horizon of events, reading upcoming event dates
+by a range scan of their index and the recurring tasks once per horizon.
+It follows task edits by reading the tasks updated, and the tombstones
+of tasks deleted, since its previous poll instead of scanning the tasks
+again. Edited tasks get a new version in the scheduler, the heap entries
+of older versions are dropped when they surface.
+
+Fired reminders go to a sink: an object with ``deliver(reminders)`` and
+``close()`` methods, such as the log and file sinks here.
+"""
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import zoneinfo
+from collections import (
+    defaultdict,
+    deque,
+    namedtuple,
+)
+
+from django.db import models
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from todo import recurrence
+from todo.models import (
+    Task,
+    TaskOccurrence,
+    Tombstone,
+)
+
+
+Reminder = namedtuple(
+    'Reminder', ['task_id', 'owner_id', 'label', 'event_date', 'due'])
+
+# Task columns reminders are scheduled from.
+EVENT_COLUMNS = (*recurrence.RULE_COLUMNS, 'is_archived', 'owner__timezone')
+
+
+class LogSink:
+    """Deliver reminders as records of the todo.reminders logger."""
+
+    def __init__(self, **options):
+        self.logger = logging.getLogger('todo.reminders')
+
+    def deliver(self, reminders):
+        for reminder in reminders:
+            self.logger.info('Reminder of task %s of user %s "%s" at %s.',
+                             reminder.task_id, reminder.owner_id,
+                             reminder.label, reminder.event_date.isoformat())
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Append reminders as JSON lines to a local file.
+
+    Stands in for a notification service, each batch is flushed at once.
+    """
+
+    def __init__(self, path, **options):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def deliver(self, reminders):
+        for reminder in reminders:
+            self.file.write(json.dumps({
+                'task_id': reminder.task_id,
+                'owner_id': reminder.owner_id,
+                'label': reminder.label,
+                'event_date': reminder.event_date.isoformat(),
+                'due': reminder.due.isoformat(),
+            }) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+SINKS = {
+    'log': LogSink,
+    'file': FileSink,
+}
+
+
+def get_sink(name, **options):
+    """Return the sink registered as name or at the dotted path name."""
+    sink_class = SINKS.get(name) or import_string(name)
+    return sink_class(**options)
+
+
+class ReminderMetrics:
+    """Throughput and lag of delivered reminders.
+
+    Lag is how late a reminder was delivered after it was due, quantiles
+    are taken over the latest ``window`` deliveries.
+    """
+
+    def __init__(self, window=10000):
+        self.started = time.monotonic()
+        self.delivered = 0
+        self.lag_sum = 0.0
+        self.lags = deque(maxlen=window)
+        self.pending = 0
+        self.polls = 0
+        self.changes = 0
+
+    def observe(self, lags):
+        """Record delivery of reminders lagging by lags seconds."""
+        self.delivered += len(lags)
+        self.lag_sum += sum(lags)
+        self.lags.extend(lags)
+
+    def get_throughput(self):
+        """Return reminders delivered per second since start."""
+        return self.delivered / max(time.monotonic() - self.started, 1e-9)
+
+    def get_lag(self, quantile):
+        """Return the lag quantile in seconds, 0 without deliveries."""
+        if not self.lags:
+            return 0.0
+        lags = sorted(self.lags)
+        return lags[min(len(lags) - 1, int(quantile * len(lags)))]
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            '# TYPE todo_reminders_delivered_total counter',
+            f'todo_reminders_delivered_total {self.delivered}',
+            '# TYPE todo_reminders_throughput gauge',
+            f'todo_reminders_throughput {self.get_throughput():.6f}',
+            '# TYPE todo_reminders_pending gauge',
+            f'todo_reminders_pending {self.pending}',
+            '# TYPE todo_reminders_polls_total counter',
+            f'todo_reminders_polls_total {self.polls}',
+            '# TYPE todo_reminders_task_changes_total counter',
+            f'todo_reminders_task_changes_total {self.changes}',
+            '# TYPE todo_reminders_lag_seconds summary',
+        ]
+        lines.extend(
+            f'todo_reminders_lag_seconds{{quantile="{quantile}"}} '
+            f'{self.get_lag(quantile):.6f}'
+            for quantile in (0.5, 0.99, 1.0))
+        lines.append(f'todo_reminders_lag_seconds_sum {self.lag_sum:.6f}')
+        lines.append(f'todo_reminders_lag_seconds_count {self.delivered}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """Write the metrics to path, replacing it atomically."""
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+
+def iter_pages(queryset, field, batch_size):
+    """Yield pages of rows of queryset in (field, id) order.
+
+    Pages follow each other by keyset, so every page is a range scan of
+    a (field, id) index however far it is.
+    """
+    queryset = queryset.order_by(field, 'id')
+    page = list(queryset[:batch_size])
+    while page:
+        yield page
+        if len(page) < batch_size:
+            return
+        last = page[-1]
+        page = list(queryset.filter(
+            models.Q(**{f'{field}__gt': last[field]}) |
+            models.Q(**{field: last[field], 'id__gt': last['id']}),
+        )[:batch_size])
+
+
+class ReminderScheduler:
+    """Schedule reminders of task event dates.
+
+    Reminders of events before ``loaded_until`` are in the heap, as (due,
+    task id, event date, version) entries. A task keeps the version of its
+    latest scheduling, entries of other versions are stale. Reminders
+    fired are remembered until their event, so edits do not repeat them,
+    and forgotten in event date order. Pending reminders are counted as
+    they are scheduled, unscheduled and fired.
+    """
+
+    def __init__(self, sink, lead, horizon, batch_size=1000,
+                 overlap=timezone.timedelta(seconds=5), metrics=None):
+        self.sink = sink
+        self.lead = lead
+        self.horizon = horizon
+        self.batch_size = batch_size
+        # Changes committed this late after their update are still seen.
+        self.overlap = overlap
+        self.metrics = metrics or ReminderMetrics()
+        self.heap = []
+        self.versions = {}
+        self.pending = {}
+        self.pending_count = 0
+        self.fired = set()
+        # Fired (event date, task id) in event date order.
+        self.fired_heap = []
+        self.version_counter = itertools.count(1)
+        self.loaded_until = None
+        self.polled = None
+
+    def start(self, now=None):
+        """Load the reminders of events from now up to the horizon."""
+        now = now or timezone.now()
+        self.polled = timezone.now()
+        self.loaded_until = now
+        self.extend(now)
+
+    def tick(self, now=None):
+        """Follow task changes, extend the horizon and fire due reminders.
+
+        Return the number of reminders delivered.
+        """
+        now = now or timezone.now()
+        self.poll(now)
+        self.extend(now)
+        delivered = self.fire(now)
+        self.compact()
+        return delivered
+
+    def get_next_due(self):
+        """Return when the next reminder is due or None."""
+        self.drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def extend(self, now):
+        """Load the next horizon of reminders once half of it is left.
+
+        Events of each horizon after those loaded are read once, one-off
+        tasks by their event date and recurring tasks once per horizon,
+        so ticks in between read nothing.
+        """
+        while now + self.lead > self.loaded_until - self.horizon / 2:
+            start = self.loaded_until
+            until = self.loaded_until = start + self.horizon
+
+            tasks = Task.objects.get_unarchived_tasks()
+            one_off = tasks.get_one_off_tasks() \
+                .get_event_date_range(start, until)
+            rules = tasks.get_recurring_tasks(start, until)
+            for queryset, field in ((one_off, 'event_date'), (rules, 'id')):
+                for page in iter_pages(queryset.values(*EVENT_COLUMNS),
+                                       field, self.batch_size):
+                    self.schedule(page, now, start, until)
+
+    def poll(self, now):
+        """Reschedule tasks changed since the previous poll.
+
+        Tasks updated since then are read by their update date, those
+        deleted by their tombstones. Rereading the overlap is harmless,
+        a task rescheduled to the same events is not reminded again.
+        """
+        polled = timezone.now()
+        since = self.polled - self.overlap
+        changed = Task.objects.filter(updated_date__gte=since) \
+            .values(*EVENT_COLUMNS, 'updated_date')
+        for page in iter_pages(changed, 'updated_date', self.batch_size):
+            self.metrics.changes += len(page)
+            for row in page:
+                self.unschedule(row['id'])
+            self.schedule(page, now, now, self.loaded_until)
+
+        deleted = Tombstone.objects.filter(
+            kind=Task.TOMBSTONE_KIND, deleted_date__gte=since,
+        ).values_list('object_id', flat=True)
+        for task_id in deleted:
+            self.unschedule(task_id)
+
+        self.polled = polled
+        self.metrics.polls += 1
+
+    def schedule(self, rows, now, start, end):
+        """Schedule reminders of events of task rows in [start, end).
+
+        Reminders due before now are due at once. Archived tasks and
+        completed or skipped occurrences are not reminded.
+        """
+        events = self.get_events(rows, start, end)
+        for task_id, dates in events.items():
+            dates = [date for date in dates
+                     if (task_id, date) not in self.fired]
+            if not dates:
+                continue
+            version = self.versions.get(task_id)
+            if version is None:
+                version = self.versions[task_id] = next(self.version_counter)
+            for date in dates:
+                heapq.heappush(self.heap, (max(date - self.lead, now),
+                                           task_id, date, version))
+            self.pending[task_id] = self.pending.get(task_id, 0) + len(dates)
+            self.pending_count += len(dates)
+        self.metrics.pending = self.pending_count
+
+    def get_events(self, rows, start, end):
+        """Return event dates in [start, end) of task rows by task id."""
+        events = defaultdict(list)
+        rules = defaultdict(list)
+        for row in rows:
+            if row['is_archived'] or row['event_date'] is None:
+                continue
+            if row['recurrence']:
+                rules[row['owner__timezone']].append(row)
+            elif start <= row['event_date'] < end:
+                events[row['id']].append(row['event_date'])
+
+        if rules:
+            states = TaskOccurrence.objects.get_states(
+                [row['id'] for zone_rules in rules.values()
+                 for row in zone_rules], start, end)
+            for name, zone_rules in rules.items():
+                for occurrence in recurrence.expand(
+                        zone_rules, states, start, end,
+                        zoneinfo.ZoneInfo(name)):
+                    if occurrence.state is None:
+                        events[occurrence.task_id].append(occurrence.date)
+
+        return events
+
+    def unschedule(self, task_id):
+        """Drop the reminders of a task, leaving its entries stale."""
+        self.versions.pop(task_id, None)
+        self.pending_count -= self.pending.pop(task_id, 0)
+        self.metrics.pending = self.pending_count
+
+    def is_stale(self, entry):
+        """Return whether a heap entry is of an older task version."""
+        return self.versions.get(entry[1]) != entry[3]
+
+    def drop_stale(self):
+        """Pop stale entries off the top of the heap."""
+        while self.heap and self.is_stale(self.heap[0]):
+            heapq.heappop(self.heap)
+
+    def compact(self):
+        """Rebuild the heap without stale entries once they dominate."""
+        if len(self.heap) > 2 * self.pending_count + self.batch_size:
+            self.heap = [entry for entry in self.heap
+                         if not self.is_stale(entry)]
+            heapq.heapify(self.heap)
+
+    def fire(self, now):
+        """Deliver reminders due by now and return their number.
+
+        Their tasks are read again in one query, reminders of tasks gone
+        without a tombstone, as with their owner, are dropped.
+        """
+        due = []
+        self.drop_stale()
+        while self.heap and self.heap[0][0] <= now:
+            due_date, task_id, event_date, version = heapq.heappop(self.heap)
+            due.append((due_date, task_id, event_date))
+            self.fired.add((task_id, event_date))
+            heapq.heappush(self.fired_heap, (event_date, task_id))
+            self.pending[task_id] -= 1
+            self.pending_count -= 1
+            if not self.pending[task_id]:
+                self.unschedule(task_id)
+            self.drop_stale()
+        while self.fired_heap and self.fired_heap[0][0] < now:
+            event_date, task_id = heapq.heappop(self.fired_heap)
+            self.fired.discard((task_id, event_date))
+        self.metrics.pending = self.pending_count
+        if not due:
+            return 0
+
+        tasks = {task_id: (owner_id, label) for task_id, owner_id, label in
+                 Task.objects.get_unarchived_tasks().filter(
+                     id__in={task_id for due_date, task_id, event_date in due},
+                 ).values_list('id', 'owner_id', 'label')}
+        reminders = [
+            Reminder(task_id, *tasks[task_id], event_date, due_date)
+            for due_date, task_id, event_date in due if task_id in tasks
+        ]
+        if reminders:
+            self.sink.deliver(reminders)
+            delivered = timezone.now()
+            self.metrics.observe(
+                [max((delivered - reminder.due).total_seconds(), 0.0)
+                 for reminder in reminders])
+        return len(reminders)
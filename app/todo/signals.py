@@ -0,0 +1,57 @@
+"""
+Todo signal handlers.
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from .cache import invalidate_owner_listings
+from .models import (
+    Tag,
+    Task,
+    TaskStats,
+)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_task_stats(sender, instance, created, raw, **kwargs):
+    """Start the task stats of new users, so task writes only update them."""
+    if created and not raw:
+        TaskStats.objects.create(owner=instance)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_listings(sender, instance, **kwargs):
+    """Invalidate listings of the changed task or tag owner."""
+    invalidate_owner_listings(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def track_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate listings and number the change of the retagged tasks."""
+    if action == 'pre_clear' and reverse:
+        # Cleared tasks of a tag are no longer known after the clear.
+        instance._cleared_task_ids = set(
+            instance.tasks.values_list('id', flat=True))
+        return
+
+    if not action.startswith('post_'):
+        return
+
+    invalidate_owner_listings(instance.owner_id)
+    if not reverse:
+        task_ids = {instance.pk}
+    elif action == 'post_clear':
+        task_ids = instance.__dict__.pop('_cleared_task_ids', set())
+    else:
+        task_ids = pk_set
+
+    if task_ids:
+        Task.objects.filter(id__in=task_ids).update_synced()
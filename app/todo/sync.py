@@ -0,0 +1,107 @@
+"""
+Todo delta sync.
+
+Every task and tag change takes the next number of the owner sync clock
+and deletes leave numbered tombstones. A sync token is the clock number a
+client has seen, its changes are the rows numbered after it.
+"""
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import (
+    exceptions,
+    status,
+)
+
+from .models import (
+    ArchivedTask,
+    SyncClock,
+    Tag,
+    Task,
+    Tombstone,
+)
+
+
+class SyncTokenExpired(exceptions.APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = _('Sync token expired, a full sync is required.')
+    default_code = 'sync_token_expired'
+
+
+@dataclass
+class ChangeSet:
+    """Changes of an owner between two sync tokens."""
+    token: int
+    more: bool
+    tasks: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    deleted_tasks: list = field(default_factory=list)
+    deleted_tags: list = field(default_factory=list)
+
+
+def get_tombstone_retention():
+    """Return how long tombstones are kept."""
+    return settings.SYNC_TOMBSTONE_RETENTION
+
+
+def get_changes(owner, since=None, limit=500):
+    """Return owner changes numbered after since token.
+
+    Without a token every live task and tag is returned, tasks of the
+    archive table included. Moving tasks between the tables keeps their
+    numbers, so it is not a change. Each kind of change is read by a
+    range scan of its (owner, number) index, at most limit rows per kind;
+    when one kind has more, the change set stops at its limit-th number
+    and is marked as having more changes.
+    """
+    clock = SyncClock.objects.filter(owner=owner) \
+        .values('seq', 'horizon').first() or {'seq': 0, 'horizon': 0}
+    if since is not None and since < clock['horizon']:
+        raise SyncTokenExpired()
+
+    low = -1 if since is None else since
+    high = clock['seq']
+    streams = {
+        'tasks': Task.objects.filter(owner=owner).with_tags(),
+        'archived_tasks':
+            ArchivedTask.objects.filter(owner=owner).with_tags(),
+        'tags': Tag.objects.filter(owner=owner),
+    }
+    if since is not None:
+        streams['tombstones'] = Tombstone.objects.filter(owner=owner).only(
+            'seq', 'kind', 'object_id')
+
+    rows = {}
+    for name, queryset in streams.items():
+        seq_field = 'seq' if name == 'tombstones' else 'sync_seq'
+        rows[name] = list(
+            queryset.filter(**{f'{seq_field}__gt': low,
+                               f'{seq_field}__lte': high})
+            .order_by(seq_field)[:limit + 1])
+
+    def seq_of(row):
+        return row.seq if isinstance(row, Tombstone) else row.sync_seq
+
+    token = high
+    for stream_rows in rows.values():
+        if len(stream_rows) > limit:
+            token = min(token, seq_of(stream_rows[limit - 1]))
+
+    included = {name: [row for row in stream_rows if seq_of(row) <= token]
+                for name, stream_rows in rows.items()}
+    tombstones = included.get('tombstones', [])
+    return ChangeSet(
+        token=token,
+        more=token < high,
+        tasks=sorted(included['tasks'] + included['archived_tasks'],
+                     key=seq_of),
+        tags=included['tags'],
+        deleted_tasks=[t.object_id for t in tombstones
+                       if t.kind == Task.TOMBSTONE_KIND],
+        deleted_tags=[t.object_id for t in tombstones
+                      if t.kind == Tag.TOMBSTONE_KIND],
+    )
@@ -0,0 +1,50 @@
+"""Common setup for todo tests."""
+import pytest
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import clear_caches
+from core.throttling import get_bucket_store
+from core.tests.factories.user_factory import UserFactory
+
+from ..cache import get_listings_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_listings_cache():
+    """Start every test with an empty listings cache."""
+    get_listings_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Start every test without cached tokens and users."""
+    clear_caches()
+
+
+@pytest.fixture(autouse=True)
+def clear_throttle_buckets():
+    """Start every test with full throttle buckets."""
+    get_bucket_store().clear()
+
+
+@pytest.fixture
+def api_client():
+    """Return unauthenticated API client."""
+    return APIClient()
+
+
+@pytest.fixture
+def user(db):
+    """Return user owning the test data."""
+    return UserFactory()
+
+
+@pytest.fixture
+def auth_api_client(user):
+    """Return API client authenticated with a JWT access token."""
+    client = APIClient()
+    token = AccessToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
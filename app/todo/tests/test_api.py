@@ -0,0 +1,231 @@
+"""
+Todo API tests.
+"""
+import pytest
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.middleware import QueryBudgetMiddleware
+from core.query_budget import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+)
+from core.tests.factories.user_factory import UserFactory
+
+from .. import models
+from ..api import views
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_URL = reverse('task-list')
+TASKS_TODAY_URL = reverse('task-today-tasks')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+TAGS_URL = reverse('tag-list')
+
+
+def task_detail_url(task_id):
+    """Return task detail url."""
+    return reverse('task-detail', args=[task_id])
+
+
+def create_tasks(owner, count, tags_per_task=2, **kwargs):
+    """Create tasks with tags for owner."""
+    tasks = []
+    for _ in range(count):
+        task = task_factory.TaskFactory(owner=owner, **kwargs)
+        task.tags.set(
+            tag_factory.TagFactory(owner=owner, name=f'tag{task.id}-{i}')
+            for i in range(tags_per_task)
+        )
+        tasks.append(task)
+
+    return tasks
+
+
+@pytest.mark.django_db
+class TestPublicTaskAPI:
+    """Test unauthenticated task API requests."""
+
+    def test_auth_required(self, api_client):
+        """Test authentication is required to list tasks."""
+        res = api_client.get(TASKS_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestTaskQueryBudget:
+    """Test task API actions run a fixed number of queries."""
+
+    @pytest.mark.parametrize('count', [1, 20])
+    def test_list_tasks(self, auth_api_client, user, count):
+        """Test listing tasks does not query tags per task."""
+        create_tasks(user, count)
+
+        with assert_query_budget(views.TaskViewSet, 'list'):
+            res = auth_api_client.get(TASKS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data['results']) == count
+        assert all(len(task['tags']) == 2 for task in res.data['results'])
+
+    def test_retrieve_task(self, auth_api_client, user):
+        """Test retrieving a task with tags."""
+        task = create_tasks(user, 1, tags_per_task=5)[0]
+
+        with assert_query_budget(views.TaskViewSet, 'retrieve'):
+            res = auth_api_client.get(task_detail_url(task.id))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data['tags']) == 5
+
+    def test_today_tasks(self, auth_api_client, user):
+        """Test listing today tasks does not query tags per task."""
+        create_tasks(user, 10, event_date=timezone.now())
+
+        with assert_query_budget(views.TaskViewSet, 'today_tasks'):
+            res = auth_api_client.get(TASKS_TODAY_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data['results']) == 10
+
+    def test_archived_tasks(self, auth_api_client, user):
+        """Test listing archived tasks does not query tags per task."""
+        create_tasks(user, 10, is_archived=True)
+        create_tasks(user, 3)
+
+        with assert_query_budget(views.TaskViewSet, 'archived_tasks'):
+            res = auth_api_client.get(TASKS_ARCHIVED_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data['results']) == 10
+
+    def test_archived_tasks_limited_to_owner(self, auth_api_client):
+        """Test listing archived tasks returns only own tasks."""
+        create_tasks(UserFactory(), 2, is_archived=True)
+
+        res = auth_api_client.get(TASKS_ARCHIVED_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['results'] == []
+
+    def test_list_tags(self, auth_api_client, user):
+        """Test listing tags."""
+        create_tasks(user, 5)
+
+        with assert_query_budget(views.TagViewSet, 'list'):
+            res = auth_api_client.get(TAGS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data['results']) == 10
+
+
+@pytest.mark.django_db
+class TestTaskTagsAPI:
+    """Test writing task tags."""
+
+    def test_create_task_with_tags(self, auth_api_client, user):
+        """Test creating a task reuses existing tags and creates new ones."""
+        existing = tag_factory.TagFactory(owner=user, name='existing')
+        payload = {'label': 'Task', 'priority': 1,
+                   'tags': [{'name': 'existing'}, {'name': 'new'}]}
+
+        with assert_query_budget(views.TaskViewSet, 'create'):
+            res = auth_api_client.post(TASKS_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        task = models.Task.objects.get(id=res.data['id'])
+        assert {tag.name for tag in task.tags.all()} == {'existing', 'new'}
+        assert task.tags.get(name='existing') == existing
+        assert models.Tag.objects.filter(owner=user).count() == 2
+
+    def test_update_task_tags_writes_difference(self, auth_api_client, user):
+        """Test updating tags keeps unchanged memberships."""
+        task = create_tasks(user, 1, tags_per_task=3)[0]
+        through = models.Task.tags.through
+        kept = through.objects.get(task=task, tag__name=f'tag{task.id}-0')
+        payload = {'tags': [{'name': f'tag{task.id}-0'}, {'name': 'new'}]}
+
+        with assert_query_budget(views.TaskViewSet, 'partial_update'):
+            res = auth_api_client.patch(
+                task_detail_url(task.id), payload, format='json')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert {tag['name'] for tag in res.data['tags']} == \
+            {f'tag{task.id}-0', 'new'}
+        assert through.objects.filter(id=kept.id).exists()
+        assert through.objects.filter(task=task).count() == 2
+
+    def test_update_task_without_tags_keeps_them(self, auth_api_client,
+                                                 user):
+        """Test updating other fields leaves tags untouched."""
+        task = create_tasks(user, 1)[0]
+
+        res = auth_api_client.patch(
+            task_detail_url(task.id), {'label': 'Renamed'}, format='json')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert task.tags.count() == 2
+
+    def test_tags_created_concurrently(self, user, monkeypatch):
+        """Test a tag inserted by another transaction is reused."""
+        existing = tag_factory.TagFactory(owner=user, name='raced')
+        tag_filter = models.Tag.objects.filter
+        calls = []
+
+        def stale_filter(*args, **kwargs):
+            """Miss the concurrently created tag on the first lookup."""
+            calls.append(kwargs)
+            queryset = tag_filter(*args, **kwargs)
+            return queryset.none() if len(calls) == 1 else queryset
+
+        monkeypatch.setattr(models.Tag.objects, 'filter', stale_filter)
+
+        tags = models.Tag.objects.get_or_create_many(user.id, ['raced'])
+
+        assert tags == {'raced': existing}
+        assert len(calls) == 2
+
+
+class TestQueryBudget:
+    """Test query budget helpers."""
+
+    def test_budget_exceeded(self, db, django_user_model):
+        """Test exceeding the budget raises an error."""
+        budget = views.TagViewSet.query_budget['list']
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_query_budget(views.TagViewSet, 'list'):
+                for _ in range(budget + 1):
+                    django_user_model.objects.count()
+
+    def test_undeclared_budget(self):
+        """Test asserting undeclared budget is an error."""
+        with pytest.raises(ValueError):
+            assert_query_budget(views.TagViewSet, 'create')
+
+    @override_settings(DEBUG=True)
+    def test_middleware_enforces_budget(self, auth_api_client, user,
+                                        monkeypatch):
+        """Test the middleware fails views running over budget."""
+        create_tasks(user, 3)
+        monkeypatch.setattr(views.TaskViewSet, 'query_budget', {'list': 1})
+
+        with override_settings(MIDDLEWARE=[
+            'django.middleware.common.CommonMiddleware',
+            'core.middleware.QueryBudgetMiddleware',
+        ]):
+            with pytest.raises(QueryBudgetExceeded):
+                auth_api_client.get(TASKS_URL)
+
+    def test_middleware_disabled_without_debug(self):
+        """Test the middleware is not used outside DEBUG."""
+        from django.core.exceptions import MiddlewareNotUsed
+
+        with pytest.raises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: None)
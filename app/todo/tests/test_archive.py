@@ -0,0 +1,165 @@
+"""
+Todo archiving tests.
+"""
+from io import StringIO
+
+import pytest
+
+from django.core.management import (
+    CommandError,
+    call_command,
+)
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import (
+    models,
+    recurrence,
+)
+from ..api import views
+from .factories import task_factory
+from .test_stats import assert_stats_counted
+
+
+TASKS_URL = reverse('task-list')
+TASKS_BULK_ARCHIVE_URL = reverse('task-bulk-archive')
+TASKS_BULK_UNARCHIVE_URL = reverse('task-bulk-unarchive')
+
+
+def archived_ids(owner):
+    """Return ids of the archived tasks of owner."""
+    return set(models.Task.objects.filter(owner=owner, is_archived=True)
+               .values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+class TestArchive:
+    """Test archiving single tasks."""
+
+    def test_archive_writes_archive_fields(self, user):
+        """Test archiving updates the archive fields only."""
+        task = task_factory.TaskFactory(owner=user)
+        seq = task.sync_seq
+
+        with CaptureQueriesContext(connection) as queries:
+            task.archive()
+
+        update, = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "todo_task"')]
+        assert '"label"' not in update
+        assert '"archived_date"' in update
+        task.refresh_from_db()
+        assert task.is_archived
+        assert task.sync_seq > seq
+
+
+@pytest.mark.django_db
+class TestBulkArchiveAPI:
+    """Test archiving and unarchiving many tasks at once."""
+
+    def test_bulk_archive(self, auth_api_client, user):
+        """Test listed active tasks of the user are archived."""
+        tasks = task_factory.TaskFactory.create_batch(3, owner=user)
+        archived = task_factory.ArchivedTaskFactory(owner=user)
+        other = task_factory.TaskFactory()
+        ids = [tasks[0].id, tasks[1].id, archived.id, other.id]
+
+        with assert_query_budget(views.TaskViewSet, 'bulk_archive'):
+            res = auth_api_client.post(TASKS_BULK_ARCHIVE_URL, {'ids': ids},
+                                       format='json')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data == {'ids': [tasks[0].id, tasks[1].id]}
+        assert archived_ids(user) == {tasks[0].id, tasks[1].id, archived.id}
+        assert not models.Task.objects.get(id=other.id).is_archived
+        task = models.Task.objects.get(id=tasks[0].id)
+        assert task.archived_date is not None
+        assert task.sync_seq > tasks[0].sync_seq
+        assert_stats_counted(user)
+
+    def test_bulk_unarchive(self, auth_api_client, user):
+        """Test listed archived tasks of the user are unarchived."""
+        tasks = task_factory.ArchivedTaskFactory.create_batch(2, owner=user)
+
+        with assert_query_budget(views.TaskViewSet, 'bulk_unarchive'):
+            res = auth_api_client.post(
+                TASKS_BULK_UNARCHIVE_URL, {'ids': [tasks[0].id]},
+                format='json')
+
+        assert res.data == {'ids': [tasks[0].id]}
+        assert archived_ids(user) == {tasks[1].id}
+        assert models.Task.objects.get(id=tasks[0].id).archived_date is None
+        assert_stats_counted(user)
+
+    def test_bulk_archive_refreshes_listing(self, auth_api_client, user):
+        """Test cached listings drop archived tasks."""
+        task = task_factory.TaskFactory(owner=user)
+        auth_api_client.get(TASKS_URL)
+
+        auth_api_client.post(TASKS_BULK_ARCHIVE_URL, {'ids': [task.id]},
+                             format='json')
+        res = auth_api_client.get(TASKS_URL, {'archived': 'false'})
+
+        assert res.json()['results'] == []
+
+    @pytest.mark.parametrize('ids', [[], ['x'], [0]])
+    def test_invalid_ids_rejected(self, auth_api_client, user, ids):
+        """Test missing or invalid ids are rejected."""
+        res = auth_api_client.post(TASKS_BULK_ARCHIVE_URL, {'ids': ids},
+                                   format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ids' in res.data
+
+
+@pytest.mark.django_db
+class TestAutoArchiveTasksCommand:
+    """Test auto-archiving done and stale tasks."""
+
+    def test_archives_done_and_stale_tasks(self, user):
+        """Test tasks past their event or not updated are archived."""
+        now = timezone.now()
+        done = task_factory.TaskFactory(
+            owner=user, event_date=now - timezone.timedelta(days=8))
+        stale = task_factory.TaskFactory()
+        models.Task.objects.filter(id=stale.id).update(
+            updated_date=now - timezone.timedelta(days=200))
+        recent = task_factory.TaskFactory(
+            owner=user, event_date=now - timezone.timedelta(days=1))
+        upcoming = task_factory.TaskFactory(
+            owner=user, event_date=now + timezone.timedelta(days=1))
+        stdout = StringIO()
+
+        call_command('auto_archive_tasks', batch_size=1, stdout=stdout)
+
+        assert set(models.Task.objects.filter(is_archived=True)
+                   .values_list('id', flat=True)) == {done.id, stale.id}
+        assert not {recent.id, upcoming.id} & archived_ids(user)
+        assert 'Archived 2 tasks.' in stdout.getvalue()
+        assert_stats_counted(user)
+        assert_stats_counted(stale.owner)
+
+    def test_recurring_tasks_done_once_ended(self, user):
+        """Test recurring tasks are archived by their recurrence end."""
+        started = timezone.now() - timezone.timedelta(days=30)
+        ongoing = task_factory.TaskFactory(
+            owner=user, event_date=started, recurrence=recurrence.DAILY)
+        ended = task_factory.TaskFactory(
+            owner=user, event_date=started, recurrence=recurrence.DAILY,
+            recurrence_end=started + timezone.timedelta(days=10))
+
+        call_command('auto_archive_tasks', stdout=StringIO())
+
+        assert archived_ids(user) == {ended.id}
+        assert ongoing.id not in archived_ids(user)
+
+    def test_negative_age_rejected(self):
+        """Test negative ages are rejected."""
+        with pytest.raises(CommandError):
+            call_command('auto_archive_tasks', done_days=-1,
+                         stdout=StringIO())
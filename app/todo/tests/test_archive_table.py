@@ -0,0 +1,246 @@
+"""
+Todo archive table tests.
+"""
+import json
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from .. import models
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+from .test_pagination import collect_pages
+from .test_stats import assert_stats_counted
+
+
+TASKS_URL = reverse('task-list')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+
+
+def archive_tasks(owner, count, days_ago=60):
+    """Create archived tasks of owner moved to the archive table."""
+    tasks = task_factory.ArchivedTaskFactory.create_batch(
+        count, owner=owner,
+        archived_date=timezone.now() - timezone.timedelta(days=days_ago))
+    models.ArchivedTask.objects.move(
+        models.Task.objects.filter(id__in=[task.id for task in tasks]))
+    return tasks
+
+
+def task_url(task_id, action=None):
+    """Return the detail or action url of a task."""
+    if action is None:
+        return reverse('task-detail', args=[task_id])
+    return reverse(f'task-{action}', args=[task_id])
+
+
+@pytest.mark.django_db
+class TestMoveArchivedTasks:
+    """Test moving tasks between the task and archive tables."""
+
+    def test_command_moves_tasks_past_grace(self, user, settings):
+        """Test tasks archived before the grace period are moved."""
+        settings.TASK_ARCHIVE_GRACE = timezone.timedelta(days=30)
+        now = timezone.now()
+        tag = tag_factory.TagFactory(owner=user)
+        old = task_factory.ArchivedTaskFactory.create_batch(
+            3, owner=user, archived_date=now - timezone.timedelta(days=31))
+        old[0].tags.set([tag])
+        old[0].refresh_from_db()
+        recent = task_factory.ArchivedTaskFactory(
+            owner=user, archived_date=now - timezone.timedelta(days=1))
+        active = task_factory.TaskFactory(owner=user)
+        stdout = StringIO()
+
+        call_command('move_archived_tasks', batch_size=2, stdout=stdout)
+
+        assert 'Moved 3 tasks.' in stdout.getvalue()
+        assert set(models.Task.objects.values_list('id', flat=True)) == \
+            {recent.id, active.id}
+        moved = models.ArchivedTask.objects.get(id=old[0].id)
+        assert list(moved.tags.all()) == [tag]
+        assert moved.sync_seq == old[0].sync_seq
+        assert moved.created_date == old[0].created_date
+        assert not models.Tombstone.objects.exists()
+        assert_stats_counted(user)
+
+    def test_grace_days_option(self, user):
+        """Test the grace period can be given to the command."""
+        task = task_factory.ArchivedTaskFactory(
+            owner=user,
+            archived_date=timezone.now() - timezone.timedelta(days=2))
+
+        call_command('move_archived_tasks', grace_days=1, stdout=StringIO())
+
+        assert models.ArchivedTask.objects.filter(id=task.id).exists()
+
+    def test_restore_keeps_task(self, user):
+        """Test restored tasks come back unchanged."""
+        tag = tag_factory.TagFactory(owner=user)
+        task = task_factory.ArchivedTaskFactory(owner=user)
+        task.tags.set([tag])
+        task.refresh_from_db()
+        models.ArchivedTask.objects.move(models.Task.objects.all())
+
+        restored = models.ArchivedTask.objects.all().restore()
+
+        assert restored == 1
+        assert not models.ArchivedTask.objects.exists()
+        back = models.Task.objects.get(id=task.id)
+        assert (back.created_date, back.updated_date, back.sync_seq) == \
+            (task.created_date, task.updated_date, task.sync_seq)
+        assert list(back.tags.all()) == [tag]
+
+
+@pytest.mark.django_db
+class TestArchiveTableAPI:
+    """Test the task API serving tasks of the archive table."""
+
+    def test_archived_listing_merges_tables(self, auth_api_client, user):
+        """Test archived tasks of both tables are paged in order."""
+        cold = archive_tasks(user, 3)
+        hot = task_factory.ArchivedTaskFactory.create_batch(2, owner=user)
+        cold += archive_tasks(user, 2)
+        task_factory.TaskFactory(owner=user)
+
+        pages = collect_pages(auth_api_client,
+                              f'{TASKS_ARCHIVED_URL}?page_size=2')
+
+        ids = [task_id for page in pages for task_id in page]
+        assert [len(page) for page in pages] == [2, 2, 2, 1]
+        assert ids == sorted((task.id for task in cold + hot), reverse=True)
+
+    def test_previous_pages_merge_tables(self, auth_api_client, user):
+        """Test paging back over both tables."""
+        archive_tasks(user, 2)
+        task_factory.ArchivedTaskFactory.create_batch(2, owner=user)
+        archive_tasks(user, 1)
+        url = f'{TASKS_ARCHIVED_URL}?page_size=2'
+        forward = collect_pages(auth_api_client, url)
+        last = auth_api_client.get(url).json()
+        while last['next']:
+            last = auth_api_client.get(last['next']).json()
+
+        backward = collect_pages(auth_api_client, last['previous'],
+                                 direction='previous')
+
+        assert backward == forward[-2::-1]
+
+    def test_listing_includes_tags(self, auth_api_client, user):
+        """Test tags of archive table tasks are listed."""
+        task = task_factory.ArchivedTaskFactory(owner=user)
+        task.tags.set([tag_factory.TagFactory(owner=user, name='old')])
+        models.ArchivedTask.objects.move(models.Task.objects.all())
+
+        res = auth_api_client.get(TASKS_ARCHIVED_URL)
+
+        item, = res.data['results']
+        assert item['id'] == task.id
+        assert [tag['name'] for tag in item['tags']] == ['old']
+
+    def test_listing_filters(self, auth_api_client, user):
+        """Test listings filter archive table tasks as well."""
+        cold, = archive_tasks(user, 1)
+        active = task_factory.TaskFactory(
+            owner=user, priority=(cold.priority + 1) % 4)
+
+        def listed(**params):
+            res = auth_api_client.get(TASKS_URL, params)
+            return [item['id'] for item in res.data['results']]
+
+        assert listed() == [active.id, cold.id]
+        assert listed(archived='true') == [cold.id]
+        assert listed(archived='false') == [active.id]
+        assert listed(priority=cold.priority) == [cold.id]
+
+    def test_retrieve(self, auth_api_client, user):
+        """Test archive table tasks are retrieved where they are."""
+        task, = archive_tasks(user, 1)
+
+        res = auth_api_client.get(task_url(task.id))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['id'] == task.id
+        assert res.data['is_archived']
+        assert models.ArchivedTask.objects.filter(id=task.id).exists()
+
+    def test_unarchive_restores(self, auth_api_client, user):
+        """Test unarchiving restores the task to the task table."""
+        task, = archive_tasks(user, 1)
+
+        res = auth_api_client.post(task_url(task.id, 'unarchive'))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert not models.Task.objects.get(id=task.id).is_archived
+        assert not models.ArchivedTask.objects.exists()
+        assert_stats_counted(user)
+
+    def test_archive_refused_in_place(self, auth_api_client, user):
+        """Test archiving an archive table task leaves it there."""
+        task, = archive_tasks(user, 1)
+
+        res = auth_api_client.post(task_url(task.id, 'archive'))
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert res.data['error'] == 'Task is already archived.'
+        assert models.ArchivedTask.objects.filter(id=task.id).exists()
+        assert not models.Task.objects.filter(id=task.id).exists()
+
+    def test_destroy(self, auth_api_client, user):
+        """Test archive table tasks can be deleted."""
+        task, = archive_tasks(user, 1)
+
+        res = auth_api_client.delete(task_url(task.id))
+
+        assert res.status_code == status.HTTP_204_NO_CONTENT
+        assert not models.Task.objects.exists()
+        assert not models.ArchivedTask.objects.exists()
+        assert models.Tombstone.objects.filter(object_id=task.id).exists()
+        assert_stats_counted(user)
+
+    def test_other_users_not_found(self, auth_api_client, user):
+        """Test archive table tasks of other users are not served."""
+        task, = archive_tasks(task_factory.TaskFactory().owner, 1)
+
+        assert auth_api_client.get(task_url(task.id)).status_code == \
+            status.HTTP_404_NOT_FOUND
+        assert auth_api_client.post(task_url(task.id, 'unarchive')) \
+            .status_code == status.HTTP_404_NOT_FOUND
+        assert models.ArchivedTask.objects.filter(id=task.id).exists()
+
+    def test_full_sync_includes_archive_table(self, auth_api_client, user):
+        """Test syncing from scratch returns archive table tasks."""
+        cold, = archive_tasks(user, 1)
+        hot = task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.get(reverse('task-changes'))
+
+        assert [task['id'] for task in res.data['tasks']] == [cold.id, hot.id]
+
+    def test_export_includes_archive_table(self, auth_api_client, user):
+        """Test exports end with archive table tasks."""
+        cold, = archive_tasks(user, 1)
+        hot = task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.get(reverse('task-export'))
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == \
+            [hot.id, cold.id]
+
+    def test_async_archived_listing(self, auth_api_client, user):
+        """Test async archived listings merge both tables."""
+        cold, = archive_tasks(user, 1)
+        hot = task_factory.ArchivedTaskFactory(owner=user)
+
+        res = auth_api_client.get(reverse('async-task-archived-tasks'))
+
+        assert [task['id'] for task in res.json()['results']] == \
+            [hot.id, cold.id]
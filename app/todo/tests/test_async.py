@@ -0,0 +1,159 @@
+"""
+Todo async API tests.
+"""
+import asyncio
+
+import pytest
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.throttling import ScopedTokenBucketThrottle
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+def create_tasks(owner):
+    """Create today, archived and tagged tasks of owner."""
+    tags = tag_factory.TagFactory.create_batch(2, owner=owner)
+    tasks = task_factory.TaskFactory.create_batch(
+        3, owner=owner, event_date=timezone.now())
+    tasks.append(task_factory.ArchivedTaskFactory(
+        owner=owner, event_date=timezone.now()))
+    for task in tasks:
+        task.tags.set(tags)
+    task_factory.TaskFactory()
+
+    return tasks
+
+
+@pytest.mark.django_db
+class TestAsyncReadAPI:
+    """Test async reads match the synchronous API."""
+
+    @pytest.mark.parametrize('name', [
+        'task-list', 'task-today-tasks', 'task-archived-tasks', 'tag-list'])
+    def test_listing_parity(self, auth_api_client, user, name):
+        """Test async listings return the synchronous content."""
+        create_tasks(user)
+
+        res = auth_api_client.get(reverse(f'async-{name}'))
+        expected = auth_api_client.get(reverse(name))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['Content-Type'] == 'application/json'
+        assert res.content == expected.content
+
+    @pytest.mark.parametrize('name', [
+        'task-list', 'task-today-tasks', 'task-archived-tasks'])
+    @pytest.mark.parametrize('params', [
+        {'priority': '0,2'},
+        {'archived': 'false'},
+        {'overdue': 'false', 'ordering': 'priority'},
+        {'tags': 'work', 'ordering': '-updated_date', 'page_size': 2},
+    ])
+    def test_listing_parameters_parity(self, auth_api_client, user, name,
+                                       params):
+        """Test async listings take the synchronous parameters."""
+        work = tag_factory.TagFactory(owner=user, name='work')
+        for priority in range(4):
+            task = task_factory.TaskFactory(
+                owner=user, priority=priority, event_date=timezone.now())
+            task.tags.set([work] if priority % 2 else [])
+        task_factory.ArchivedTaskFactory(owner=user, priority=2)
+
+        res = auth_api_client.get(reverse(f'async-{name}'), params)
+        expected = auth_api_client.get(reverse(name), params)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == expected.content
+
+    @pytest.mark.parametrize('params', [
+        {'ordering': 'label'},
+        {'priority': '7', 'tags_match': 'some'},
+    ])
+    def test_invalid_parameters_rejected(self, auth_api_client, params):
+        """Test invalid listing parameters are rejected like synchronously.
+        """
+        res = auth_api_client.get(reverse('async-task-list'), params)
+        expected = auth_api_client.get(reverse('task-list'), params)
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert res.json() == expected.json()
+
+    @pytest.mark.parametrize('name', ['task-detail', 'tag-detail'])
+    def test_detail_parity(self, auth_api_client, user, name):
+        """Test async details return the synchronous content."""
+        task = create_tasks(user)[0]
+        pk = task.id if name == 'task-detail' else task.tags.first().id
+
+        res = auth_api_client.get(reverse(f'async-{name}', args=[pk]))
+        expected = auth_api_client.get(reverse(name, args=[pk]))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == expected.content
+
+    def test_pagination(self, auth_api_client, user):
+        """Test async listing pages follow the same cursors."""
+        create_tasks(user)
+        url = reverse('async-task-list') + '?page_size=2'
+
+        ids = []
+        while url:
+            res = auth_api_client.get(url)
+            ids.extend(item['id'] for item in res.json()['results'])
+            url = res.json()['next']
+
+        expected = auth_api_client.get(reverse('task-list')).json()
+        assert ids == [item['id'] for item in expected['results']]
+
+    def test_other_user_task_not_found(self, auth_api_client):
+        """Test tasks of other users are not found."""
+        task = task_factory.TaskFactory()
+
+        res = auth_api_client.get(
+            reverse('async-task-detail', args=[task.id]))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert res.json() == {'detail': 'Not found.'}
+
+    def test_auth_required(self, api_client):
+        """Test authentication is required."""
+        res = api_client.get(reverse('async-task-list'))
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert res['WWW-Authenticate'].startswith('Bearer')
+
+    def test_throttled(self, auth_api_client, monkeypatch):
+        """Test task reads share the tasks throttle scope."""
+        monkeypatch.setattr(ScopedTokenBucketThrottle, 'THROTTLE_RATES',
+                            {'tasks': '1/min'})
+
+        auth_api_client.get(reverse('async-task-list'))
+        res = auth_api_client.get(reverse('async-task-list'))
+
+        assert res.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 'Retry-After' in res
+
+    def test_concurrent_requests(self, user):
+        """Test concurrent requests are served on one event loop."""
+        create_tasks(user)
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        urls = [reverse('async-task-list'), reverse('async-tag-list'),
+                reverse('async-task-today-tasks')]
+
+        async def get_all():
+            return await asyncio.gather(
+                *(client.get(url, headers=headers) for url in urls))
+
+        responses = async_to_sync(get_all)()
+
+        assert [res.status_code for res in responses] == \
+            [status.HTTP_200_OK] * len(urls)
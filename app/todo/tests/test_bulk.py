@@ -0,0 +1,125 @@
+"""
+Todo bulk API tests.
+"""
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core.authentication import clear_caches
+from core.query_budget import assert_query_budget
+from core.tests.factories.user_factory import UserFactory
+
+from .. import models
+from ..api import (
+    serializers,
+    views,
+)
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_BULK_URL = reverse('task-bulk')
+
+
+def make_payload(owner, count):
+    """Return bulk payload touching count tasks per operation."""
+    updated = task_factory.TaskFactory.create_batch(count, owner=owner)
+    deleted = task_factory.TaskFactory.create_batch(count, owner=owner)
+    return {
+        'create': [{'label': f'New{i}', 'priority': 1,
+                    'tags': [{'name': f'new{i}'}, {'name': 'shared'}]}
+                   for i in range(count)],
+        'update': [{'id': task.id, 'label': f'Updated{task.id}',
+                    'tags': [{'name': 'shared'}]} for task in updated],
+        'delete': [task.id for task in deleted],
+    }
+
+
+@pytest.mark.django_db
+class TestTaskBulkAPI:
+    """Task bulk API tests."""
+
+    def test_bulk_changes(self, auth_api_client, user):
+        """Test creating, updating and deleting tasks at once."""
+        kept_tag = tag_factory.TagFactory(owner=user, name='kept')
+        dropped_tag = tag_factory.TagFactory(owner=user, name='dropped')
+        task = task_factory.TaskFactory(owner=user, priority=0)
+        task.tags.set([kept_tag, dropped_tag])
+        removed = task_factory.TaskFactory(owner=user)
+        payload = {
+            'create': [{'label': 'New', 'priority': 2,
+                        'tags': [{'name': 'kept'}, {'name': 'fresh'}]}],
+            'update': [{'id': task.id, 'priority': 3,
+                        'tags': [{'name': 'kept'}, {'name': 'fresh'}]}],
+            'delete': [removed.id],
+        }
+
+        res = auth_api_client.post(TASKS_BULK_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_200_OK
+        created = models.Task.objects.get(label='New')
+        assert res.data == {
+            'create': [{'id': created.id, 'status': 201}],
+            'update': [{'id': task.id, 'status': 200}],
+            'delete': [{'id': removed.id, 'status': 204}],
+        }
+        task.refresh_from_db()
+        assert task.priority == 3
+        assert {t.name for t in task.tags.all()} == {'kept', 'fresh'}
+        assert {t.name for t in created.tags.all()} == {'kept', 'fresh'}
+        assert created.owner == user
+        assert not models.Task.objects.filter(id=removed.id).exists()
+        assert models.Tag.objects.filter(owner=user).count() == 3
+
+    def test_invalid_item_rejects_batch(self, auth_api_client, user):
+        """Test an invalid item is reported and nothing is written."""
+        task = task_factory.TaskFactory(owner=user)
+        foreign_task = task_factory.TaskFactory(owner=UserFactory())
+        payload = {
+            'create': [{'label': 'Valid', 'priority': 1},
+                       {'label': 'Invalid', 'priority': 9}],
+            'update': [{'id': task.id, 'label': 'Changed'}],
+            'delete': [foreign_task.id],
+        }
+
+        res = auth_api_client.post(TASKS_BULK_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(res.data['create']) == {1}
+        assert 'priority' in res.data['create'][1]
+        assert set(res.data['delete']) == {0}
+        assert 'update' not in res.data
+        assert not models.Task.objects.filter(label='Valid').exists()
+        assert models.Task.objects.filter(id=foreign_task.id).exists()
+        task.refresh_from_db()
+        assert task.label != 'Changed'
+
+    def test_batch_size_limit(self, auth_api_client, monkeypatch):
+        """Test too large batches are rejected."""
+        monkeypatch.setattr(serializers.TaskBulkSerializer, 'MAX_ITEMS', 2)
+        payload = {'delete': [1, 2, 3]}
+
+        res = auth_api_client.post(TASKS_BULK_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_query_count_does_not_grow(self, auth_api_client, user):
+        """Test the number of queries does not depend on batch size."""
+        counts = []
+        for count in (2, 40):
+            payload = make_payload(user, count)
+            clear_caches()
+            with CaptureQueriesContext(connection) as queries:
+                with assert_query_budget(views.TaskViewSet, 'bulk'):
+                    res = auth_api_client.post(
+                        TASKS_BULK_URL, payload, format='json')
+
+            assert res.status_code == status.HTTP_200_OK
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1]
@@ -0,0 +1,144 @@
+"""
+Todo listings cache tests.
+"""
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.tests.factories.user_factory import UserFactory
+
+from .. import models
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_URL = reverse('task-list')
+TASKS_TODAY_URL = reverse('task-today-tasks')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+TASKS_BULK_URL = reverse('task-bulk')
+
+
+def get_cached(client, url, **kwargs):
+    """Request url twice and return the second response and its queries."""
+    client.get(url, **kwargs)
+    with CaptureQueriesContext(connection) as queries:
+        res = client.get(url, **kwargs)
+
+    return res, queries
+
+
+def listed_labels(client, url=TASKS_URL):
+    """Return labels of the listed tasks."""
+    return [task['label'] for task in client.get(url).data['results']]
+
+
+@pytest.mark.django_db
+class TestListingsCache:
+    """Task listings cache tests."""
+
+    @pytest.mark.parametrize(
+        'url', [TASKS_URL, TASKS_TODAY_URL, TASKS_ARCHIVED_URL])
+    def test_listing_served_from_cache(self, auth_api_client, user, url):
+        """Test repeated listing only runs the validators query."""
+        for is_archived in (False, True):
+            task_factory.TaskFactory.create_batch(
+                3, owner=user, event_date=timezone.now(),
+                is_archived=is_archived)
+        expected = auth_api_client.get(url)
+
+        res, queries = get_cached(auth_api_client, url)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == expected.json()
+        assert res['Content-Type'] == 'application/json'
+        assert len(queries) == 1
+
+    def test_browsable_api_not_cached(self, auth_api_client, user):
+        """Test only JSON responses are cached."""
+        res, queries = get_cached(
+            auth_api_client, TASKS_URL, HTTP_ACCEPT='text/html')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(queries) > 1
+
+    def test_pages_cached_apart(self, auth_api_client, user):
+        """Test every page has its own entry."""
+        task_factory.TaskFactory.create_batch(3, owner=user)
+        first = auth_api_client.get(f'{TASKS_URL}?page_size=2')
+
+        second = auth_api_client.get(first.data['next'])
+
+        assert len(second.data['results']) == 1
+
+    def test_cache_is_per_user(self, auth_api_client, api_client, user):
+        """Test users do not see each other cached listings."""
+        other = UserFactory()
+        task_factory.TaskFactory(owner=other, label='Other')
+        auth_api_client.get(TASKS_URL)
+        api_client.force_authenticate(other)
+
+        res = api_client.get(TASKS_URL)
+
+        assert [task['label'] for task in res.data['results']] == ['Other']
+
+    def test_invalidated_on_task_changes(self, auth_api_client, user):
+        """Test creating, updating and deleting tasks invalidates."""
+        task = task_factory.TaskFactory(owner=user, label='First')
+        assert listed_labels(auth_api_client) == ['First']
+
+        task.label = 'Renamed'
+        task.save()
+        assert listed_labels(auth_api_client) == ['Renamed']
+
+        task_factory.TaskFactory(owner=user, label='Second')
+        assert listed_labels(auth_api_client) == ['Second', 'Renamed']
+
+        task.delete()
+        assert listed_labels(auth_api_client) == ['Second']
+
+    def test_invalidated_on_archive(self, auth_api_client, user):
+        """Test archiving and unarchiving a task invalidates."""
+        task = task_factory.TaskFactory(owner=user, label='Task')
+        assert listed_labels(auth_api_client, TASKS_ARCHIVED_URL) == []
+
+        task.archive()
+        assert listed_labels(auth_api_client, TASKS_ARCHIVED_URL) == ['Task']
+
+        task.unarchive()
+        assert listed_labels(auth_api_client, TASKS_ARCHIVED_URL) == []
+
+    def test_invalidated_on_tag_changes(self, auth_api_client, user):
+        """Test tag renames and membership changes invalidate."""
+        task = task_factory.TaskFactory(owner=user)
+        tag = tag_factory.TagFactory(owner=user, name='old')
+
+        def listed_tags():
+            res = auth_api_client.get(TASKS_URL)
+            return [t['name'] for t in res.data['results'][0]['tags']]
+
+        assert listed_tags() == []
+        task.tags.add(tag)
+        assert listed_tags() == ['old']
+
+        tag.name = 'new'
+        tag.save()
+        assert listed_tags() == ['new']
+
+        tag.delete()
+        assert listed_tags() == []
+
+    def test_invalidated_on_bulk_changes(self, auth_api_client, user):
+        """Test the bulk endpoint invalidates."""
+        assert listed_labels(auth_api_client) == []
+        payload = {'create': [{'label': 'Bulk', 'priority': 1}]}
+
+        auth_api_client.post(TASKS_BULK_URL, payload, format='json')
+
+        assert listed_labels(auth_api_client) == ['Bulk']
+        assert models.Task.objects.count() == 1
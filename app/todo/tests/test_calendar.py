@@ -0,0 +1,251 @@
+"""
+Todo day and calendar tests.
+"""
+import datetime
+import zoneinfo
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+from .test_archive_table import archive_tasks
+
+
+TASKS_TODAY_URL = reverse('task-today-tasks')
+TASKS_CALENDAR_URL = reverse('task-calendar')
+TASKS_STATS_URL = reverse('task-stats')
+
+# Fourteen hours ahead of UTC, its date differs from the UTC one for most
+# of the day.
+AHEAD = 'Pacific/Kiritimati'
+
+
+def day_start(day, name):
+    """Return the start of day in the named time zone."""
+    return models.get_day_start(day, zoneinfo.ZoneInfo(name))
+
+
+def local_today(name):
+    """Return the current date in the named time zone."""
+    return timezone.localdate(timezone=zoneinfo.ZoneInfo(name))
+
+
+def set_timezone(user, name):
+    """Set the time zone of user."""
+    user.timezone = name
+    user.save(update_fields=['timezone'])
+
+
+@pytest.mark.django_db
+class TestDays:
+    """Test day queries of the task queryset."""
+
+    def test_day_start_across_dst(self):
+        """Test days span 23 and 25 hours across daylight saving."""
+        def length(day):
+            start, end = (day_start(date, 'Europe/Prague')
+                          .astimezone(datetime.timezone.utc)
+                          for date in (day, day + datetime.timedelta(days=1)))
+            return end - start
+
+        assert length(datetime.date(2024, 3, 31)) == \
+            datetime.timedelta(hours=23)
+        assert length(datetime.date(2024, 10, 27)) == \
+            datetime.timedelta(hours=25)
+
+    def test_today_in_timezone(self, user):
+        """Test today tasks are those of the local date of tz."""
+        today = day_start(local_today(AHEAD), AHEAD)
+        minute = datetime.timedelta(minutes=1)
+        tasks = [task_factory.TaskFactory(owner=user, event_date=date)
+                 for date in (today - minute, today,
+                              today + datetime.timedelta(days=1) - minute,
+                              today + datetime.timedelta(days=1))]
+        task_factory.ArchivedTaskFactory(owner=user, event_date=today)
+
+        queryset = models.Task.objects.get_owner_tasks(user) \
+            .get_today_tasks(zoneinfo.ZoneInfo(AHEAD))
+
+        assert set(queryset.values_list('id', flat=True)) == \
+            {tasks[1].id, tasks[2].id}
+
+    def test_today_compares_column(self, user):
+        """Test today does not cast the event date column."""
+        with CaptureQueriesContext(connection) as queries:
+            list(models.Task.objects.get_owner_tasks(user).get_today_tasks())
+
+        sql, = [query['sql'] for query in queries]
+        assert '"todo_task"."event_date" >= ' in sql
+        assert '"todo_task"."event_date" < ' in sql
+
+    def test_count_due_in_timezone(self, user):
+        """Test due today counts tasks of the local date of tz."""
+        tomorrow = day_start(local_today(AHEAD), AHEAD) + \
+            datetime.timedelta(days=1)
+        task_factory.TaskFactory(
+            owner=user, event_date=tomorrow - datetime.timedelta(minutes=1))
+        task_factory.TaskFactory(owner=user, event_date=tomorrow)
+
+        due = models.Task.objects.get_owner_tasks(user) \
+            .count_due(zoneinfo.ZoneInfo(AHEAD))
+
+        assert due['today'] == 1
+
+
+@pytest.mark.django_db
+class TestTodayAPI:
+    """Test today tasks in the user time zone."""
+
+    def test_today_uses_user_timezone(self, auth_api_client, user):
+        """Test today follows the user time zone."""
+        set_timezone(user, AHEAD)
+        start = day_start(local_today(AHEAD), AHEAD)
+        today = task_factory.TaskFactory(owner=user, event_date=start)
+        task_factory.TaskFactory(
+            owner=user, event_date=start - datetime.timedelta(seconds=1))
+
+        res = auth_api_client.get(TASKS_TODAY_URL)
+
+        assert [task['id'] for task in res.json()['results']] == [today.id]
+
+    def test_timezone_change_refreshes_today(self, auth_api_client, user):
+        """Test cached today listings are keyed by the user time zone."""
+        behind = 'Etc/GMT+12'
+        set_timezone(user, behind)
+        # Both todays contain now, an end of today ahead is outside the one
+        # twelve hours behind UTC.
+        start = day_start(local_today(AHEAD), AHEAD)
+        event_date = start \
+            if start < day_start(local_today(behind), behind) else \
+            start + datetime.timedelta(days=1) - datetime.timedelta(minutes=1)
+        task = task_factory.TaskFactory(owner=user, event_date=event_date)
+        before = auth_api_client.get(TASKS_TODAY_URL)
+
+        res = auth_api_client.patch(reverse('me'), {'timezone': AHEAD})
+        after = auth_api_client.get(TASKS_TODAY_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert task.id not in [item['id'] for item in before.json()['results']]
+        assert [item['id'] for item in after.json()['results']] == [task.id]
+
+    def test_active_listed_archived_not(self, auth_api_client, user):
+        """Test today lists active one-off tasks due today only."""
+        now = timezone.now()
+        active = task_factory.TaskFactory(owner=user, event_date=now)
+        task_factory.ArchivedTaskFactory(owner=user, event_date=now)
+
+        res = auth_api_client.get(TASKS_TODAY_URL)
+
+        assert [task['id'] for task in res.json()['results']] == [active.id]
+
+    def test_stats_use_user_timezone(self, auth_api_client, user):
+        """Test due today stats follow the user time zone."""
+        set_timezone(user, AHEAD)
+        task_factory.TaskFactory(
+            owner=user, event_date=day_start(local_today(AHEAD), AHEAD) +
+            datetime.timedelta(days=1) - datetime.timedelta(minutes=1))
+
+        res = auth_api_client.get(TASKS_STATS_URL)
+
+        assert res.data['today'] == 1
+
+    def test_invalid_timezone_rejected(self, auth_api_client, user):
+        """Test unknown time zones are rejected."""
+        res = auth_api_client.patch(reverse('me'), {'timezone': 'Mars/Base'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'timezone' in res.data
+
+
+@pytest.mark.django_db
+class TestCalendarAPI:
+    """Test the calendar of tasks grouped by day."""
+
+    def test_tasks_grouped_by_local_day(self, auth_api_client, user):
+        """Test tasks are listed on their day of the user time zone."""
+        set_timezone(user, 'America/New_York')
+        first = datetime.date(2024, 3, 9)
+        # 02:00 UTC on the 10th is still the 9th in New York.
+        late = task_factory.TaskFactory(
+            owner=user,
+            event_date=datetime.datetime(2024, 3, 10, 2,
+                                         tzinfo=datetime.timezone.utc))
+        early = task_factory.TaskFactory(
+            owner=user, event_date=day_start(first, 'America/New_York'))
+        next_day = task_factory.TaskFactory(
+            owner=user, event_date=day_start(datetime.date(2024, 3, 11),
+                                             'America/New_York'))
+        task_factory.TaskFactory(owner=user, event_date=day_start(
+            datetime.date(2024, 3, 12), 'America/New_York'))
+        task_factory.TaskFactory(owner=user)
+
+        with assert_query_budget(views.TaskViewSet, 'calendar'):
+            res = auth_api_client.get(TASKS_CALENDAR_URL,
+                                      {'start': first, 'end': '2024-03-12'})
+
+        assert res.status_code == status.HTTP_200_OK
+        data = res.json()
+        assert (data['start'], data['end'], data['timezone']) == \
+            ('2024-03-09', '2024-03-12', 'America/New_York')
+        assert [(day['date'], [task['id'] for task in day['tasks']])
+                for day in data['days']] == [
+            ('2024-03-09', [early.id, late.id]),
+            ('2024-03-10', []),
+            ('2024-03-11', [next_day.id]),
+        ]
+
+    def test_includes_tags_and_archive_table(self, auth_api_client, user):
+        """Test tasks of both tables are listed with their tags."""
+        day = datetime.date(2024, 5, 1)
+        cold, = archive_tasks(user, 1)
+        models.ArchivedTask.objects.filter(id=cold.id).update(
+            event_date=day_start(day, 'UTC'))
+        hot = task_factory.TaskFactory(
+            owner=user, event_date=day_start(day, 'UTC'))
+        hot.tags.set([tag_factory.TagFactory(owner=user, name='work')])
+        params = {'start': day, 'end': day + datetime.timedelta(days=1)}
+
+        tasks = auth_api_client.get(TASKS_CALENDAR_URL, params) \
+            .json()['days'][0]['tasks']
+        active = auth_api_client.get(
+            TASKS_CALENDAR_URL, {**params, 'archived': 'false'}) \
+            .json()['days'][0]['tasks']
+
+        assert [(task['id'], [tag['name'] for tag in task['tags']])
+                for task in tasks] == [(cold.id, []), (hot.id, ['work'])]
+        assert [task['id'] for task in active] == [hot.id]
+
+    def test_other_users_tasks_excluded(self, auth_api_client, user):
+        """Test only tasks of the user are listed."""
+        task_factory.TaskFactory(event_date=day_start(
+            datetime.date(2024, 5, 1), 'UTC'))
+
+        res = auth_api_client.get(
+            TASKS_CALENDAR_URL, {'start': '2024-05-01', 'end': '2024-05-02'})
+
+        assert res.json()['days'] == [{'date': '2024-05-01', 'tasks': []}]
+
+    @pytest.mark.parametrize('params', [
+        {},
+        {'start': '2024-05-01'},
+        {'start': '2024-05-01', 'end': '2024-05-01'},
+        {'start': '2024-05-01', 'end': '2024-07-03'},
+        {'start': 'may', 'end': '2024-05-02'},
+    ])
+    def test_invalid_window_rejected(self, auth_api_client, user, params):
+        """Test missing, empty and too long windows are rejected."""
+        res = auth_api_client.get(TASKS_CALENDAR_URL, params)
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,182 @@
+"""
+Todo API conditional requests tests.
+"""
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from ..cache import get_listings_cache
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_URL = reverse('task-list')
+TASKS_TODAY_URL = reverse('task-today-tasks')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+TAGS_URL = reverse('tag-list')
+
+
+def task_detail_url(task_id):
+    """Return task detail url."""
+    return reverse('task-detail', args=[task_id])
+
+
+def tag_detail_url(tag_id):
+    """Return tag detail url."""
+    return reverse('tag-detail', args=[tag_id])
+
+
+@pytest.mark.django_db
+class TestConditionalListing:
+    """Conditional listing requests tests."""
+
+    @pytest.mark.parametrize(
+        'url', [TASKS_URL, TASKS_TODAY_URL, TASKS_ARCHIVED_URL, TAGS_URL])
+    def test_not_modified(self, auth_api_client, user, url):
+        """Test matching If-None-Match returns 304 without the listing."""
+        task_factory.TaskFactory(owner=user, event_date=timezone.now())
+        res = auth_api_client.get(url)
+        assert res['ETag'].startswith('W/"')
+        assert 'Last-Modified' in res
+
+        with CaptureQueriesContext(connection) as queries:
+            res_cond = auth_api_client.get(
+                url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        assert res_cond.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res_cond['ETag'] == res['ETag']
+        assert not res_cond.content
+        assert len(queries) == 1
+
+    def test_modified_after_change(self, auth_api_client, user):
+        """Test changes produce new ETag."""
+        task = task_factory.TaskFactory(owner=user)
+        etag = auth_api_client.get(TASKS_URL)['ETag']
+
+        task.delete()
+        res = auth_api_client.get(TASKS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'] != etag
+        assert res.data['results'] == []
+
+    def test_modified_after_tag_rename(self, auth_api_client, user):
+        """Test renaming a listed tag produces new ETag."""
+        task = task_factory.TaskFactory(owner=user)
+        tag = tag_factory.TagFactory(owner=user, name='old')
+        task.tags.add(tag)
+        etag = auth_api_client.get(TASKS_URL)['ETag']
+
+        tag.name = 'new'
+        tag.save()
+        res = auth_api_client.get(TASKS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize('url', [TASKS_URL, TAGS_URL])
+    def test_validators_shared_by_processes(self, auth_api_client, user,
+                                            url):
+        """Test validators come from the database, not the local cache."""
+        tag_factory.TagFactory(owner=user)
+        res = auth_api_client.get(url)
+
+        get_listings_cache().clear()
+        res_cond = auth_api_client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        assert res_cond.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res_cond['Last-Modified'] == res['Last-Modified']
+
+    def test_tags_modified_after_delete(self, auth_api_client, user):
+        """Test deleting a tag produces new tags ETag."""
+        tag_factory.TagFactory(owner=user, name='kept')
+        tag = tag_factory.TagFactory(owner=user, name='gone')
+        etag = auth_api_client.get(TAGS_URL)['ETag']
+
+        tag.delete()
+        res = auth_api_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [tag['name'] for tag in res.data['results']] == ['kept']
+
+    def test_if_modified_since(self, auth_api_client, user):
+        """Test If-Modified-Since returns 304 for unchanged listing."""
+        task_factory.TaskFactory(owner=user)
+        last_modified = auth_api_client.get(TASKS_URL)['Last-Modified']
+
+        res = auth_api_client.get(
+            TASKS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+class TestConditionalDetail:
+    """Conditional detail requests tests."""
+
+    def test_retrieve_not_modified(self, auth_api_client, user):
+        """Test retrieving unchanged task returns 304."""
+        task = task_factory.TaskFactory(owner=user)
+        etag = auth_api_client.get(task_detail_url(task.id))['ETag']
+
+        res = auth_api_client.get(
+            task_detail_url(task.id), HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_update_with_current_etag(self, auth_api_client, user):
+        """Test updating with matching If-Match succeeds."""
+        task = task_factory.TaskFactory(owner=user)
+        etag = auth_api_client.get(task_detail_url(task.id))['ETag']
+
+        res = auth_api_client.patch(
+            task_detail_url(task.id), {'label': 'Changed'},
+            format='json', HTTP_IF_MATCH=etag)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['ETag'] != etag
+        task.refresh_from_db()
+        assert task.label == 'Changed'
+
+    def test_update_with_stale_etag(self, auth_api_client, user):
+        """Test updating with stale If-Match is rejected."""
+        task = task_factory.TaskFactory(owner=user)
+        etag = auth_api_client.get(task_detail_url(task.id))['ETag']
+        auth_api_client.patch(
+            task_detail_url(task.id), {'label': 'First'}, format='json')
+
+        res = auth_api_client.put(
+            task_detail_url(task.id), {'label': 'Second', 'priority': 1},
+            format='json', HTTP_IF_MATCH=etag)
+
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
+        task.refresh_from_db()
+        assert task.label == 'First'
+
+    def test_update_with_stale_unmodified_since(self, auth_api_client, user):
+        """Test updating with If-Unmodified-Since in the past fails."""
+        task = task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.patch(
+            task_detail_url(task.id), {'label': 'Changed'}, format='json',
+            HTTP_IF_UNMODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    def test_tag_detail_etag(self, auth_api_client, user):
+        """Test tag detail supports If-Match."""
+        tag = tag_factory.TagFactory(owner=user)
+        etag = auth_api_client.get(tag_detail_url(tag.id))['ETag']
+        tag.name = 'renamed'
+        tag.save()
+
+        res = auth_api_client.patch(
+            tag_detail_url(tag.id), {'name': 'other'}, format='json',
+            HTTP_IF_MATCH=etag)
+
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
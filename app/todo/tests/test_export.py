@@ -0,0 +1,107 @@
+"""
+Todo task export tests.
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from .. import models
+from ..api import (
+    serializers,
+    views,
+)
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+EXPORT_URL = reverse('task-export')
+
+
+def create_tasks(owner, count):
+    """Create tasks with two tags each for owner."""
+    tags = tag_factory.TagFactory.create_batch(3, owner=owner)
+    tasks = task_factory.TaskFactory.create_batch(count, owner=owner)
+    for index, task in enumerate(tasks):
+        task.tags.set(tags[index % 2:index % 2 + 2])
+
+    return tasks
+
+
+def read_content(res):
+    """Return the streamed response content as text."""
+    assert res.streaming
+    return b''.join(res.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestTaskExportAPI:
+    """Test streaming task export."""
+
+    def test_auth_required(self, api_client):
+        """Test authentication is required to export tasks."""
+        res = api_client.get(EXPORT_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_export_ndjson(self, auth_api_client, user):
+        """Test tasks are exported as one JSON object per line."""
+        create_tasks(user, 3)
+        task_factory.TaskFactory()
+
+        res = auth_api_client.get(EXPORT_URL)
+        lines = read_content(res).splitlines()
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['Content-Type'].startswith('application/x-ndjson')
+        assert 'tasks.ndjson' in res['Content-Disposition']
+        queryset = models.Task.objects.get_owner_tasks(user) \
+            .order_by('id').with_tags()
+        expected = serializers.TaskDetailSerializer(queryset, many=True).data
+        assert [json.loads(line) for line in lines] == \
+            json.loads(json.dumps(expected))
+
+    def test_export_csv(self, auth_api_client, user):
+        """Test tasks are exported as CSV with tag names joined."""
+        tasks = create_tasks(user, 2)
+
+        res = auth_api_client.get(EXPORT_URL, {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(read_content(res))))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res['Content-Type'].startswith('text/csv')
+        assert [int(row['id']) for row in rows] == [task.id for task in tasks]
+        assert rows[0]['label'] == tasks[0].label
+        assert rows[0]['is_archived'] == 'false'
+        assert rows[0]['tags'] == '|'.join(
+            tag.name for tag in tasks[0].tags.order_by('id'))
+
+    def test_export_empty(self, auth_api_client):
+        """Test export without tasks has only the CSV header."""
+        res = auth_api_client.get(EXPORT_URL, {'format': 'csv'})
+
+        assert read_content(res).splitlines() == [
+            ','.join(serializers.TaskDetailSerializer().fields)]
+
+    def test_tags_resolved_per_chunk(self, auth_api_client, user,
+                                     monkeypatch):
+        """Test rows are read in chunks with one tag query per chunk."""
+        monkeypatch.setattr(views.TaskViewSet, 'export_chunk_size', 2)
+        create_tasks(user, 5)
+
+        res = auth_api_client.get(EXPORT_URL)
+        with CaptureQueriesContext(connection) as queries:
+            lines = read_content(res).splitlines()
+
+        tag_queries = [query for query in queries.captured_queries
+                       if 'todo_task_tags' in query['sql']]
+        assert len(lines) == 5
+        assert len(tag_queries) == 3
@@ -0,0 +1,195 @@
+"""
+Todo API filtering and ordering tests.
+"""
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+from .test_pagination import collect_pages
+
+
+TASKS_URL = reverse('task-list')
+
+
+def listed_ids(client, **params):
+    """Return ids of the tasks listed with query params."""
+    res = client.get(TASKS_URL, params)
+    assert res.status_code == status.HTTP_200_OK
+    return {task['id'] for task in res.data['results']}
+
+
+@pytest.fixture
+def tagged_tasks(user):
+    """Return tasks tagged with work, home and both of them."""
+    work = tag_factory.TagFactory(owner=user, name='work')
+    home = tag_factory.TagFactory(owner=user, name='home')
+    tasks = task_factory.TaskFactory.create_batch(4, owner=user)
+    tasks[0].tags.set([work])
+    tasks[1].tags.set([home])
+    tasks[2].tags.set([work, home])
+    return tasks
+
+
+@pytest.mark.django_db
+class TestTaskFilters:
+    """Test the task listing filter parameters."""
+
+    def test_priority(self, auth_api_client, user):
+        """Test filtering by a list of priorities."""
+        tasks = [task_factory.TaskFactory(owner=user, priority=priority)
+                 for priority in range(4)]
+
+        ids = listed_ids(auth_api_client, priority='3,1')
+
+        assert ids == {tasks[3].id, tasks[1].id}
+
+    def test_archived(self, auth_api_client, user):
+        """Test filtering by archived state."""
+        active = task_factory.TaskFactory(owner=user)
+        archived = task_factory.ArchivedTaskFactory(owner=user)
+
+        assert listed_ids(auth_api_client, archived='true') == {archived.id}
+        assert listed_ids(auth_api_client, archived='false') == {active.id}
+
+    def test_overdue(self, auth_api_client, user):
+        """Test filtering overdue and not overdue tasks."""
+        past = timezone.now() - timezone.timedelta(days=1)
+        overdue = task_factory.TaskFactory(owner=user, event_date=past)
+        archived = task_factory.ArchivedTaskFactory(owner=user,
+                                                    event_date=past)
+        undated = task_factory.TaskFactory(owner=user)
+        recurring = task_factory.TaskFactory(owner=user, event_date=past,
+                                             recurrence='daily')
+
+        assert listed_ids(auth_api_client, overdue='true') == {overdue.id}
+        assert listed_ids(auth_api_client, overdue='false') == \
+            {archived.id, undated.id, recurring.id}
+
+    def test_event_date_range(self, auth_api_client, user):
+        """Test the event date range includes its start only."""
+        start = timezone.now().replace(microsecond=0)
+        tasks = [task_factory.TaskFactory(
+            owner=user, event_date=start + timezone.timedelta(hours=hours))
+            for hours in (-1, 0, 1, 2)]
+
+        ids = listed_ids(
+            auth_api_client, event_after=start.isoformat(),
+            event_before=(start + timezone.timedelta(hours=2)).isoformat())
+
+        assert ids == {tasks[1].id, tasks[2].id}
+
+    def test_empty_event_date_range_rejected(self, auth_api_client, user):
+        """Test ranges ending before they start are rejected."""
+        now = timezone.now().isoformat()
+
+        res = auth_api_client.get(TASKS_URL, {'event_after': now,
+                                              'event_before': now})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'event_before' in res.data
+
+    def test_any_tags(self, auth_api_client, tagged_tasks):
+        """Test tasks having any of the tags are listed once."""
+        res = auth_api_client.get(TASKS_URL, {'tags': 'work,home'})
+
+        ids = [task['id'] for task in res.data['results']]
+        assert sorted(ids) == sorted(task.id for task in tagged_tasks[:3])
+
+    def test_all_tags(self, auth_api_client, tagged_tasks):
+        """Test tasks having all of the tags."""
+        ids = listed_ids(auth_api_client, tags='work,home', tags_match='all')
+
+        assert ids == {tagged_tasks[2].id}
+
+    def test_invalid_values_rejected(self, auth_api_client, user):
+        """Test invalid parameters are reported by name."""
+        res = auth_api_client.get(TASKS_URL, {'priority': '7',
+                                              'tags_match': 'some'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(res.data) == {'priority', 'tags_match'}
+
+    def test_combined_filters_query_budget(self, auth_api_client,
+                                           tagged_tasks):
+        """Test filters do not add queries to the listing."""
+        with assert_query_budget(views.TaskViewSet, 'list'):
+            res = auth_api_client.get(TASKS_URL, {
+                'tags': 'work', 'archived': 'false', 'priority': '0,1,2,3',
+                'ordering': '-updated_date'})
+
+        assert res.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestTaskOrdering:
+    """Test the task listing ordering parameter."""
+
+    @pytest.mark.parametrize('ordering', views.TaskViewSet.orderings)
+    def test_ordering_pages(self, auth_api_client, user, ordering):
+        """Test every ordering pages through tasks once in order."""
+        now = timezone.now()
+        for i in range(7):
+            task_factory.TaskFactory(
+                owner=user, priority=i % 2,
+                event_date=None if i % 3 else now + timezone.timedelta(i))
+
+        pages = collect_pages(
+            auth_api_client, f'{TASKS_URL}?ordering={ordering}&page_size=2')
+        ids = [task_id for page in pages for task_id in page]
+
+        field, _ = views.TaskViewSet.orderings[ordering]
+        name = field.lstrip('-')
+
+        def sort_key(task):
+            value = getattr(task, name)
+            return value is None, now if value is None else value, task.id
+
+        tasks = sorted(models.Task.objects.filter(owner=user), key=sort_key,
+                       reverse=field.startswith('-'))
+        assert ids == [task.id for task in tasks]
+
+    def test_previous_pages_with_nulls(self, auth_api_client, user):
+        """Test paging back over tasks without event dates."""
+        now = timezone.now()
+        for i in range(5):
+            task_factory.TaskFactory(
+                owner=user, event_date=None if i % 2 else now)
+        url = f'{TASKS_URL}?ordering=event_date&page_size=2'
+        forward = collect_pages(auth_api_client, url)
+        last = auth_api_client.get(url).json()
+        while last['next']:
+            last = auth_api_client.get(last['next']).json()
+
+        backward = collect_pages(auth_api_client, last['previous'],
+                                 direction='previous')
+
+        assert backward == forward[-2::-1]
+
+    def test_invalid_ordering_rejected(self, auth_api_client, user):
+        """Test unknown orderings are rejected."""
+        res = auth_api_client.get(TASKS_URL, {'ordering': 'label'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ordering' in res.data
+
+
+@pytest.mark.django_db
+class TestTagQuerysets:
+    """Test tag membership querysets."""
+
+    def test_get_tasks_by_tags_not_duplicated(self, user, tagged_tasks):
+        """Test tasks with several of the tags are returned once."""
+        tasks = models.Task.objects.get_tasks_by_tags(['work', 'home'])
+
+        assert sorted(task.id for task in tasks) == \
+            sorted(task.id for task in tagged_tasks[:3])
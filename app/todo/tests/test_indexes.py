@@ -0,0 +1,114 @@
+"""
+Todo query plan tests.
+"""
+import pytest
+
+from django.db import connection
+from django.utils import timezone
+
+from core.tests.factories.user_factory import UserFactory
+
+from .. import models
+from ..api import views
+from ..api.pagination import KeysetPagination
+
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Query plans are checked against PostgreSQL only.',
+)
+
+
+def owner_queryset(owner):
+    """Return owner tasks queryset."""
+    return models.Task.objects.get_owner_tasks(owner)
+
+
+MANAGER_QUERIES = {
+    'get_owner_tasks': owner_queryset,
+    'get_today_tasks': lambda o: owner_queryset(o).get_today_tasks(),
+    'get_archived_tasks': lambda o: owner_queryset(o).get_archived_tasks(),
+    'get_unarchived_tasks':
+        lambda o: owner_queryset(o).get_unarchived_tasks(),
+    'get_high_priority_tasks':
+        lambda o: owner_queryset(o).get_high_priority_tasks(),
+    'get_medium_priority_tasks':
+        lambda o: owner_queryset(o).get_medium_priority_tasks(),
+    'get_low_priority_tasks':
+        lambda o: owner_queryset(o).get_low_priority_tasks(),
+    'get_no_priority_tasks':
+        lambda o: owner_queryset(o).get_no_priority_tasks(),
+    'get_overdue_tasks': lambda o: owner_queryset(o).get_overdue_tasks(),
+    'get_tasks_by_tags':
+        lambda o: owner_queryset(o).get_tasks_by_tags(['tag1', 'tag2']),
+    'get_recently_updated_tasks':
+        lambda o: owner_queryset(o).get_recently_updated_tasks(),
+    'search': lambda o: owner_queryset(o).search('Task1'),
+    'with_any_tags':
+        lambda o: owner_queryset(o).with_any_tags(['tag1', 'tag2']),
+    'with_all_tags':
+        lambda o: owner_queryset(o).with_all_tags(['tag1', 'tag2']),
+    'get_event_date_range':
+        lambda o: owner_queryset(o).get_event_date_range(
+            timezone.now(), timezone.now() + timezone.timedelta(days=1)),
+    'get_recurring_tasks':
+        lambda o: owner_queryset(o).get_recurring_tasks(
+            timezone.now(), timezone.now() + timezone.timedelta(days=7)),
+    'get_days':
+        lambda o: owner_queryset(o).get_days(
+            timezone.localdate(),
+            timezone.localdate() + timezone.timedelta(days=7)),
+}
+
+
+@pytest.fixture
+def seeded_owner(db):
+    """Seed tasks for several owners and return one of them."""
+    now = timezone.now()
+    owners = UserFactory.create_batch(20)
+    models.Task.objects.bulk_create(
+        models.Task(
+            owner=owner,
+            label=f'Task{i}',
+            priority=i % 4,
+            is_archived=i % 5 == 0,
+            event_date=now + timezone.timedelta(hours=i - 100),
+        )
+        for owner in owners for i in range(200)
+    )
+    for owner in owners:
+        models.Tag.objects.create(owner=owner, name='tag1')
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return owners[0]
+
+
+@pytest.mark.parametrize('method', MANAGER_QUERIES)
+def test_manager_query_uses_index(seeded_owner, method):
+    """Test manager queries do not scan the whole task table."""
+    queryset = MANAGER_QUERIES[method](seeded_owner)
+
+    with connection.cursor() as cursor:
+        # Only discourages sequential scans, unindexed queries still use one.
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+
+    assert 'Seq Scan' not in plan, plan
+
+
+@pytest.mark.parametrize('ordering', views.TaskViewSet.orderings)
+def test_listing_ordering_uses_index(seeded_owner, ordering):
+    """Test listing orderings are read in index order without sorting."""
+    paginator = KeysetPagination()
+    paginator.ordering = views.TaskViewSet.orderings[ordering]
+    queryset = paginator.filter_page_queryset(
+        owner_queryset(seeded_owner), None)[:50]
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+
+    assert 'Seq Scan' not in plan, plan
+    assert 'Sort' not in plan, plan
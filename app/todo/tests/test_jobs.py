@@ -0,0 +1,101 @@
+"""
+Todo background job tests.
+"""
+import json
+
+import pytest
+
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from core.tests.factories.user_factory import UserFactory
+
+from .. import models
+from .factories import task_factory
+
+
+EXPORT_URL = reverse('task-export')
+
+
+@pytest.fixture(autouse=True)
+def files_dir(settings, tmp_path):
+    """Keep job files in a temporary directory."""
+    settings.JOB_FILES_DIR = str(tmp_path)
+    return tmp_path
+
+
+def run(kind, payload=None, owner=None):
+    """Queue and run a job, return it."""
+    job = jobs.enqueue(kind, payload, owner)
+    jobs.work('worker')
+    job.refresh_from_db()
+    assert job.status == Job.SUCCEEDED, job.error
+    return job
+
+
+@pytest.mark.django_db
+class TestTodoJobs:
+    """Test the todo job handlers."""
+
+    def test_export_matches_endpoint(self, auth_api_client, user):
+        """Test the export job writes the export of the endpoint."""
+        task = task_factory.TaskFactory(owner=user)
+        task.tags.set([models.Tag.objects.create(owner=user, name='work')])
+        task_factory.TaskFactory()
+
+        job = run('export', {'format': 'ndjson'}, user)
+        res = auth_api_client.get(EXPORT_URL)
+
+        with open(job.result['path'], 'rb') as file:
+            assert file.read() == b''.join(res.streaming_content)
+        assert job.result['format'] == 'ndjson'
+
+    def test_export_replaces_file(self, files_dir, user):
+        """Test repeated exports replace the file leaving nothing behind.
+        """
+        task_factory.TaskFactory(owner=user)
+        job = run('export', {'format': 'csv'}, user)
+        models.Task.objects.all().delete()
+        jobs.KINDS['export'].handler(job)
+
+        assert [path.name for path in files_dir.iterdir()] == \
+            [f'job-{job.id}-tasks.csv']
+        with open(job.result['path']) as file:
+            assert len(file.readlines()) == 1
+
+    def test_import_for_owner_only(self, tmp_path, user):
+        """Test imports load every row for the job owner."""
+        other = UserFactory()
+        path = tmp_path / 'upload.ndjson'
+        path.write_text(''.join(json.dumps(row) + '\n' for row in [
+            {'label': 'Own', 'priority': 1},
+            {'label': 'Other', 'priority': 1, 'owner': other.email},
+            {'label': 'Invalid', 'priority': 9},
+        ]))
+
+        job = run('import', {'file': str(path)}, user)
+
+        assert job.result == {'imported': 2, 'skipped': 1}
+        assert set(models.Task.objects.values_list('owner', flat=True)) == \
+            {user.id}
+
+    def test_bulk_archive(self, user):
+        """Test only tasks of the job owner are archived."""
+        own = task_factory.TaskFactory(owner=user)
+        other = task_factory.TaskFactory()
+
+        job = run('bulk_archive', {'ids': [own.id, other.id]}, user)
+
+        assert job.result == {'ids': [own.id]}
+        assert list(models.Task.objects.filter(is_archived=True)) == [own]
+
+    def test_rebuild_task_stats(self, user):
+        """Test task stats drift is fixed."""
+        task_factory.TaskFactory(owner=user)
+        models.TaskStats.objects.filter(owner=user).update(total=5)
+
+        job = run('rebuild_task_stats')
+
+        assert 'Fixed task stats of 1' in job.result['output']
+        assert models.TaskStats.objects.get(owner=user).total == 1
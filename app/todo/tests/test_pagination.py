@@ -0,0 +1,108 @@
+"""
+Todo API pagination tests.
+"""
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_URL = reverse('task-list')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+TAGS_URL = reverse('tag-list')
+
+
+def collect_pages(client, url, direction='next'):
+    """Follow pagination links and return ids of every page."""
+    pages = []
+    while url:
+        res = client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        pages.append([item['id'] for item in res.data['results']])
+        url = res.data[direction]
+
+    return pages
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """Keyset pagination tests."""
+
+    def test_pages_cover_all_tasks_in_order(self, auth_api_client, user):
+        """Test walking pages returns every task once, newest first."""
+        tasks = task_factory.TaskFactory.create_batch(7, owner=user)
+        # Ties on created_date must be resolved by id.
+        models.Task.objects.filter(id__in=[t.id for t in tasks[2:5]]) \
+            .update(created_date=tasks[2].created_date)
+        expected = list(models.Task.objects.order_by(
+            '-created_date', '-id').values_list('id', flat=True))
+
+        pages = collect_pages(auth_api_client, f'{TASKS_URL}?page_size=3')
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert sum(pages, []) == expected
+
+    def test_previous_link(self, auth_api_client, user):
+        """Test previous links walk back to the first page."""
+        task_factory.TaskFactory.create_batch(5, owner=user)
+        first = auth_api_client.get(f'{TASKS_URL}?page_size=2')
+        second = auth_api_client.get(first.data['next'])
+
+        res = auth_api_client.get(second.data['previous'])
+
+        assert res.data['results'] == first.data['results']
+        assert res.data['previous'] is None
+        assert res.data['next'] == first.data['next']
+
+    def test_page_query_count_does_not_depend_on_depth(
+            self, auth_api_client, user):
+        """Test deep pages run the same queries without COUNT."""
+        task_factory.TaskFactory.create_batch(10, owner=user)
+        url = f'{TASKS_URL}?page_size=2'
+
+        while url:
+            with assert_query_budget(views.TaskViewSet, 'list') as queries:
+                res = auth_api_client.get(url)
+
+            assert not any('COUNT(*)' in sql for sql in queries.queries)
+            url = res.data['next']
+
+    def test_invalid_cursor(self, auth_api_client):
+        """Test invalid cursor returns not found."""
+        res = auth_api_client.get(f'{TASKS_URL}?cursor=invalid')
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_archived_tasks_paginated(self, auth_api_client, user):
+        """Test archived action is paginated."""
+        task_factory.ArchivedTaskFactory.create_batch(
+            3, owner=user, archived_date=timezone.now())
+        task_factory.TaskFactory(owner=user)
+
+        pages = collect_pages(
+            auth_api_client, f'{TASKS_ARCHIVED_URL}?page_size=2')
+
+        assert [len(page) for page in pages] == [2, 1]
+
+    def test_tags_paginated_by_name(self, auth_api_client, user):
+        """Test tags are paginated in name order."""
+        for name in ['delta', 'alpha', 'charlie', 'bravo']:
+            tag_factory.TagFactory(owner=user, name=name)
+
+        res = auth_api_client.get(f'{TAGS_URL}?page_size=3')
+        res_next = auth_api_client.get(res.data['next'])
+
+        names = [tag['name'] for tag in res.data['results']]
+        assert names == ['alpha', 'bravo', 'charlie']
+        assert [tag['name'] for tag in res_next.data['results']] == ['delta']
+        assert res_next.data['next'] is None
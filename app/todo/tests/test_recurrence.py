@@ -0,0 +1,324 @@
+"""
+Todo recurring task tests.
+"""
+import datetime
+import zoneinfo
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import (
+    models,
+    recurrence,
+)
+from ..api import views
+from .factories import task_factory
+from .test_calendar import set_timezone
+
+
+TASKS_URL = reverse('task-list')
+TASKS_TODAY_URL = reverse('task-today-tasks')
+TASKS_CALENDAR_URL = reverse('task-calendar')
+UTC = datetime.timezone.utc
+PRAGUE = zoneinfo.ZoneInfo('Europe/Prague')
+
+
+def utc(*args):
+    """Return aware UTC datetime."""
+    return datetime.datetime(*args, tzinfo=UTC)
+
+
+def occurrences(first, frequency, interval=1, until=None,
+                start=utc(2000, 1, 1), end=utc(2100, 1, 1), tz=UTC):
+    """Return occurrence dates of a rule in [start, end)."""
+    return list(recurrence.iter_occurrences(
+        first, frequency, interval, until, start, end, tz))
+
+
+def occurrence_url(task_id):
+    """Return url recording occurrences of a task."""
+    return reverse('task-occurrence', args=[task_id])
+
+
+def calendar_tasks(client, start, end):
+    """Return (date, event date, id, completed) of calendar tasks."""
+    res = client.get(TASKS_CALENDAR_URL, {'start': start, 'end': end})
+    assert res.status_code == status.HTTP_200_OK
+    return [(day['date'], task['event_date'], task['id'],
+             task.get('is_completed'))
+            for day in res.json()['days'] for task in day['tasks']]
+
+
+class TestIterOccurrences:
+    """Test generating occurrences of a recurrence rule."""
+
+    def test_daily_interval(self):
+        """Test daily rules repeat every interval days within the window."""
+        dates = occurrences(utc(2024, 1, 1, 9), recurrence.DAILY, 2,
+                            start=utc(2024, 1, 4), end=utc(2024, 1, 10))
+
+        assert dates == [utc(2024, 1, 5, 9), utc(2024, 1, 7, 9),
+                         utc(2024, 1, 9, 9)]
+
+    def test_weekly_until(self):
+        """Test occurrences stop before the recurrence end."""
+        dates = occurrences(utc(2024, 1, 1, 9), recurrence.WEEKLY,
+                            until=utc(2024, 1, 22, 9))
+
+        assert dates == [utc(2024, 1, 1, 9), utc(2024, 1, 8, 9),
+                         utc(2024, 1, 15, 9)]
+
+    def test_monthly_clamps_day(self):
+        """Test monthly rules of the 31st fall on shorter months end."""
+        dates = occurrences(utc(2024, 1, 31, 9), recurrence.MONTHLY,
+                            end=utc(2024, 5, 1))
+
+        assert [date.date() for date in dates] == [
+            datetime.date(2024, 1, 31), datetime.date(2024, 2, 29),
+            datetime.date(2024, 3, 31), datetime.date(2024, 4, 30)]
+
+    def test_keeps_wall_clock_across_dst(self):
+        """Test occurrences keep their local time across daylight saving."""
+        first = datetime.datetime(2024, 3, 30, 9, tzinfo=PRAGUE)
+
+        dates = occurrences(first, recurrence.DAILY, end=utc(2024, 4, 1),
+                            tz=PRAGUE)
+
+        assert dates == [utc(2024, 3, 30, 8), utc(2024, 3, 31, 7)]
+
+    def test_skips_to_window(self):
+        """Test windows far from the first occurrence are reached at once."""
+        start = utc(2024, 6, 1)
+
+        dates = occurrences(utc(1970, 1, 1, 9), recurrence.MONTHLY, 5,
+                            start=start, end=utc(2025, 6, 1))
+
+        assert dates == [utc(2024, 8, 1, 9), utc(2025, 1, 1, 9)]
+
+    def test_expand_orders_and_skips(self):
+        """Test expanded rules are merged in date order without skipped."""
+        rules = [
+            {'id': 1, 'event_date': utc(2024, 1, 1, 10),
+             'recurrence': recurrence.DAILY, 'recurrence_interval': 1,
+             'recurrence_end': None},
+            {'id': 2, 'event_date': utc(2024, 1, 1, 9),
+             'recurrence': recurrence.DAILY, 'recurrence_interval': 1,
+             'recurrence_end': None},
+        ]
+        states = {(1, utc(2024, 1, 1, 10)): recurrence.COMPLETED,
+                  (2, utc(2024, 1, 2, 9)): recurrence.SKIPPED}
+
+        expanded = list(recurrence.expand(
+            rules, states, utc(2024, 1, 1), utc(2024, 1, 3), UTC))
+
+        assert expanded == [
+            recurrence.Occurrence(2, utc(2024, 1, 1, 9), None),
+            recurrence.Occurrence(1, utc(2024, 1, 1, 10),
+                                  recurrence.COMPLETED),
+            recurrence.Occurrence(1, utc(2024, 1, 2, 10), None),
+        ]
+
+
+@pytest.mark.django_db
+class TestRecurringTasks:
+    """Test recurring task queries."""
+
+    def test_get_occurrences(self, user):
+        """Test occurrences are read in two queries whatever their number."""
+        task_factory.TaskFactory.create_batch(
+            3, owner=user, event_date=utc(2024, 1, 1, 9),
+            recurrence=recurrence.DAILY)
+        task_factory.TaskFactory(owner=user, event_date=utc(2024, 1, 1, 9))
+        task_factory.TaskFactory(
+            owner=user, event_date=utc(2024, 1, 1, 9),
+            recurrence=recurrence.DAILY, recurrence_end=utc(2024, 1, 5))
+
+        with CaptureQueriesContext(connection) as queries:
+            expanded = list(models.Task.objects.get_owner_tasks(user)
+                            .get_occurrences(utc(2024, 1, 10),
+                                             utc(2024, 1, 20), UTC))
+
+        assert len(queries) == 2
+        assert len(expanded) == 30
+
+    def test_recurring_tasks_stay_in_task_table(self, user):
+        """Test recurring tasks are not moved to the archive table."""
+        task = task_factory.ArchivedTaskFactory(
+            owner=user, event_date=utc(2024, 1, 1),
+            recurrence=recurrence.WEEKLY)
+
+        moved = models.ArchivedTask.objects.move(models.Task.objects.all())
+
+        assert moved == 0
+        assert models.Task.objects.filter(id=task.id).exists()
+
+
+@pytest.mark.django_db
+class TestRecurringTasksAPI:
+    """Test recurring tasks in the task API."""
+
+    def test_create_recurring_task(self, auth_api_client, user):
+        """Test creating a task repeating every two weeks."""
+        payload = {'label': 'Bins', 'priority': 1,
+                   'event_date': '2024-01-01T09:00:00Z',
+                   'recurrence': 'weekly', 'recurrence_interval': 2}
+
+        res = auth_api_client.post(TASKS_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        task = models.Task.objects.get(id=res.data['id'])
+        assert (task.recurrence, task.recurrence_interval) == \
+            (recurrence.WEEKLY, 2)
+
+    @pytest.mark.parametrize('payload, field', [
+        ({'recurrence': 'daily'}, 'event_date'),
+        ({'recurrence': 'daily', 'event_date': '2024-01-02T00:00:00Z',
+          'recurrence_end': '2024-01-01T00:00:00Z'}, 'recurrence_end'),
+        ({'recurrence': 'daily', 'event_date': '2024-01-02T00:00:00Z',
+          'recurrence_interval': 0}, 'recurrence_interval'),
+        ({'recurrence': 'yearly'}, 'recurrence'),
+    ])
+    def test_invalid_recurrence_rejected(self, auth_api_client, user,
+                                         payload, field):
+        """Test recurrences need an event date, a later end and a period."""
+        res = auth_api_client.post(
+            TASKS_URL, {'label': 'Task', 'priority': 1, **payload},
+            format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert field in res.data
+
+    def test_calendar_expands_occurrences(self, auth_api_client, user):
+        """Test recurring tasks are listed at each occurrence."""
+        set_timezone(user, 'Europe/Prague')
+        first = datetime.datetime(2024, 3, 29, 9, tzinfo=PRAGUE)
+        daily = task_factory.TaskFactory(
+            owner=user, event_date=first, recurrence=recurrence.DAILY)
+        one_off = task_factory.TaskFactory(
+            owner=user, event_date=first + datetime.timedelta(days=1, hours=2))
+        weekly = task_factory.TaskFactory(
+            owner=user, event_date=first - datetime.timedelta(days=6),
+            recurrence=recurrence.WEEKLY)
+
+        with assert_query_budget(views.TaskViewSet, 'calendar'):
+            tasks = calendar_tasks(auth_api_client, '2024-03-30',
+                                   '2024-04-01')
+
+        assert tasks == [
+            ('2024-03-30', '2024-03-30 08:00:00', daily.id, False),
+            ('2024-03-30', '2024-03-30 08:00:00', weekly.id, False),
+            ('2024-03-30', '2024-03-30 10:00:00', one_off.id, None),
+            ('2024-03-31', '2024-03-31 07:00:00', daily.id, False),
+        ]
+
+    def test_today_lists_occurrence(self, auth_api_client, user):
+        """Test recurring tasks occurring today are listed at that time."""
+        now = timezone.now()
+        task = task_factory.TaskFactory(
+            owner=user, event_date=now - datetime.timedelta(days=3),
+            recurrence=recurrence.DAILY)
+        task_factory.TaskFactory(
+            owner=user, event_date=now - datetime.timedelta(days=3),
+            recurrence=recurrence.WEEKLY)
+
+        with assert_query_budget(views.TaskViewSet, 'today_tasks'):
+            res = auth_api_client.get(TASKS_TODAY_URL)
+
+        item, = res.json()['results']
+        assert item['id'] == task.id
+        assert item['event_date'] == \
+            views.serializers.TaskSerializer().fields['event_date'] \
+            .to_representation(now)
+        assert not item['is_completed']
+
+    def test_async_today_lists_occurrence(self, auth_api_client, user):
+        """Test async today listings expand recurring tasks too."""
+        task = task_factory.TaskFactory(
+            owner=user, event_date=timezone.now() - datetime.timedelta(days=7),
+            recurrence=recurrence.WEEKLY)
+
+        res = auth_api_client.get(reverse('async-task-today-tasks'))
+
+        assert [item['id'] for item in res.json()['results']] == [task.id]
+
+    @pytest.mark.parametrize('url', [TASKS_TODAY_URL,
+                                     reverse('async-task-today-tasks')])
+    def test_today_skips_archived_recurring(self, auth_api_client, user,
+                                            url):
+        """Test archived recurring tasks are not listed today."""
+        task_factory.ArchivedTaskFactory(
+            owner=user, event_date=timezone.now() - datetime.timedelta(days=1),
+            recurrence=recurrence.DAILY)
+
+        res = auth_api_client.get(url)
+
+        assert res.json()['results'] == []
+
+    def test_complete_skip_and_reschedule(self, auth_api_client, user):
+        """Test recording occurrence states, and only those."""
+        task = task_factory.TaskFactory(
+            owner=user, event_date=utc(2024, 1, 1, 9),
+            recurrence=recurrence.DAILY)
+        seq = task.sync_seq
+
+        def record(day, state):
+            return auth_api_client.post(
+                occurrence_url(task.id),
+                {'original_date': f'2024-01-0{day}T09:00:00Z',
+                 'state': state}, format='json')
+
+        with assert_query_budget(views.TaskViewSet, 'occurrence'):
+            res = record(2, 'completed')
+        record(3, 'skipped')
+        record(4, 'skipped')
+        record(4, 'scheduled')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert calendar_tasks(auth_api_client, '2024-01-02', '2024-01-05') \
+            == [('2024-01-02', '2024-01-02 09:00:00', task.id, True),
+                ('2024-01-04', '2024-01-04 09:00:00', task.id, False)]
+        assert models.TaskOccurrence.objects.filter(task=task).count() == 2
+        task.refresh_from_db()
+        assert task.sync_seq > seq
+
+    def test_record_invalid_occurrence(self, auth_api_client, user):
+        """Test dates the task does not occur at are rejected."""
+        recurring = task_factory.TaskFactory(
+            owner=user, event_date=utc(2024, 1, 1, 9),
+            recurrence=recurrence.WEEKLY)
+        one_off = task_factory.TaskFactory(
+            owner=user, event_date=utc(2024, 1, 1, 9))
+
+        for task, date in ((recurring, '2024-01-02T09:00:00Z'),
+                           (recurring, '2023-12-25T09:00:00Z'),
+                           (one_off, '2024-01-01T09:00:00Z')):
+            res = auth_api_client.post(
+                occurrence_url(task.id),
+                {'original_date': date, 'state': 'completed'}, format='json')
+
+            assert res.status_code == status.HTTP_400_BAD_REQUEST
+            assert 'original_date' in res.data
+        assert not models.TaskOccurrence.objects.exists()
+
+    def test_destroy_deletes_occurrences(self, auth_api_client, user):
+        """Test recorded occurrences go with their task."""
+        task = task_factory.TaskFactory(
+            owner=user, event_date=utc(2024, 1, 1, 9),
+            recurrence=recurrence.DAILY)
+        models.TaskOccurrence.objects.create(
+            task=task, original_date=task.event_date,
+            state=recurrence.COMPLETED)
+
+        with assert_query_budget(views.TaskViewSet, 'destroy'):
+            res = auth_api_client.delete(
+                reverse('task-detail', args=[task.id]))
+
+        assert res.status_code == status.HTTP_204_NO_CONTENT
+        assert not models.TaskOccurrence.objects.exists()
@@ -0,0 +1,306 @@
+"""
+Todo task reminder tests.
+"""
+import datetime
+import json
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import (
+    models,
+    recurrence,
+    reminders,
+)
+from .factories import task_factory
+
+
+LEAD = datetime.timedelta(minutes=15)
+HORIZON = datetime.timedelta(hours=1)
+MINUTE = datetime.timedelta(minutes=1)
+
+
+class ListSink:
+    """Sink keeping delivered reminders in a list."""
+
+    def __init__(self):
+        self.reminders = []
+
+    def deliver(self, reminders):
+        self.reminders.extend(reminders)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sink():
+    return ListSink()
+
+
+@pytest.fixture
+def now():
+    return timezone.now().replace(microsecond=0)
+
+
+def get_scheduler(sink, now, **kwargs):
+    """Return a reminder scheduler started at now."""
+    scheduler = reminders.ReminderScheduler(sink, LEAD, HORIZON, **kwargs)
+    scheduler.start(now)
+    return scheduler
+
+
+def delivered(sink):
+    """Return (task id, event date) of reminders delivered to sink."""
+    return [(reminder.task_id, reminder.event_date)
+            for reminder in sink.reminders]
+
+
+@pytest.mark.django_db
+class TestReminderScheduler:
+    """Test scheduling and delivery of reminders."""
+
+    def test_fired_at_due_time(self, sink, now, user):
+        """Test reminders fire a lead before their event only."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 30 * MINUTE)
+        task_factory.ArchivedTaskFactory(owner=user,
+                                         event_date=now + 30 * MINUTE)
+        task_factory.TaskFactory(owner=user, event_date=now - MINUTE)
+        task_factory.TaskFactory(owner=user)
+        scheduler = get_scheduler(sink, now)
+
+        assert scheduler.tick(now + 14 * MINUTE) == 0
+        assert scheduler.get_next_due() == now + 15 * MINUTE
+        assert scheduler.tick(now + 15 * MINUTE) == 1
+        assert scheduler.tick(now + 16 * MINUTE) == 0
+        reminder, = sink.reminders
+        assert (reminder.task_id, reminder.owner_id, reminder.label,
+                reminder.event_date) == \
+            (task.id, user.id, task.label, task.event_date)
+        assert scheduler.metrics.delivered == 1
+        assert scheduler.metrics.pending == 0
+
+    def test_horizon_extended(self, sink, now, user):
+        """Test events past the horizon are loaded as time passes."""
+        later = task_factory.TaskFactory(owner=user,
+                                         event_date=now + 3 * HORIZON)
+        scheduler = get_scheduler(sink, now, batch_size=2)
+        assert scheduler.metrics.pending == 0
+
+        scheduler.tick(now + 2 * HORIZON)
+        assert scheduler.metrics.pending == 0
+        scheduler.tick(now + 2 * HORIZON + HORIZON / 2)
+
+        assert scheduler.metrics.pending == 1
+        scheduler.tick(later.event_date - LEAD)
+        assert delivered(sink) == [(later.id, later.event_date)]
+
+    def test_loaded_by_pages(self, sink, now, user):
+        """Test tasks sharing an event date are all loaded across pages."""
+        tasks = task_factory.TaskFactory.create_batch(
+            5, owner=user, event_date=now + 20 * MINUTE)
+        scheduler = get_scheduler(sink, now, batch_size=2)
+
+        scheduler.tick(now + 5 * MINUTE)
+
+        assert sorted(task_id for task_id, date in delivered(sink)) == \
+            [task.id for task in tasks]
+
+    def test_edit_moves_reminder(self, sink, now, user):
+        """Test an event date edit reschedules the reminder."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 30 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+
+        task.event_date = now + 50 * MINUTE
+        task.save()
+        scheduler.tick(now + 20 * MINUTE)
+
+        assert sink.reminders == []
+        scheduler.tick(now + 35 * MINUTE)
+        assert delivered(sink) == [(task.id, now + 50 * MINUTE)]
+
+    def test_edit_inside_lead_fires_at_once(self, sink, now, user):
+        """Test tasks moved inside the lead are reminded at once."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 50 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+
+        task.event_date = now + 5 * MINUTE
+        task.save()
+        scheduler.tick(now)
+
+        assert delivered(sink) == [(task.id, now + 5 * MINUTE)]
+
+    def test_fired_not_repeated_on_edit(self, sink, now, user):
+        """Test edits of a reminded task do not repeat its reminder."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 20 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+        scheduler.tick(now + 5 * MINUTE)
+
+        task.label = 'Renamed'
+        task.save()
+        scheduler.tick(now + 6 * MINUTE)
+
+        assert delivered(sink) == [(task.id, task.event_date)]
+
+    def test_archive_and_delete_cancel(self, sink, now, user):
+        """Test archived and deleted tasks are not reminded."""
+        archived, deleted = task_factory.TaskFactory.create_batch(
+            2, owner=user, event_date=now + 30 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+
+        archived.archive()
+        deleted.delete()
+        scheduler.tick(now + 20 * MINUTE)
+
+        assert sink.reminders == []
+        assert scheduler.metrics.pending == 0
+
+    def test_gone_tasks_dropped_at_fire(self, sink, now, user):
+        """Test tasks deleted without a tombstone are not reminded."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 20 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+        user.delete()
+
+        assert scheduler.fire(now + 5 * MINUTE) == 0
+        assert task.id not in [reminder.task_id
+                               for reminder in sink.reminders]
+
+    def test_tick_does_not_rescan(self, sink, now, user):
+        """Test ticks read changes and newly reached events only."""
+        task_factory.TaskFactory.create_batch(3, owner=user,
+                                              event_date=now + 50 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+        scheduler.polled = timezone.now() + scheduler.overlap
+
+        with CaptureQueriesContext(connection) as queries:
+            scheduler.tick(now)
+            scheduler.tick(now + MINUTE)
+        with CaptureQueriesContext(connection) as later:
+            scheduler.tick(now + HORIZON / 2)
+
+        sqls = [query['sql'] for query in queries]
+        assert len(sqls) == 4
+        assert '"updated_date" >=' in sqls[0]
+        assert 'todo_tombstone' in sqls[1]
+        # Once half the horizon is left the next one is read, once.
+        one_off, rules = [query['sql'] for query in later][2:]
+        assert '"todo_task"."event_date" >= ' in one_off
+        assert '"todo_task"."event_date" < ' in one_off
+        assert "NOT (\"todo_task\".\"recurrence\" = ''" in rules
+        assert scheduler.loaded_until == now + 2 * HORIZON
+
+    def test_pending_counted(self, sink, now, user):
+        """Test pending reminders are counted and fired ones forgotten."""
+        tasks = task_factory.TaskFactory.create_batch(
+            3, owner=user, event_date=now + 20 * MINUTE)
+        scheduler = get_scheduler(sink, now)
+        assert scheduler.metrics.pending == 3
+
+        tasks[0].delete()
+        scheduler.tick(now + 5 * MINUTE)
+
+        assert scheduler.metrics.pending == 0
+        assert len(scheduler.fired) == 2
+        scheduler.tick(now + 21 * MINUTE)
+        assert scheduler.fired == set() and scheduler.fired_heap == []
+
+    def test_recurring_occurrences(self, sink, now, user):
+        """Test occurrences are reminded unless completed or skipped."""
+        task = task_factory.TaskFactory(
+            owner=user, event_date=now + 20 * MINUTE,
+            recurrence=recurrence.DAILY)
+        next_date = task.event_date + datetime.timedelta(days=1)
+        models.TaskOccurrence.objects.create(
+            task=task, original_date=next_date, state=recurrence.SKIPPED)
+        scheduler = get_scheduler(sink, now)
+
+        scheduler.tick(now + 5 * MINUTE)
+        scheduler.tick(next_date - LEAD)
+        scheduler.tick(next_date + datetime.timedelta(days=1) - LEAD)
+
+        assert delivered(sink) == [
+            (task.id, task.event_date),
+            (task.id, next_date + datetime.timedelta(days=1)),
+        ]
+
+    def test_stale_entries_compacted(self, sink, now, user):
+        """Test rescheduled reminders do not pile up in the heap."""
+        task = task_factory.TaskFactory(owner=user,
+                                        event_date=now + 40 * MINUTE)
+        scheduler = get_scheduler(sink, now, batch_size=1)
+
+        for minutes in range(10):
+            task.event_date = now + (40 + minutes) * MINUTE
+            task.save()
+            scheduler.tick(now)
+
+        assert len(scheduler.heap) <= 3
+        assert scheduler.metrics.pending == 1
+
+
+class TestSinksAndMetrics:
+    """Test reminder sinks and metrics."""
+
+    def test_file_sink(self, tmp_path, now):
+        """Test the file sink appends JSON lines."""
+        path = tmp_path / 'reminders.jsonl'
+        sink = reminders.get_sink('file', path=path)
+        sink.deliver([reminders.Reminder(1, 2, 'Task', now, now - LEAD)])
+        sink.close()
+
+        line, = path.read_text().splitlines()
+        assert json.loads(line) == {
+            'task_id': 1, 'owner_id': 2, 'label': 'Task',
+            'event_date': now.isoformat(),
+            'due': (now - LEAD).isoformat(),
+        }
+
+    def test_sink_by_path(self):
+        """Test sinks are found by dotted path."""
+        sink = reminders.get_sink('todo.reminders.LogSink')
+
+        assert isinstance(sink, reminders.LogSink)
+
+    def test_metrics_rendered(self, tmp_path):
+        """Test lag quantiles are exported in the Prometheus format."""
+        metrics = reminders.ReminderMetrics()
+        metrics.observe([float(lag) for lag in range(1, 101)])
+        path = tmp_path / 'reminders.prom'
+
+        metrics.export(path)
+
+        lines = path.read_text().splitlines()
+        assert 'todo_reminders_delivered_total 100' in lines
+        assert 'todo_reminders_lag_seconds{quantile="0.5"} 51.000000' in lines
+        assert 'todo_reminders_lag_seconds{quantile="1.0"} 100.000000' \
+            in lines
+        assert 'todo_reminders_lag_seconds_sum 5050.000000' in lines
+
+
+@pytest.mark.django_db
+class TestRunRemindersCommand:
+    """Test the run_reminders command."""
+
+    def test_delivers_to_file(self, tmp_path, user, capsys):
+        """Test due reminders are delivered and metrics written."""
+        task = task_factory.TaskFactory(
+            owner=user, event_date=timezone.now() + 5 * MINUTE)
+        path = tmp_path / 'reminders.jsonl'
+        metrics = tmp_path / 'reminders.prom'
+
+        call_command('run_reminders', sink='file', sink_path=path,
+                     metrics_file=metrics, run_for=0.01)
+
+        line, = path.read_text().splitlines()
+        assert json.loads(line)['task_id'] == task.id
+        assert 'todo_reminders_delivered_total 1' in metrics.read_text()
+        assert 'Delivered 1 reminders' in capsys.readouterr().out
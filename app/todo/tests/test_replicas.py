@@ -0,0 +1,143 @@
+"""
+Todo API read replica tests.
+"""
+import pytest
+
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+from rest_framework import status
+
+from todo import models
+from .factories import task_factory
+
+
+REPLICA = 'replica'
+TASKS_URL = reverse('task-list')
+ME_URL = reverse('me')
+PAYLOAD = {'label': 'Written', 'priority': 1}
+
+
+def replicate(*objects):
+    """Copy objects from the primary to the replica."""
+    for obj in objects:
+        type(obj).objects.using(REPLICA).bulk_create([obj])
+
+
+def task_ids(res):
+    """Return ids of a task listing response."""
+    return [task['id'] for task in res.data['results']]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def replica_database(tmp_path_factory, django_db_setup, django_db_blocker):
+    """Create a migrated SQLite database standing in for a replica."""
+    connections.settings[REPLICA] = {
+        **connections.settings['default'],
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path_factory.mktemp('replica') / 'db.sqlite3'),
+        'OPTIONS': {},
+    }
+    with django_db_blocker.unblock():
+        call_command('migrate', database=REPLICA, verbosity=0)
+    yield
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+@pytest.fixture
+def replica(settings, user):
+    """Route reads to the replica holding a copy of the user."""
+    settings.DATABASE_REPLICAS = [REPLICA]
+    replicate(user)
+
+
+@pytest.mark.django_db(databases=['default', REPLICA])
+class TestReplicaReads:
+    """Test safe requests of the todo API read replicas."""
+
+    def test_listing_read_from_replica(self, auth_api_client, user, replica):
+        """Test listings are read from the replica."""
+        task_factory.TaskFactory(owner=user)
+        replicated = task_factory.TaskFactory(owner=user)
+        replicate(replicated)
+
+        res = auth_api_client.get(TASKS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert task_ids(res) == [replicated.id]
+
+    def test_detail_read_from_replica(self, auth_api_client, user, replica):
+        """Test details missing on the replica are not found."""
+        task = task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.get(reverse('task-detail', args=[task.id]))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_async_listing_read_from_replica(self, auth_api_client, user,
+                                             replica):
+        """Test async listings are read from the replica."""
+        task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.get(reverse('async-task-list'))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()['results'] == []
+
+    def test_writes_go_to_primary(self, auth_api_client, user, replica):
+        """Test unsafe requests write the primary only."""
+        res = auth_api_client.post(TASKS_URL, PAYLOAD)
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert models.Task.objects.using('default') \
+            .filter(id=res.data['id']).exists()
+        assert not models.Task.objects.using(REPLICA).exists()
+
+    def test_reads_own_writes(self, auth_api_client, user, replica):
+        """Test reads after a write are served by the primary."""
+        created = auth_api_client.post(TASKS_URL, PAYLOAD)
+
+        res = auth_api_client.get(TASKS_URL)
+
+        assert task_ids(res) == [created.data['id']]
+
+    def test_pin_expires(self, auth_api_client, user, replica, settings):
+        """Test reads return to the replica after the pin window."""
+        settings.REPLICA_PIN_SECONDS = 0
+        auth_api_client.post(TASKS_URL, PAYLOAD)
+
+        res = auth_api_client.get(TASKS_URL)
+
+        assert task_ids(res) == []
+
+    def test_failed_write_does_not_pin(self, auth_api_client, user, replica):
+        """Test rejected writes keep reads on the replica."""
+        task_factory.TaskFactory(owner=user)
+        auth_api_client.post(TASKS_URL, {'label': 'Invalid'})
+
+        res = auth_api_client.get(TASKS_URL)
+
+        assert task_ids(res) == []
+
+    def test_pin_per_user(self, auth_api_client, user, replica):
+        """Test writes of other users do not pin reads."""
+        other = task_factory.TaskFactory().owner
+        auth_api_client.force_authenticate(other)
+        auth_api_client.post(TASKS_URL, PAYLOAD)
+        auth_api_client.force_authenticate(user)
+        task_factory.TaskFactory(owner=user)
+
+        res = auth_api_client.get(TASKS_URL)
+
+        assert task_ids(res) == []
+
+    def test_other_reads_use_primary(self, auth_api_client, user, replica):
+        """Test reads outside replica enabled views use the primary."""
+        auth_api_client.get(TASKS_URL)
+
+        res = auth_api_client.get(ME_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert models.Task.objects.all().db == 'default'
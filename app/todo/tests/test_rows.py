@@ -0,0 +1,132 @@
+"""
+Todo API row serializers parity tests.
+"""
+import pytest
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from .. import models
+from ..api import serializers
+from ..api.rows import get_task_row_serializer
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+TASKS_URL = reverse('task-list')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+
+SERIALIZER_CLASSES = [
+    serializers.TaskSerializer,
+    serializers.TaskDetailSerializer,
+]
+TIMEZONES = ['UTC', 'Europe/Warsaw', 'America/St_Johns']
+
+
+def create_varied_tasks(owner):
+    """Create tasks covering every representation edge case."""
+    event_date = datetime(2023, 3, 26, 1, 30, 15, 123456,
+                          tzinfo=ZoneInfo('UTC'))
+    tags = [tag_factory.TagFactory(owner=owner, name=name)
+            for name in ('zeta', 'alpha', 'żółw', 'a"b\\c')]
+
+    tasks = [
+        task_factory.TaskFactory(owner=owner, event_date=None),
+        task_factory.TaskFactory(owner=owner, event_date=event_date,
+                                 label='Zażółć "gęślą" </script>',
+                                 description='line\nbreak\ttab'),
+        task_factory.ArchivedTaskFactory(
+            owner=owner, event_date=event_date, priority=0,
+            archived_date=timezone.now()),
+        task_factory.TaskFactory(owner=owner, description=''),
+    ]
+    tasks[1].tags.set(tags)
+    tasks[2].tags.set(tags[2:0:-1])
+    tasks[3].tags.set(tags[:1])
+    task_factory.TaskFactory().tags.set(
+        [tag_factory.TagFactory(name='other')])
+
+    return tasks
+
+
+def render(data):
+    """Return data rendered to JSON bytes."""
+    return JSONRenderer().render(data)
+
+
+def serialize(serializer_class, queryset):
+    """Return queryset serialized by DRF and by the row serializer."""
+    expected = serializer_class(queryset.with_tags(), many=True).data
+    row_serializer = get_task_row_serializer(serializer_class)
+    actual = row_serializer.to_representation(
+        row_serializer.get_rows(queryset))
+
+    return render(expected), render(actual)
+
+
+@pytest.mark.django_db
+class TestTaskRowSerializer:
+    """Test row serializers output matches the DRF serializers."""
+
+    @pytest.mark.parametrize('serializer_class', SERIALIZER_CLASSES)
+    @pytest.mark.parametrize('tz', TIMEZONES)
+    def test_parity(self, user, serializer_class, tz):
+        """Test rows render byte-identical JSON in the active timezone."""
+        create_varied_tasks(user)
+        queryset = models.Task.objects.get_owner_tasks(user) \
+            .order_by('-created_date', '-id')
+
+        with timezone.override(tz):
+            expected, actual = serialize(serializer_class, queryset)
+
+        assert actual == expected
+
+    @pytest.mark.parametrize('serializer_class', SERIALIZER_CLASSES)
+    @pytest.mark.parametrize('datetime_format', ['iso-8601', '%d.%m.%Y %H'])
+    def test_parity_datetime_format(self, user, settings, serializer_class,
+                                    datetime_format):
+        """Test rows follow the configured datetime format."""
+        create_varied_tasks(user)
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                                   'DATETIME_FORMAT': datetime_format}
+        queryset = models.Task.objects.get_owner_tasks(user) \
+            .order_by('-created_date', '-id')
+
+        expected, actual = serialize(serializer_class, queryset)
+
+        assert actual == expected
+
+    def test_no_rows(self, user):
+        """Test an empty listing needs no tag query."""
+        queryset = models.Task.objects.get_owner_tasks(user)
+        row_serializer = get_task_row_serializer(serializers.TaskSerializer)
+
+        assert row_serializer.to_representation([]) == []
+        assert serialize(serializers.TaskSerializer, queryset) == \
+            (b'[]', b'[]')
+
+    @pytest.mark.parametrize('url, filters', [
+        (TASKS_URL, {}),
+        (TASKS_ARCHIVED_URL, {'is_archived': True}),
+    ])
+    def test_listing_parity(self, auth_api_client, user, url, filters):
+        """Test listing responses match the DRF serializer output."""
+        create_varied_tasks(user)
+        queryset = models.Task.objects.get_owner_tasks(user) \
+            .filter(**filters).order_by('-created_date', '-id').with_tags()
+
+        res = auth_api_client.get(url)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == render({
+            'next': None,
+            'previous': None,
+            'results': serializers.TaskSerializer(queryset, many=True).data,
+        })
@@ -0,0 +1,150 @@
+"""
+Todo API search tests.
+"""
+import pytest
+
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import task_factory
+from .test_pagination import collect_pages
+
+
+TASKS_URL = reverse('task-list')
+TASKS_ARCHIVED_URL = reverse('task-archived-tasks')
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Search vectors and trigrams are PostgreSQL only.',
+)
+
+
+def search(client, terms, url=TASKS_URL, **params):
+    """Return labels of the tasks matching terms."""
+    res = client.get(url, {'search': terms, **params})
+    assert res.status_code == status.HTTP_200_OK
+    return [task['label'] for task in res.data['results']]
+
+
+@pytest.mark.django_db
+class TestTaskSearch:
+    """Test searching tasks of the user."""
+
+    def test_matches_label_and_description(self, auth_api_client, user):
+        """Test words of labels and descriptions are matched."""
+        task_factory.TaskFactory(owner=user, label='Buy milk',
+                                 description='')
+        task_factory.TaskFactory(owner=user, label='Errands',
+                                 description='Pick up milk')
+        task_factory.TaskFactory(owner=user, label='Call mom',
+                                 description='')
+
+        labels = search(auth_api_client, 'milk')
+
+        assert labels == ['Buy milk', 'Errands']
+
+    def test_every_word_matched(self, auth_api_client, user):
+        """Test tasks must match every word."""
+        task_factory.TaskFactory(owner=user, label='Buy milk')
+        task_factory.TaskFactory(owner=user, label='Buy bread')
+
+        assert search(auth_api_client, 'buy bread') == ['Buy bread']
+
+    def test_matches_prefixes(self, auth_api_client, user):
+        """Test words match the beginning of task words."""
+        task_factory.TaskFactory(owner=user, label='Quarterly report')
+
+        assert search(auth_api_client, 'quart') == ['Quarterly report']
+
+    def test_other_users_excluded(self, auth_api_client, user):
+        """Test tasks of other users are not searched."""
+        task_factory.TaskFactory(label='Buy milk')
+
+        assert search(auth_api_client, 'milk') == []
+
+    def test_blank_search_lists_all(self, auth_api_client, user):
+        """Test blank search terms list every task."""
+        task_factory.TaskFactory.create_batch(2, owner=user)
+
+        assert len(search(auth_api_client, ' ')) == 2
+
+    def test_no_words_matches_nothing(self, auth_api_client, user):
+        """Test terms without words match no task."""
+        task_factory.TaskFactory(owner=user)
+
+        assert search(auth_api_client, '&|!') == []
+
+    def test_searches_archived_listing(self, auth_api_client, user):
+        """Test the archived listing can be searched."""
+        task_factory.ArchivedTaskFactory(owner=user, label='Old milk')
+        task_factory.TaskFactory(owner=user, label='New milk')
+
+        labels = search(auth_api_client, 'milk', url=TASKS_ARCHIVED_URL)
+
+        assert labels == ['Old milk']
+
+    def test_async_listing_searched(self, auth_api_client, user):
+        """Test async listings are searched and ranked the same way."""
+        task_factory.TaskFactory(owner=user, label='Buy milk',
+                                 description='')
+        task_factory.TaskFactory(owner=user, label='Errands',
+                                 description='Pick up milk')
+        task_factory.TaskFactory(owner=user, label='Call mom')
+
+        res = auth_api_client.get(reverse('async-task-list'),
+                                  {'search': 'milk'})
+
+        assert [task['label'] for task in res.json()['results']] == \
+            search(auth_api_client, 'milk')
+
+    def test_paginated_by_rank(self, auth_api_client, user):
+        """Test every match is served once across ranked pages."""
+        tasks = [
+            *task_factory.TaskFactory.create_batch(
+                3, owner=user, label='Plan trip', description=''),
+            *task_factory.TaskFactory.create_batch(
+                3, owner=user, label='Holidays', description='Plan it'),
+        ]
+        task_factory.TaskFactory(owner=user, label='Unrelated')
+
+        pages = collect_pages(
+            auth_api_client, f'{TASKS_URL}?search=plan&page_size=2')
+        ids = [task_id for page in pages for task_id in page]
+
+        assert len(pages) == 3
+        assert ids == [task.id for task in tasks[2::-1] + tasks[:2:-1]]
+
+    def test_query_budget(self, auth_api_client, user):
+        """Test searching does not add queries to the listing."""
+        task_factory.TaskFactory.create_batch(3, owner=user, label='Plan')
+
+        with assert_query_budget(views.TaskViewSet, 'list'):
+            res = auth_api_client.get(TASKS_URL, {'search': 'plan'})
+
+        assert len(res.data['results']) == 3
+
+
+@postgresql_only
+@pytest.mark.django_db
+class TestSearchVector:
+    """Test the stored search vectors on PostgreSQL."""
+
+    def test_vector_follows_writes(self, user):
+        """Test vectors are updated on every kind of write."""
+        task = task_factory.TaskFactory(owner=user, label='First')
+        models.Task.objects.filter(id=task.id).update(label='Second')
+
+        matches = models.Task.objects.search('second')
+
+        assert list(matches) == [task]
+
+    def test_similar_labels_match(self, auth_api_client, user):
+        """Test misspelled labels are matched by trigrams."""
+        task_factory.TaskFactory(owner=user, label='Shopping list')
+
+        assert search(auth_api_client, 'shoping list') == ['Shopping list']
@@ -0,0 +1,185 @@
+"""
+Todo task stats tests.
+"""
+from io import StringIO
+
+import pytest
+
+from django.core.management import (
+    CommandError,
+    call_command,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import task_factory
+
+
+TASKS_URL = reverse('task-list')
+TASKS_BULK_URL = reverse('task-bulk')
+TASKS_STATS_URL = reverse('task-stats')
+
+
+def task_url(task, action=None):
+    """Return the detail or action url of task."""
+    if action is None:
+        return reverse('task-detail', args=[task.id])
+    return reverse(f'task-{action}', args=[task.id])
+
+
+def stored_stats(owner):
+    """Return the stored counters of owner."""
+    stats = models.TaskStats.objects.filter(owner=owner).first() \
+        or models.TaskStats(owner=owner)
+    return stats.get_counters()
+
+
+def assert_stats_counted(owner):
+    """Assert the stored counters of owner match a recount."""
+    assert stored_stats(owner) == \
+        models.TaskStats.objects.recount([owner.id])[owner.id]
+
+
+@pytest.mark.django_db
+class TestTaskStatsCounters:
+    """Test the counters follow task writes."""
+
+    def test_model_writes(self, user):
+        """Test saves, archiving and deletes move the counters."""
+        task = task_factory.TaskFactory(owner=user, priority=3)
+        task_factory.TaskFactory(owner=user, priority=1)
+        assert stored_stats(user)['high_priority'] == 1
+
+        task.priority = 2
+        task.save()
+        task.archive()
+        assert stored_stats(user) == {
+            'total': 2, 'archived': 1, 'high_priority': 0,
+            'medium_priority': 0, 'low_priority': 1, 'no_priority': 0}
+
+        task.unarchive()
+        models.Task.objects.get(id=task.id).delete()
+        assert stored_stats(user)['total'] == 1
+        assert_stats_counted(user)
+
+    def test_update_fields_counts_saved_fields(self, user):
+        """Test fields left out of update_fields are not counted."""
+        task = task_factory.TaskFactory(owner=user, priority=3)
+
+        task.priority = 0
+        task.label = 'Renamed'
+        task.save(update_fields=['label'])
+
+        assert stored_stats(user)['high_priority'] == 1
+        assert_stats_counted(user)
+
+    def test_queryset_writes(self, user):
+        """Test synced updates and queryset deletes move the counters."""
+        task_factory.TaskFactory.create_batch(3, owner=user, priority=1)
+        task_factory.TaskFactory.create_batch(2, owner=user, priority=3)
+        tasks = models.Task.objects.filter(owner=user)
+
+        tasks.filter(priority=1).update_synced(is_archived=True)
+        tasks.filter(priority=3)[:1].get().delete()
+        tasks.filter(is_archived=True).delete()
+
+        assert stored_stats(user)['total'] == 1
+        assert_stats_counted(user)
+
+    def test_api_writes(self, auth_api_client, user):
+        """Test every task endpoint keeps the counters."""
+        task = task_factory.TaskFactory(owner=user, priority=0)
+        removed = task_factory.TaskFactory(owner=user)
+
+        auth_api_client.post(TASKS_URL, {'label': 'New', 'priority': 3})
+        auth_api_client.patch(task_url(task), {'priority': 2})
+        auth_api_client.post(task_url(task, 'archive'))
+        auth_api_client.delete(task_url(removed))
+        auth_api_client.post(TASKS_BULK_URL, {
+            'create': [{'label': 'Bulk', 'priority': 1}],
+            'update': [{'id': task.id, 'priority': 1}],
+        }, format='json')
+
+        assert stored_stats(user) == {
+            'total': 3, 'archived': 1, 'high_priority': 1,
+            'medium_priority': 0, 'low_priority': 1, 'no_priority': 0}
+        assert_stats_counted(user)
+
+
+@pytest.mark.django_db
+class TestTaskStatsAPI:
+    """Test the task stats endpoint."""
+
+    def test_stats(self, auth_api_client, user):
+        """Test counts of the user tasks are returned."""
+        now = timezone.now()
+        task_factory.TaskFactory(owner=user, priority=3,
+                                 event_date=now - timezone.timedelta(days=2))
+        task_factory.TaskFactory(owner=user, priority=3, event_date=now)
+        task_factory.TaskFactory(owner=user, priority=0,
+                                 event_date=now + timezone.timedelta(days=2))
+        task_factory.ArchivedTaskFactory(owner=user, event_date=now)
+        # Recurring tasks are never overdue by their first occurrence.
+        task_factory.TaskFactory(owner=user, priority=1, recurrence='daily',
+                                 event_date=now - timezone.timedelta(days=2))
+        task_factory.TaskFactory(priority=3)
+
+        with assert_query_budget(views.TaskViewSet, 'stats'):
+            res = auth_api_client.get(TASKS_STATS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data == {
+            'total': 5, 'active': 4, 'archived': 1, 'high_priority': 2,
+            'medium_priority': 0, 'low_priority': 1, 'no_priority': 1,
+            'overdue': 2, 'today': 1}
+
+    def test_stats_without_tasks(self, auth_api_client, user):
+        """Test users without tasks or stats get zeros."""
+        models.TaskStats.objects.filter(owner=user).delete()
+
+        res = auth_api_client.get(TASKS_STATS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert set(res.data.values()) == {0}
+
+    def test_stats_unauthorized(self, api_client):
+        """Test authentication is required."""
+        res = api_client.get(TASKS_STATS_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestRebuildTaskStatsCommand:
+    """Test rebuilding the counters from a recount."""
+
+    @pytest.fixture
+    def drifted(self, user):
+        """Return owner of tasks written around the counters."""
+        task_factory.TaskFactory.create_batch(2, owner=user, priority=2)
+        models.Task.objects.filter(owner=user).update(is_archived=True)
+        return user
+
+    def test_check_reports_drift(self, drifted):
+        """Test the check fails naming the drifted counters."""
+        stdout = StringIO()
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_task_stats', check=True, stdout=stdout)
+
+        assert 'archived 0 != 2' in stdout.getvalue()
+        assert stored_stats(drifted)['archived'] == 0
+
+    def test_rebuild_fixes_drift(self, drifted):
+        """Test drifted counters are replaced by the recount."""
+        models.TaskStats.objects.filter(owner=drifted).delete()
+
+        call_command('rebuild_task_stats', batch_size=1, stdout=StringIO())
+
+        assert_stats_counted(drifted)
+        call_command('rebuild_task_stats', check=True, stdout=StringIO())
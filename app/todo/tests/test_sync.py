@@ -0,0 +1,169 @@
+"""
+Todo delta sync tests.
+"""
+import pytest
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from core.query_budget import assert_query_budget
+
+from .. import models
+from ..api import views
+from .factories import (
+    tag_factory,
+    task_factory,
+)
+
+
+CHANGES_URL = reverse('task-changes')
+
+
+def get_changes(client, since=None, **params):
+    """Request changes since the sync token and return the response."""
+    if since is not None:
+        params['since'] = since
+    return client.get(CHANGES_URL, params)
+
+
+@pytest.mark.django_db
+class TestTaskChangesAPI:
+    """Test task and tag delta sync."""
+
+    def test_full_sync_without_token(self, auth_api_client, user):
+        """Test every live task and tag is returned without a token."""
+        tag = tag_factory.TagFactory(owner=user)
+        task = task_factory.TaskFactory(owner=user)
+        task.tags.add(tag)
+        task_factory.TaskFactory()
+
+        res = get_changes(auth_api_client)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [t['id'] for t in res.data['tasks']] == [task.id]
+        assert res.data['tasks'][0]['tags'] == [{'id': tag.id,
+                                                 'name': tag.name}]
+        assert [t['id'] for t in res.data['tags']] == [tag.id]
+        assert res.data['deleted_tasks'] == []
+        assert res.data['more'] is False
+
+    def test_changes_since_token(self, auth_api_client, user):
+        """Test only changes after the token are returned."""
+        tasks = task_factory.TaskFactory.create_batch(3, owner=user)
+        token = get_changes(auth_api_client).data['token']
+
+        tasks[1].label = 'Changed'
+        tasks[1].save()
+        res = get_changes(auth_api_client, token)
+
+        assert [t['id'] for t in res.data['tasks']] == [tasks[1].id]
+        assert res.data['tasks'][0]['label'] == 'Changed'
+        assert int(res.data['token']) > int(token)
+
+        res = get_changes(auth_api_client, res.data['token'])
+
+        assert res.data['tasks'] == []
+        assert res.data['tags'] == []
+
+    def test_deletes_leave_tombstones(self, auth_api_client, user):
+        """Test deleted tasks and tags are reported by id."""
+        task, other = task_factory.TaskFactory.create_batch(2, owner=user)
+        tag = tag_factory.TagFactory(owner=user)
+        deleted_ids = [task.id, other.id, tag.id]
+        token = get_changes(auth_api_client).data['token']
+
+        task.delete()
+        models.Task.objects.filter(id=other.id).delete()
+        tag.delete()
+        res = get_changes(auth_api_client, token)
+
+        assert sorted(res.data['deleted_tasks']) == sorted(deleted_ids[:2])
+        assert res.data['deleted_tags'] == deleted_ids[2:]
+        assert res.data['tasks'] == []
+
+    def test_tag_membership_change_bumps_task(self, auth_api_client, user):
+        """Test adding a tag to a task reports the task as changed."""
+        task = task_factory.TaskFactory(owner=user)
+        tag = tag_factory.TagFactory(owner=user)
+        token = get_changes(auth_api_client).data['token']
+
+        task.tags.add(tag)
+        res = get_changes(auth_api_client, token)
+
+        assert [t['id'] for t in res.data['tasks']] == [task.id]
+
+        tag_id = tag.id
+        tag.delete()
+        res = get_changes(auth_api_client, res.data['token'])
+
+        assert [t['id'] for t in res.data['tasks']] == [task.id]
+        assert res.data['tasks'][0]['tags'] == []
+        assert res.data['deleted_tags'] == [tag_id]
+
+    def test_bulk_writes_are_synced(self, auth_api_client, user):
+        """Test bulk endpoint changes get change numbers."""
+        task = task_factory.TaskFactory(owner=user)
+        token = get_changes(auth_api_client).data['token']
+
+        auth_api_client.post(reverse('task-bulk'), {
+            'create': [{'label': 'New', 'priority': 1,
+                        'tags': [{'name': 'bulk'}]}],
+            'update': [{'id': task.id, 'label': 'Changed'}],
+        }, format='json')
+        res = get_changes(auth_api_client, token)
+
+        assert {t['label'] for t in res.data['tasks']} == {'New', 'Changed'}
+        assert [t['name'] for t in res.data['tags']] == ['bulk']
+
+    def test_limit_splits_changes(self, auth_api_client, user):
+        """Test changes over the limit are returned in several syncs."""
+        tasks = task_factory.TaskFactory.create_batch(5, owner=user)
+
+        seen = []
+        token = None
+        for _ in range(5):
+            res = get_changes(auth_api_client, token, page_size=2)
+            seen.extend(t['id'] for t in res.data['tasks'])
+            token = res.data['token']
+            if not res.data['more']:
+                break
+
+        assert seen == [task.id for task in tasks]
+        assert res.data['more'] is False
+
+    def test_invalid_token(self, auth_api_client):
+        """Test a malformed token is rejected."""
+        res = get_changes(auth_api_client, 'abc')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_expired_token(self, auth_api_client, user, settings):
+        """Test tokens older than purged tombstones require a full sync."""
+        task = task_factory.TaskFactory(owner=user)
+        token = get_changes(auth_api_client).data['token']
+        task.delete()
+
+        settings.SYNC_TOMBSTONE_RETENTION = timedelta(0)
+        call_command('purge_tombstones', stdout=StringIO())
+
+        assert not models.Tombstone.objects.exists()
+        res = get_changes(auth_api_client, token)
+        assert res.status_code == status.HTTP_410_GONE
+
+        token = get_changes(auth_api_client).data['token']
+        res = get_changes(auth_api_client, token)
+        assert res.status_code == status.HTTP_200_OK
+
+    def test_changes_query_budget(self, auth_api_client, user):
+        """Test changes stay within the query budget."""
+        task_factory.TaskFactory.create_batch(3, owner=user)
+        tag_factory.TagFactory.create_batch(3, owner=user)
+
+        with assert_query_budget(views.TaskViewSet, 'changes'):
+            res = get_changes(auth_api_client, 0)
+
+        assert res.status_code == status.HTTP_200_OK
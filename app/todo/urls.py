@@ -3,13 +3,34 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .api import views
+from .api import (
+    async_views,
+    views,
+)
 
 router = DefaultRouter()
 router.register('tasks', views.TaskViewSet, basename='task')
 router.register('tags', views.TagViewSet, basename='tag')
 
+# Async reads for ASGI deployments, see todo.api.async_views.
+async_urlpatterns = [
+    path('tasks/', async_views.AsyncTaskViewSet.as_view('list'),
+         name='async-task-list'),
+    path('tasks/today/', async_views.AsyncTaskViewSet.as_view('today_tasks'),
+         name='async-task-today-tasks'),
+    path('tasks/archived/',
+         async_views.AsyncTaskViewSet.as_view('archived_tasks'),
+         name='async-task-archived-tasks'),
+    path('tasks/<int:pk>/', async_views.AsyncTaskViewSet.as_view('retrieve'),
+         name='async-task-detail'),
+    path('tags/', async_views.AsyncTagViewSet.as_view('list'),
+         name='async-tag-list'),
+    path('tags/<int:pk>/', async_views.AsyncTagViewSet.as_view('retrieve'),
+         name='async-tag-detail'),
+]
+
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    path('async/', include(async_urlpatterns)),
 ]
@@ -2,8 +2,11 @@
 
 set -e
 
+# Checked against process local caches by manage.py migrate.
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-4}
+
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+uwsgi --socket :9000 --workers $WEB_CONCURRENCY --master --enable-threads --module app.wsgi
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/sh
+
+set -e
+
+# Checked against process local caches by manage.py migrate.
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-4}
+
+python manage.py wait_for_db
+python manage.py collectstatic --noinput
+python manage.py migrate
+
+uvicorn app.asgi:application --host 0.0.0.0 --port 9000 --workers $WEB_CONCURRENCY